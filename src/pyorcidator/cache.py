@@ -0,0 +1,406 @@
+"""Caches for ORCID records, SPARQL query results and other JSON API responses."""
+
+import functools
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import click
+
+__all__ = [
+    "CacheEntry",
+    "CacheMiss",
+    "DiskCache",
+    "QueryCache",
+    "DEFAULT_CACHE_DIR",
+    "get_record_cache",
+    "set_record_cache",
+    "configure_record_cache",
+    "get_query_cache",
+    "set_query_cache",
+    "configure_query_cache",
+    "normalize_query",
+    "cache_options",
+]
+
+DEFAULT_CACHE_DIR = Path.home().joinpath(".cache", "pyorcidator")
+#: By default, cached records are reused without revalidation for one day
+DEFAULT_TTL = 24 * 60 * 60
+#: By default, the cache is capped at 512 MiB of compressed data
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+#: By default, SPARQL results are reused for one hour within a process
+DEFAULT_QUERY_TTL = 60 * 60
+#: By default, up to 4096 SPARQL results are kept in memory
+DEFAULT_QUERY_MAXSIZE = 4096
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+
+class CacheMiss(LookupError):
+    """Raised when running offline and a value is not in the cache."""
+
+
+@dataclass
+class CacheEntry:
+    """Class for a cached JSON response and the validators needed to revalidate it."""
+
+    value: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def age(self) -> float:
+        """Return the number of seconds since the entry was fetched or revalidated."""
+        return time.time() - self.fetched_at
+
+
+class DiskCache:
+    """A size-capped SQLite store of zlib-compressed JSON values with LRU eviction."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: Optional[float] = DEFAULT_TTL,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        offline: bool = False,
+    ):
+        """
+        Open or create a cache.
+
+        Args:
+            path: The path of the SQLite file
+            ttl: The number of seconds an entry is served without revalidation. If None,
+                entries never go stale.
+            max_bytes: The maximum total size of the compressed values. When exceeded, the
+                least recently used entries are evicted. If None, the cache is unbounded.
+            offline: If true, serve from the cache only and never go to the network
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Check if an entry can be served without revalidation."""
+        return self.offline or self.ttl is None or entry.age() < self.ttl
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Get an entry, stale or not, and mark it as recently used."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, etag, last_modified, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                )
+        value, etag, last_modified, fetched_at = row
+        return CacheEntry(
+            value=json.loads(zlib.decompress(value)),
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+        )
+
+    def put(
+        self,
+        key: str,
+        value: Any,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Store a value, then evict the least recently used entries if over the size cap."""
+        blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, blob, len(blob), etag, last_modified, now, now),
+            )
+            self._evict()
+
+    def touch(self, key: str) -> None:
+        """Mark an entry as revalidated, e.g., after a 304 Not Modified response."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+            )
+
+    def size(self) -> int:
+        """Return the total size of the compressed values, in bytes."""
+        with self._lock:
+            (total,) = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return total
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        rows = self._connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize the layout of a SPARQL query so that equivalent queries share a cache key."""
+    return "\n".join(line.strip() for line in query.strip().splitlines() if line.strip())
+
+
+class QueryCache:
+    """
+    A memoizing cache for query results.
+
+    Results are kept in an in-process LRU, optionally backed by a persistent
+    :class:`DiskCache`. Concurrent calls for the same query are coalesced so that
+    only one of them runs the query (single-flight).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_QUERY_MAXSIZE,
+        ttl: Optional[float] = DEFAULT_QUERY_TTL,
+        store: Optional[DiskCache] = None,
+    ):
+        """
+        Create a query cache.
+
+        Args:
+            maxsize: The maximum number of results kept in memory
+            ttl: The number of seconds a result is reused. If None, results never expire.
+            store: A persistent cache consulted on in-memory misses
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self.coalesced = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "store_hits": self.store_hits,
+            "coalesced": self.coalesced,
+            "size": len(self._entries),
+        }
+
+    def clear(self) -> None:
+        """Drop all in-memory results and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.store_hits = self.coalesced = 0
+
+    def get_or_compute(self, query: str, compute: Callable[[str], Any]) -> Any:
+        """
+        Get the result of a query from the cache, or compute and cache it.
+
+        Args:
+            query: The query text. Its layout is normalized to build the cache key.
+            compute: A function that runs the query
+        """
+        key = hashlib.sha256(normalize_query(query).encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and not self._is_expired(cached[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not owner:
+            # Another thread is already running the same query
+            return future.result()
+
+        try:
+            result = self._lookup_store(key)
+            if result is None:
+                with self._lock:
+                    self.misses += 1
+                result = compute(query)
+                if self.store is not None:
+                    self.store.put(key, result)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[key] = (time.time(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            del self._in_flight[key]
+        future.set_result(result)
+        return result
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at >= self.ttl
+
+    def _lookup_store(self, key: str) -> Optional[Any]:
+        if self.store is None:
+            return None
+        entry = self.store.get(key)
+        if entry is None:
+            if self.store.offline:
+                raise CacheMiss(f"query result {key} is not in the cache at {self.store.path}")
+            return None
+        if not self.store.is_fresh(entry):
+            return None
+        with self._lock:
+            self.store_hits += 1
+        return entry.value
+
+
+_record_cache: Optional[DiskCache] = None
+_query_cache: Optional[QueryCache] = QueryCache()
+
+
+def get_record_cache() -> Optional[DiskCache]:
+    """Get the cache used for ORCID records, if one is configured."""
+    return _record_cache
+
+
+def set_record_cache(cache: Optional[DiskCache]) -> None:
+    """Set the cache used for ORCID records. Pass None to disable caching."""
+    global _record_cache
+    _record_cache = cache
+
+
+def configure_record_cache(
+    cache_dir: Union[None, str, Path] = None,
+    offline: bool = False,
+    ttl: Optional[float] = DEFAULT_TTL,
+) -> Optional[DiskCache]:
+    """
+    Configure the ORCID record cache from command line options.
+
+    Args:
+        cache_dir: The directory for the cache. If None and not offline, caching is disabled.
+        offline: Serve records from the cache only. Uses the default cache directory
+            if none is given.
+        ttl: The number of seconds a cached record is used without revalidation
+
+    Returns:
+        The configured cache, if any
+    """
+    if cache_dir is None and not offline:
+        set_record_cache(None)
+        return None
+    cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+    cache = DiskCache(cache_dir.joinpath("orcid_records.sqlite"), ttl=ttl, offline=offline)
+    set_record_cache(cache)
+    return cache
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """Get the cache used for SPARQL query results, if one is configured."""
+    return _query_cache
+
+
+def set_query_cache(cache: Optional[QueryCache]) -> None:
+    """Set the cache used for SPARQL query results. Pass None to disable caching."""
+    global _query_cache
+    _query_cache = cache
+
+
+def configure_query_cache(
+    cache_dir: Union[None, str, Path] = None,
+    offline: bool = False,
+    ttl: Optional[float] = DEFAULT_QUERY_TTL,
+) -> QueryCache:
+    """
+    Configure the SPARQL query cache from command line options.
+
+    Results are always cached in memory. If a cache directory is given or running
+    offline, they are also persisted to disk.
+
+    Args:
+        cache_dir: The directory for the persistent store
+        offline: Serve query results from the persistent store only. Uses the default
+            cache directory if none is given.
+        ttl: The number of seconds a result is reused
+
+    Returns:
+        The configured cache
+    """
+    store = None
+    if cache_dir is not None or offline:
+        cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        store = DiskCache(cache_dir.joinpath("sparql.sqlite"), ttl=ttl, offline=offline)
+    cache = QueryCache(ttl=ttl, store=store)
+    set_query_cache(cache)
+    return cache
+
+
+def cache_options(f):
+    """Add the ``--cache-dir`` and ``--offline`` options to a command."""
+
+    @click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False),
+        help="Directory for caching ORCID records and Wikidata query results between runs",
+    )
+    @click.option(
+        "--offline",
+        is_flag=True,
+        help="Serve ORCID records and Wikidata query results from the cache only",
+    )
+    @functools.wraps(f)
+    def _wrapped(*args, cache_dir: Optional[str], offline: bool, **kwargs):
+        configure_record_cache(cache_dir, offline=offline)
+        configure_query_cache(cache_dir, offline=offline)
+        return f(*args, **kwargs)
+
+    return _wrapped
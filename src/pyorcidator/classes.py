@@ -1,9 +1,10 @@
 import datetime
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
 
 __all__ = [
     "AffiliationEntry",
+    "BatchResolution",
 ]
 
 
@@ -11,9 +12,21 @@ __all__ = [
 class AffiliationEntry:
     """Class for capturing the info for an affiliation (education or employment) entry on ORCID."""
 
-    institution: str
+    institution: Optional[str]
     role: Optional[str] = None
     start_date: Optional[datetime.datetime] = None
     start_date_precision: Optional[int] = None
     end_date: Optional[datetime.datetime] = None
     end_date_precision: Optional[int] = None
+
+
+@dataclass
+class BatchResolution:
+    """Class for holding the QIDs resolved in bulk for a batch of ORCID records."""
+
+    #: Mapping from ORCID to the QID of the researcher
+    researchers: Dict[str, str] = field(default_factory=dict)
+    #: Mapping from (disambiguation source, identifier) pairs to the QID of the organization
+    organizations: Dict[Tuple[str, str], str] = field(default_factory=dict)
+    #: Mapping from DOI to the QID of the paper
+    papers: Dict[str, str] = field(default_factory=dict)
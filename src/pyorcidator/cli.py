@@ -1,15 +1,67 @@
+import importlib
+from typing import List, Mapping, Optional, Tuple
+
 import click
 
-from pyorcidator import import_info, import_info_from_list, run_for_event
+#: Subcommands as (import path, short help). They are only imported when run, since
+#: their modules pull in heavy dependencies like pydantic, pandas and wdcuration.
+LAZY_COMMANDS: Mapping[str, Tuple[str, str]] = {
+    "import": (
+        "pyorcidator.import_info:main",
+        "Import ORCID information into Wikidata.",
+    ),
+    "import_list": (
+        "pyorcidator.import_info_from_list:main",
+        "Import ORCID information for a list of ORCIDs into Wikidata.",
+    ),
+    "import_data_file": (
+        "pyorcidator.import_data_file:main",
+        "Import ORCID information from the ORCID public data file.",
+    ),
+    "parse_event": (
+        "pyorcidator.run_for_event:import_orcids_from_event",
+        "Import ORCID information for the speakers of events.",
+    ),
+    "resolve-pending": (
+        "pyorcidator.pending:resolve_pending",
+        "Curate the labels queued by non-interactive runs.",
+    ),
+}
+
+
+class LazyGroup(click.Group):
+    """A command group that imports its subcommands on first use."""
+
+    def __init__(self, *args, lazy_commands: Mapping[str, Tuple[str, str]], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in self.lazy_commands and cmd_name not in self.commands:
+            module_name, attribute = self.lazy_commands[cmd_name][0].split(":")
+            self.add_command(getattr(importlib.import_module(module_name), attribute), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        # Lists the short help of each subcommand without importing it
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                rows.append((name, self.commands[name].get_short_help_str()))
+            else:
+                rows.append((name, self.lazy_commands[name][1]))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
 def cli():
     """PyORCIDator."""
 
 
-cli.add_command(import_info.main)
-cli.add_command(import_info_from_list.main)
-cli.add_command(run_for_event.import_orcids_from_event)
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,72 @@
+"""Helpers for running ORCID and Wikidata lookups concurrently."""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Deque, Iterable, Iterator, TypeVar
+
+__all__ = [
+    "map_ordered",
+    "prefetch",
+]
+
+X = TypeVar("X")
+Y = TypeVar("Y")
+
+
+def map_ordered(func: Callable[[X], Y], items: Iterable[X], workers: int = 1) -> Iterator[Y]:
+    """
+    Apply a function to items in a thread pool, yielding results in input order.
+
+    At most ``2 * workers`` items are in flight at a time, so the input can be a
+    lazy iterable of any length.
+
+    Args:
+        func: The function to apply to each item
+        items: The items to process
+        workers: The number of threads. With a single worker, items are processed
+            in the calling thread.
+    """
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Deque = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def prefetch(func: Callable[[X], Y], items: Iterable[X], depth: int = 1) -> Iterator[Y]:
+    """
+    Apply a function to items ahead of the consumer, yielding results in input order.
+
+    While the consumer works on a result, the next ``depth`` items are computed in
+    background threads. Closing the iterator early cancels the items that have not
+    started yet, without waiting for the running ones.
+
+    Args:
+        func: The function to apply to each item
+        items: The items to process
+        depth: The number of items computed ahead. With 0, items are processed in the
+            calling thread when requested.
+    """
+    if depth <= 0:
+        yield from map(func, items)
+        return
+    iterator = iter(items)
+    executor = ThreadPoolExecutor(max_workers=depth)
+    pending: Deque[Future] = deque()
+    try:
+        pending.extend(executor.submit(func, item) for item in islice(iterator, depth))
+        while pending:
+            future = pending.popleft()
+            pending.extend(executor.submit(func, item) for item in islice(iterator, 1))
+            yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
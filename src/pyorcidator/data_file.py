@@ -0,0 +1,330 @@
+"""Stream ORCID records from the ORCID public data file, a directory or a JSON Lines file."""
+
+import datetime
+import gzip
+import json
+import logging
+import tarfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from .helper import ROR_PREFIX, get_orcid_data, get_record_orcid
+
+__all__ = [
+    "iter_data_file",
+    "parse_record_xml",
+    "affiliation_filter",
+    "RecordStream",
+]
+
+logger = logging.getLogger(__name__)
+
+Record = Tuple[str, Dict]
+#: The suffixes of record files, in archives and directories
+RECORD_SUFFIXES = (".json", ".xml")
+
+
+def _member_orcid(name: str) -> str:
+    # The public data file names records after their ORCID, e.g., 097/0000-0002-1825-0097.xml
+    return Path(name).name.split(".")[0]
+
+
+def _load(file: IO[bytes], name: str) -> Dict:
+    if name.endswith(".xml"):
+        return parse_record_xml(file)
+    return json.load(file)
+
+
+def _load_or_skip(file: IO[bytes], name: str) -> Optional[Dict]:
+    # A single malformed record should not stop the import of the others
+    try:
+        return _load(file, name)
+    except (ValueError, ElementTree.ParseError) as e:
+        logger.warning("skipping unreadable record %s: %s", name, e)
+        return None
+
+
+def iter_data_file(
+    path: str,
+    orcids: Optional[Collection[str]] = None,
+    predicate: Optional[Callable[[Dict], bool]] = None,
+) -> Iterator[Record]:
+    """
+    Stream ORCID records, one at a time, without extracting anything to disk.
+
+    Args:
+        path: A tar archive of record files, compressed or not, such as the summaries file of
+            the ORCID public data file. Alternatively, a directory of record files, or a
+            JSON Lines file with a record per line, gzip-compressed if it ends in ``.gz``.
+            Record files are ORCID API responses in JSON or records of the public data file
+            in XML.
+        orcids: Only stream the records of these ORCIDs. In archives and directories,
+            the other records are skipped by their name, without being read.
+        predicate: Only stream the records for which this returns true, e.g., from
+            :func:`affiliation_filter`
+
+    Yields:
+        Pairs of ORCID and record, in the order of the source
+    """
+    for orcid, data in _iter_source(Path(path), orcids):
+        if orcids is not None and orcid not in orcids:
+            continue
+        if predicate is not None and not predicate(data):
+            continue
+        yield orcid, data
+
+
+def _iter_source(path: Path, orcids: Optional[Collection[str]]) -> Iterator[Record]:
+    if path.is_dir():
+        for file_path in sorted(path.rglob("*")):
+            if file_path.suffix not in RECORD_SUFFIXES:
+                continue
+            if orcids is not None and _member_orcid(file_path.name) not in orcids:
+                continue
+            with file_path.open("rb") as file:
+                data = _load_or_skip(file, str(file_path))
+            if data is not None:
+                yield get_record_orcid(data, _member_orcid(file_path.name)), data
+    elif path.name.endswith((".jsonl", ".jsonl.gz")):
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as file:
+            for number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as e:
+                    logger.warning("skipping unreadable line %d of %s: %s", number, path, e)
+                    continue
+                orcid = get_record_orcid(data)
+                if not orcid:
+                    logger.warning("skipping a record without an ORCID identifier")
+                    continue
+                yield orcid, data
+    else:
+        # Stream mode reads the archive front to back, so it is never held in memory
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.endswith(RECORD_SUFFIXES):
+                    continue
+                if orcids is not None and _member_orcid(member.name) not in orcids:
+                    continue
+                data = _load_or_skip(archive.extractfile(member), member.name)
+                if data is not None:
+                    yield get_record_orcid(data, _member_orcid(member.name)), data
+
+
+def _find(element: Optional[ElementTree.Element], *names: str):
+    # Namespaces differ between versions of the ORCID schema, so only local names are used
+    for name in names:
+        if element is None:
+            return None
+        element = element.find(f"{{*}}{name}")
+    return element
+
+
+def _findall(element: Optional[ElementTree.Element], *names: str) -> List[ElementTree.Element]:
+    if element is None:
+        return []
+    return element.findall("/".join(f"{{*}}{name}" for name in names))
+
+
+def _text(element: Optional[ElementTree.Element], *names: str) -> Optional[str]:
+    element = _find(element, *names)
+    if element is None or element.text is None:
+        return None
+    return element.text.strip()
+
+
+def _value(element: Optional[ElementTree.Element], *names: str) -> Optional[Dict[str, str]]:
+    text = _text(element, *names)
+    return {"value": text} if text is not None else None
+
+
+def _timestamp(text: Optional[str]) -> Optional[Dict[str, int]]:
+    if text is None:
+        return None
+    moment = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+    return {"value": int(moment.timestamp() * 1000)}
+
+
+def _date(element: Optional[ElementTree.Element]) -> Optional[Dict]:
+    if element is None:
+        return None
+    return {key: _value(element, key) for key in ("year", "month", "day")}
+
+
+def _external_ids(
+    element: Optional[ElementTree.Element], name: str = "external-id"
+) -> List[Dict[str, str]]:
+    return [
+        {
+            "external-id-type": _text(external_id, "external-id-type"),
+            "external-id-value": _text(external_id, "external-id-value"),
+        }
+        for external_id in _findall(element, name)
+    ]
+
+
+def _affiliation(summary: ElementTree.Element) -> Dict:
+    organization = _find(summary, "organization")
+    disambiguated = _find(organization, "disambiguated-organization")
+    if disambiguated is not None:
+        disambiguated = {
+            "disambiguated-organization-identifier": _text(
+                disambiguated, "disambiguated-organization-identifier"
+            ),
+            "disambiguation-source": _text(disambiguated, "disambiguation-source"),
+        }
+    return {
+        "role-title": _text(summary, "role-title"),
+        "start-date": _date(_find(summary, "start-date")),
+        "end-date": _date(_find(summary, "end-date")),
+        "organization": {
+            "name": _text(organization, "name"),
+            "disambiguated-organization": disambiguated,
+        },
+    }
+
+
+def _affiliations(activities: Optional[ElementTree.Element], kind: str) -> List[Dict]:
+    section = _find(activities, f"{kind}s")
+    # Version 3.0 groups affiliations, version 2.0 lists them directly
+    summaries = _findall(section, "affiliation-group", f"{kind}-summary")
+    summaries += _findall(section, f"{kind}-summary")
+    return [_affiliation(summary) for summary in summaries]
+
+
+def parse_record_xml(file: IO[bytes]) -> Dict:
+    """
+    Parse a record of the ORCID public data file into the JSON structure of the ORCID API.
+
+    Only the parts used to build QuickStatements are kept, in the shape of a version 2.0
+    record as returned by :func:`pyorcidator.helper.get_orcid_data`. Records in the XML of
+    versions 2.0 and 3.0 of the ORCID schema are both understood.
+
+    Args:
+        file: A binary file with the XML of a single record
+
+    Returns:
+        The record
+    """
+    root = ElementTree.parse(file).getroot()
+    person = _find(root, "person")
+    name = _find(person, "name")
+    activities = _find(root, "activities-summary")
+    history = _find(root, "history")
+    return {
+        "orcid-identifier": {"path": _text(root, "orcid-identifier", "path")},
+        "history": {
+            "last-modified-date": _timestamp(_text(history, "last-modified-date")),
+        },
+        "person": {
+            "name": {
+                "given-names": _value(name, "given-names"),
+                "family-name": _value(name, "family-name"),
+            },
+            "keywords": {
+                "keyword": [
+                    {"content": _text(keyword, "content")}
+                    for keyword in _findall(person, "keywords", "keyword")
+                ]
+            },
+            "external-identifiers": {
+                "external-identifier": _external_ids(
+                    _find(person, "external-identifiers"), "external-identifier"
+                )
+            },
+            "researcher-urls": {
+                "researcher-url": [
+                    {"url": _value(url, "url")}
+                    for url in _findall(person, "researcher-urls", "researcher-url")
+                ]
+            },
+        },
+        "activities-summary": {
+            "employments": {"employment-summary": _affiliations(activities, "employment")},
+            "educations": {"education-summary": _affiliations(activities, "education")},
+            "works": {
+                "group": [
+                    {"external-ids": {"external-id": _external_ids(_find(group, "external-ids"))}}
+                    for group in _findall(activities, "works", "group")
+                ]
+            },
+        },
+    }
+
+
+def affiliation_filter(organizations: Iterable[str]) -> Callable[[Dict], bool]:
+    """
+    Get a predicate for records with an employment or education at one of the organizations.
+
+    Args:
+        organizations: ROR IDs, with or without the ``https://ror.org/`` prefix, GRID IDs
+            or organization names, matched regardless of case
+    """
+    wanted = {organization.lower().replace(ROR_PREFIX, "") for organization in organizations}
+
+    def _predicate(data: Dict) -> bool:
+        activities = data["activities-summary"]
+        for entry in [
+            *activities["employments"]["employment-summary"],
+            *activities["educations"]["education-summary"],
+        ]:
+            organization = entry["organization"]
+            if (organization["name"] or "").lower() in wanted:
+                return True
+            disambiguated = organization["disambiguated-organization"] or {}
+            identifier = disambiguated.get("disambiguated-organization-identifier") or ""
+            if identifier.lower().replace(ROR_PREFIX, "") in wanted:
+                return True
+        return False
+
+    return _predicate
+
+
+class RecordStream:
+    """
+    Feeds streamed records into the import pipeline in place of the ORCID API.
+
+    Iterating over the stream yields ORCIDs and keeps their records until the pipeline
+    fetches them with :meth:`fetch`. The pipeline fetches a batch of ORCIDs right after
+    taking them, so only about a batch of records is held at a time. The oldest records
+    are dropped beyond ``max_held``, e.g., those of ORCIDs a resumed job skips.
+    """
+
+    def __init__(self, records: Iterable[Record], max_held: int = 1000):
+        """
+        Wrap a stream of records.
+
+        Args:
+            records: Pairs of ORCID and record, e.g., from :func:`iter_data_file`
+            max_held: The largest number of records held. Use at least twice the
+                batch size of the pipeline.
+        """
+        self.records = records
+        self.max_held = max_held
+        self.streamed = 0
+        self._held: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[str]:
+        for orcid, data in self.records:
+            with self._lock:
+                self._held[orcid] = data
+                while len(self._held) > self.max_held:
+                    self._held.popitem(last=False)
+                self.streamed += 1
+            yield orcid
+
+    def fetch(self, orcid: str) -> Dict:
+        """Get the streamed record of an ORCID, falling back to the ORCID API if it was dropped."""
+        with self._lock:
+            data = self._held.pop(orcid, None)
+        if data is not None:
+            return data
+        logger.warning("record of %s is no longer held, fetching it from the ORCID API", orcid)
+        return get_orcid_data(orcid)
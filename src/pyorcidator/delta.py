@@ -0,0 +1,115 @@
+"""Drop QuickStatements for claims that are already on Wikidata."""
+
+import json
+import logging
+import re
+from typing import Iterable, List, Optional, Set, Tuple
+
+from .concurrency import map_ordered
+from .metrics import count, timed
+from .statements import QID_REGEX, Statement
+from .wikidata_lookup import chunked, query_wikidata
+
+__all__ = [
+    "Claim",
+    "get_claim",
+    "lookup_existing_claims",
+    "drop_existing",
+]
+
+logger = logging.getLogger(__name__)
+
+#: A claim as (subject QID, property, target QID or string)
+Claim = Tuple[str, str, str]
+
+#: The number of claims checked in a single VALUES clause
+CLAIM_CHUNK_SIZE = 200
+#: The number of claim chunks checked at the same time
+CLAIM_WORKERS = 4
+ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+PROPERTY_REGEX = re.compile(r"^P\d+$")
+
+
+def get_claim(line: Statement) -> Optional[Claim]:
+    """
+    Get the claim a line makes about an existing item.
+
+    Args:
+        line: A statement, or a line of :mod:`quickstatements_client`, which has the same
+            ``type`` and attributes
+
+    Returns:
+        The subject, property and target of the line, or None if the line is not a claim
+        between an existing item and an item or string, e.g., a ``CREATE``, a label, or a
+        claim about or pointing to a new item
+    """
+    if line.type not in ("Entity", "Text"):
+        return None
+    if not QID_REGEX.match(line.subject) or not PROPERTY_REGEX.match(line.predicate):
+        return None
+    if line.type == "Entity" and not QID_REGEX.match(line.target):
+        return None
+    return line.subject, line.predicate, line.target
+
+
+def _get_value(value: dict) -> str:
+    if value["type"] == "uri":
+        return value["value"].replace(ENTITY_PREFIX, "", 1)
+    return value["value"]
+
+
+def _format_value(value: str) -> str:
+    return f"wd:{value}" if QID_REGEX.match(value) else json.dumps(value)
+
+
+@timed("lookup_existing_claims")
+def lookup_existing_claims(
+    lines: Iterable[Statement], chunk_size: int = CLAIM_CHUNK_SIZE, workers: int = CLAIM_WORKERS
+) -> Set[Claim]:
+    """
+    Find which claims of the given lines are already on Wikidata.
+
+    Only the claims of the lines are checked, in chunked VALUES queries, so the P50
+    claims of a paper with thousands of authors cost no more than those of any other.
+    Statements of every rank count, since QuickStatements adds to a statement with the
+    same value instead of creating a new one.
+
+    Args:
+        lines: QuickStatements lines, e.g., of all researchers in a batch
+        chunk_size: The maximum number of claims per query
+        workers: The maximum number of queries run at the same time
+
+    Returns:
+        The claims that are on Wikidata
+    """
+    claims = sorted({claim for claim in map(get_claim, lines) if claim is not None})
+
+    def _query(chunk: List[Claim]) -> List[dict]:
+        values = " ".join(
+            f"(wd:{subject} wd:{prop} {_format_value(target)})" for subject, prop, target in chunk
+        )
+        query = f"""\
+            SELECT ?item ?property ?value
+            WHERE
+            {{
+                VALUES (?item ?property ?value) {{ {values} }}
+                ?property wikibase:claim ?claim ; wikibase:statementProperty ?statementProperty .
+                ?item ?claim ?statement .
+                ?statement ?statementProperty ?value .
+            }}
+        """
+        return query_wikidata(query)
+
+    rv: Set[Claim] = set()
+    for bindings in map_ordered(_query, chunked(claims, chunk_size), workers=workers):
+        for binding in bindings:
+            rv.add(tuple(_get_value(binding[key]) for key in ("item", "property", "value")))
+    logger.debug("%d of %d claims are already on Wikidata", len(rv), len(claims))
+    return rv
+
+
+def drop_existing(lines: List[Statement], existing: Set[Claim]) -> List[Statement]:
+    """Drop the lines whose claims are in the claims found by :func:`lookup_existing_claims`."""
+    rv = [line for line in lines if get_claim(line) not in existing]
+    count("existing_claims_dropped", len(lines) - len(rv))
+    return rv
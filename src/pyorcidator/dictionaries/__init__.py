@@ -1,9 +1,20 @@
-""" Loads all JSON files into a single mother dict"""
+"""Loads all JSON files into a single mother dict
+
+The dictionaries are read from the JSON files in this directory by default. Set the
+``PYORCIDATOR_DICTIONARY_DB`` environment variable to the path of a SQLite file, or call
+:meth:`LazyDicts.use_sqlite`, to keep them in an indexed store instead. The JSON files
+are merged into the store when they change and can be re-exported from it for
+version control.
+"""
 
 import json
 import logging
+import os
+import threading
 from pathlib import Path
-from typing import Dict, Mapping
+from typing import Dict, Iterator, Mapping, MutableMapping, Optional, Union
+
+from .store import SQLiteDictionary, write_json
 
 __all__ = [
     "dicts",
@@ -15,12 +26,77 @@ logger = logging.getLogger(__name__)
 HERE = Path(__file__).parent.resolve()
 ROLE_PATH = HERE.joinpath("role.json")
 INSTITUTIONS_PATH = HERE.joinpath("institutions.json")
+FIELDS_PATH = HERE.joinpath("fields.json")
 
 JSON_PATHS = sorted(HERE.glob("*.json"))
-for path in JSON_PATHS:
-    logger.info("loading PyORCIDator data from %", path)
 
-dicts: Mapping[str, Dict[str, str]] = {
-    path.stem: json.loads(path.read_text()) for path in JSON_PATHS
-}
+
+class LazyDicts(Mapping[str, MutableMapping[str, str]]):
+    """A mapping from file stem to dictionary that loads each dictionary on first access."""
+
+    def __init__(self, paths: Mapping[str, Path], db_path: Union[None, str, Path] = None):
+        self._paths = paths
+        self._db_path = Path(db_path) if db_path else None
+        self._loaded: Dict[str, MutableMapping[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def use_sqlite(self, db_path: Union[None, str, Path]) -> None:
+        """Switch to a SQLite store at the given path, or back to the JSON files with None."""
+        with self._lock:
+            self._db_path = Path(db_path) if db_path else None
+            self._loaded.clear()
+
+    @property
+    def db_path(self) -> Optional[Path]:
+        """The path of the SQLite store, if one is used."""
+        return self._db_path
+
+    def __getitem__(self, key: str) -> MutableMapping[str, str]:
+        if key not in self._loaded:
+            path = self._paths[key]
+            with self._lock:
+                if key not in self._loaded:
+                    self._loaded[key] = self._load(key, path)
+        return self._loaded[key]
+
+    def _load(self, key: str, path: Path) -> MutableMapping[str, str]:
+        if self._db_path is None:
+            logger.info("loading PyORCIDator data from %s", path)
+            return json.loads(path.read_text())
+        data = SQLiteDictionary(self._db_path, key)
+        if data.sync_from_json(path):
+            logger.info("merged PyORCIDator data from %s into %s", path, self._db_path)
+        return data
+
+    def save(self, key: str) -> None:
+        """
+        Persist changes to a dictionary.
+
+        JSON dictionaries are rewritten in full. SQLite dictionaries commit every insert
+        on their own, so there is nothing left to do.
+        """
+        data = self[key]
+        if not isinstance(data, SQLiteDictionary):
+            write_json(self._paths[key], data.items())
+
+    def export_json(self, key: str) -> None:
+        """Write a dictionary to its JSON file, e.g., to commit changes made in the SQLite store."""
+        data = self[key]
+        if isinstance(data, SQLiteDictionary):
+            data.export_json(self._paths[key])
+        else:
+            write_json(self._paths[key], data.items())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def is_loaded(self, key: str) -> bool:
+        """Check if the dictionary for the given stem has been read from disk."""
+        return key in self._loaded
+
+
 stem_to_path: Mapping[str, Path] = {path.stem: path for path in JSON_PATHS}
+dicts: LazyDicts = LazyDicts(stem_to_path, db_path=os.environ.get("PYORCIDATOR_DICTIONARY_DB"))
@@ -0,0 +1,24 @@
+"""Export the curation dictionaries from the SQLite store to JSON for version control."""
+
+import click
+
+from pyorcidator.dictionaries import dicts
+
+
+@click.command(name="export-dictionaries")
+@click.option(
+    "--db",
+    type=click.Path(dir_okay=False),
+    help="The SQLite store to export from. Defaults to $PYORCIDATOR_DICTIONARY_DB.",
+)
+def main(db):
+    """Export the curation dictionaries to their JSON files."""
+    if db is not None:
+        dicts.use_sqlite(db)
+    for key in dicts:
+        dicts.export_json(key)
+        click.echo(f"exported {len(dicts[key]):,} {key} labels")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Normalized and fuzzy label indexes for offline matching against the curation dictionaries."""
+
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from . import dicts
+
+__all__ = [
+    "LabelIndex",
+    "normalize_label",
+    "get_label_index",
+    "get_fuzzy_threshold",
+    "set_fuzzy_threshold",
+]
+
+#: Words dropped before matching, in the languages common in ORCID affiliations
+STOPWORDS = {
+    "a", "an", "and", "at", "da", "das", "de", "del", "der", "des", "di", "die", "do", "dos",
+    "du", "e", "et", "for", "fur", "in", "la", "le", "of", "the", "und", "y",
+}  # fmt: skip
+#: Abbreviations expanded before matching
+ABBREVIATIONS = {
+    "asst": "assistant",
+    "assoc": "associate",
+    "ctr": "center",
+    "centre": "center",
+    "dept": "department",
+    "inst": "institute",
+    "lab": "laboratory",
+    "natl": "national",
+    "prof": "professor",
+    "univ": "university",
+}
+#: Normalized place names dropped from the end of a label after a comma, e.g., in
+#: "Harvard University, USA". Other trailing segments, such as the campus in "University
+#: of California, Berkeley", are part of the name.
+PLACE_SUFFIXES = {
+    "argentina", "australia", "austria", "belgium", "brasil", "brazil", "canada", "chile",
+    "china", "colombia", "czech republic", "deutschland", "denmark", "england", "espana",
+    "finland", "france", "germany", "greece", "india", "ireland", "israel", "italia", "italy",
+    "japan", "korea", "mexico", "netherlands", "new zealand", "norway", "poland", "portugal",
+    "republic korea", "russia", "scotland", "south africa", "south korea", "spain", "sweden",
+    "switzerland", "uk", "united kingdom", "united states", "united states america", "us",
+    "usa", "wales",
+}  # fmt: skip
+#: The minimum similarity of a fuzzy match accepted without curation when fuzzy matching
+#: is switched on, see :func:`set_fuzzy_threshold`
+DEFAULT_THRESHOLD = 0.9
+NGRAM_SIZE = 3
+
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize_label(label: str) -> str:
+    """
+    Normalize a label for matching.
+
+    Applies Unicode NFKC, case folding and accent stripping, turns punctuation into
+    spaces, expands common abbreviations and drops stopwords, so that, e.g.,
+    "Univ. of São Paulo" and "University of Sao Paulo" get the same key.
+    """
+    text = _strip_accents(unicodedata.normalize("NFKC", label).casefold())
+    tokens = _PUNCTUATION.sub(" ", text).split()
+    return " ".join(ABBREVIATIONS.get(token, token) for token in tokens if token not in STOPWORDS)
+
+
+def _variants(label: str) -> List[str]:
+    """Get the normalized keys to try for a label, most specific first."""
+    rv = [normalize_label(label)]
+    head, _, tail = label.rpartition(",")
+    if head.strip() and normalize_label(tail) in PLACE_SUFFIXES:
+        rv.append(normalize_label(head))
+    return rv
+
+
+def _ngrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+class LabelIndex:
+    """
+    An index from normalized labels to QIDs with a character n-gram index for fuzzy matches.
+
+    Normalized keys that map to more than one QID are ambiguous and never matched.
+    """
+
+    def __init__(self, mapping: Optional[Mapping[str, str]] = None):
+        self._qids: Dict[str, Set[str]] = defaultdict(set)
+        self._labels: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._ngram_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mapping is not None:
+            for label, qid in mapping.items():
+                self.add(label, qid)
+
+    def add(self, label: str, qid: str) -> None:
+        """Add a label to the index."""
+        key = normalize_label(label)
+        if not key:
+            return
+        with self._lock:
+            self._qids[key].add(qid)
+            self._labels.setdefault(key, label)
+            if key not in self._ngram_counts:
+                ngrams = _ngrams(key)
+                self._ngram_counts[key] = len(ngrams)
+                for ngram in ngrams:
+                    self._postings[ngram].add(key)
+
+    def _unique_qid(self, key: str) -> Optional[str]:
+        qids = self._qids.get(key)
+        if qids is not None and len(qids) == 1:
+            return next(iter(qids))
+        return None
+
+    def lookup(self, label: str) -> Optional[str]:
+        """Find the QID of a label whose normalized form is in the index."""
+        for key in _variants(label):
+            qid = self._unique_qid(key)
+            if qid is not None:
+                return qid
+        return None
+
+    def candidates(self, label: str, limit: int = 5) -> List[Tuple[str, str, float]]:
+        """
+        Rank indexed labels by n-gram similarity to a label.
+
+        Returns:
+            Up to ``limit`` triples of QID, indexed label and Dice similarity, best first.
+            Ambiguous labels are left out.
+        """
+        key = normalize_label(label)
+        ngrams = _ngrams(key)
+        shared: Counter = Counter()
+        for ngram in ngrams:
+            shared.update(self._postings.get(ngram, ()))
+        scored = []
+        for other, count in shared.items():
+            qid = self._unique_qid(other)
+            if qid is None:
+                continue
+            score = 2 * count / (len(ngrams) + self._ngram_counts[other])
+            scored.append((qid, self._labels[other], score))
+        scored.sort(key=lambda triple: (-triple[2], triple[1]))
+        return scored[:limit]
+
+    def match(self, label: str, threshold: Optional[float] = None) -> Optional[str]:
+        """
+        Find the QID of a label by its normalized form.
+
+        Args:
+            label: The label to match
+            threshold: If given, the best fuzzy candidate is accepted if its similarity is
+                at least this. Near misses such as "Computational Biology" and "RNA
+                Computational Biology" are similar, so by default they are only offered
+                as :meth:`candidates` for curation.
+        """
+        qid = self.lookup(label)
+        if qid is not None or threshold is None:
+            return qid
+        for key in _variants(label):
+            best = self.candidates(key, limit=1)
+            if best and best[0][2] >= threshold:
+                return best[0][0]
+        return None
+
+
+_indexes: Dict[str, LabelIndex] = {}
+_indexes_lock = threading.Lock()
+_fuzzy_threshold: Optional[float] = None
+
+
+def get_fuzzy_threshold() -> Optional[float]:
+    """Get the similarity from which fuzzy dictionary matches are accepted, if switched on."""
+    return _fuzzy_threshold
+
+
+def set_fuzzy_threshold(threshold: Optional[float]) -> None:
+    """Set the similarity from which fuzzy matches are accepted. Pass None for exact ones only."""
+    global _fuzzy_threshold
+    _fuzzy_threshold = threshold
+
+
+def get_label_index(key: str) -> LabelIndex:
+    """Get the label index for a dictionary, building it on first use."""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = LabelIndex(dicts[key])
+        return index
+
+
+def clear_label_indexes(keys: Optional[Iterable[str]] = None) -> None:
+    """Drop the label indexes, e.g., after switching dictionary backends."""
+    with _indexes_lock:
+        for key in list(_indexes) if keys is None else keys:
+            _indexes.pop(key, None)
@@ -0,0 +1,75 @@
+"""Resolve labels missing from the curation dictionaries in bulk."""
+
+import logging
+from typing import Collection, Dict, Iterable, Mapping, Tuple
+
+from . import dicts, update_fields, update_institutions, update_roles
+from .index import get_fuzzy_threshold, get_label_index
+from .utils import lookup_labels
+from ..cache import CacheMiss
+
+__all__ = [
+    "SOURCES",
+    "resolve_missing_labels",
+]
+
+logger = logging.getLogger(__name__)
+
+#: The ancestor classes and SPARQL clause for the items of each dictionary,
+#: the same as used by its ``update-*`` command
+SOURCES: Mapping[str, Tuple[Collection[str], str]] = {
+    "fields": (update_fields.ANCESTORS, update_fields.CLAUSE),
+    "institutions": (update_institutions.ANCESTORS, update_institutions.CLAUSE),
+    "role": (update_roles.ANCESTORS, update_roles.CLAUSE),
+}
+
+
+def resolve_missing_labels(labels: Mapping[str, Iterable[str]]) -> Dict[str, Dict[str, str]]:
+    """
+    Look up labels missing from the curation dictionaries on Wikidata, in bulk.
+
+    Labels already in a dictionary or matched by its label index are skipped. The
+    others are matched exactly against labels and aliases of items in the dictionary's
+    ancestor classes, a chunk of labels per query. Unambiguous matches are added to the
+    dictionary, which is saved once. Ambiguous labels are left for interactive curation,
+    as are all labels when running offline without the query in the cache.
+
+    Args:
+        labels: A mapping from dictionary name (e.g., ``role``) to labels seen in a batch
+
+    Returns:
+        A mapping from dictionary name to the labels newly added to it, with their QIDs
+    """
+    rv = {}
+    threshold = get_fuzzy_threshold()
+    for key, key_labels in labels.items():
+        if key not in SOURCES:
+            continue
+        data = dicts[key]
+        index = get_label_index(key)
+        missing = {
+            label
+            for label in key_labels
+            if label not in data and index.match(label, threshold) is None
+        }
+        if not missing:
+            continue
+        parents, clause = SOURCES[key]
+        try:
+            found = lookup_labels(missing, parents=sorted(parents), clause=clause)
+        except CacheMiss:
+            # The query depends on which labels are still missing, so an offline rerun
+            # asks for fewer labels than the cached online run. They are left unresolved.
+            logger.info("not resolving %d missing %s labels offline", len(missing), key)
+            continue
+        logger.info(
+            "resolved %d of %d missing %s labels on Wikidata", len(found), len(missing), key
+        )
+        if not found:
+            continue
+        for label, qid in found.items():
+            data[label] = qid
+            index.add(label, qid)
+        dicts.save(key)
+        rv[key] = found
+    return rv
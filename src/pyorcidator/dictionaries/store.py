@@ -0,0 +1,147 @@
+"""An indexed SQLite backend for the curation dictionaries."""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, MutableMapping, Tuple, Union
+
+__all__ = [
+    "SQLiteDictionary",
+    "write_json",
+]
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS labels (
+    vocabulary TEXT NOT NULL,
+    label TEXT NOT NULL,
+    qid TEXT NOT NULL,
+    PRIMARY KEY (vocabulary, label)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    vocabulary TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+
+def write_json(path: Path, data: Iterable[Tuple[str, str]]) -> None:
+    """Write label/QID pairs in the sorted, indented JSON layout used for version control."""
+    path.write_text(json.dumps(dict(data), indent=2, sort_keys=True, ensure_ascii=False))
+
+
+class SQLiteDictionary(MutableMapping[str, str]):
+    """
+    A label to QID mapping for one vocabulary, stored in a SQLite table.
+
+    Lookups go through the primary key index and every insert is committed on
+    its own, so adding a label does not rewrite the whole vocabulary.
+    """
+
+    def __init__(self, path: Union[str, Path], vocabulary: str):
+        """
+        Open a vocabulary in a SQLite file, creating it if needed.
+
+        Args:
+            path: The path of the SQLite file. Several vocabularies can share one file.
+            vocabulary: The name of the vocabulary, e.g., ``role`` or ``institutions``
+        """
+        self.path = Path(path)
+        self.vocabulary = vocabulary
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def __getitem__(self, label: str) -> str:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT qid FROM labels WHERE vocabulary = ? AND label = ?",
+                (self.vocabulary, label),
+            ).fetchone()
+        if row is None:
+            raise KeyError(label)
+        return row[0]
+
+    def __setitem__(self, label: str, qid: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO labels VALUES (?, ?, ?)", (self.vocabulary, label, qid)
+            )
+
+    def __delitem__(self, label: str) -> None:
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM labels WHERE vocabulary = ? AND label = ?", (self.vocabulary, label)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(label)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT label FROM labels WHERE vocabulary = ? ORDER BY label", (self.vocabulary,)
+            ).fetchall()
+        return (label for (label,) in rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM labels WHERE vocabulary = ?", (self.vocabulary,)
+            ).fetchone()
+        return count
+
+    def __contains__(self, label: object) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM labels WHERE vocabulary = ? AND label = ?",
+                (self.vocabulary, label),
+            ).fetchone()
+        return row is not None
+
+    def update_many(self, items: Iterable[Tuple[str, str]]) -> None:
+        """Insert or replace many labels in a single transaction."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO labels VALUES (?, ?, ?)",
+                ((self.vocabulary, label, qid) for label, qid in items),
+            )
+
+    def sync_from_json(self, json_path: Path) -> bool:
+        """
+        Merge a JSON export into the store if it changed since the last merge.
+
+        Labels from the JSON file win over stored ones, so that updates made with
+        the ``update-*`` commands are picked up. Labels only in the store are kept.
+
+        Returns:
+            If the JSON file was merged
+        """
+        if not json_path.is_file():
+            return False
+        mtime = json_path.stat().st_mtime
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT mtime FROM sources WHERE vocabulary = ?", (self.vocabulary,)
+            ).fetchone()
+        if row is not None and row[0] >= mtime:
+            return False
+        self.update_many(json.loads(json_path.read_text()).items())
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?)", (self.vocabulary, mtime)
+            )
+        return True
+
+    def export_json(self, json_path: Path) -> None:
+        """Write the vocabulary as a JSON file for version control."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT label, qid FROM labels WHERE vocabulary = ?", (self.vocabulary,)
+            ).fetchall()
+        write_json(json_path, rows)
+        # The export matches the store, so it does not need merging back in
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?)",
+                (self.vocabulary, json_path.stat().st_mtime),
+            )
@@ -9,6 +9,8 @@ ANCESTORS = {
     "Q11862829": "academic discipline",
 }
 
+CLAUSE = "?item wdt:P31/wdt:P279* ?ancestor ."
+
 
 @click.command(name="update-fields")
 def main():
@@ -16,7 +18,7 @@ def main():
     update_curation_dictionary(
         parents=sorted(ANCESTORS),
         path=FIELDS_PATH,
-        clause="?item wdt:P31/wdt:P279* ?ancestor .",
+        clause=CLAUSE,
     )
 
 
@@ -9,6 +9,8 @@ ANCESTORS = {
     "Q4671277": "academic institution",
 }
 
+CLAUSE = "?item wdt:P31/wdt:P279* ?ancestor ."
+
 
 @click.command(name="update-institutions")
 def main():
@@ -16,7 +18,7 @@ def main():
     update_curation_dictionary(
         parents=sorted(ANCESTORS),
         path=INSTITUTIONS_PATH,
-        clause="?item wdt:P31/wdt:P279* ?ancestor .",
+        clause=CLAUSE,
     )
 
 
@@ -16,11 +16,13 @@ ANCESTORS = {
     "Q189533": "academic degree",
 }
 
+CLAUSE = "?item wdt:P279* ?ancestor ."
+
 
 @click.command(name="update-degrees")
 def main():
     """Update the degrees lookup able from Wikidata."""
-    update_curation_dictionary(parents=sorted(ANCESTORS), path=ROLE_PATH)
+    update_curation_dictionary(parents=sorted(ANCESTORS), path=ROLE_PATH, clause=CLAUSE)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,24 @@
 """Update the roles dictionary with from Wikidata."""
 
 import json
+from collections import defaultdict
 from pathlib import Path
-from typing import Union, Collection
+from typing import Collection, Dict, Iterable, Set, Union
 
 from textwrap import dedent
 
-from ..wikidata_lookup import query_wikidata
+from ..wikidata_lookup import chunked, query_wikidata
 
 __all__ = [
     "update_curation_dictionary",
+    "lookup_labels",
 ]
 
+#: Languages in which labels are matched by :func:`lookup_labels`
+LANGUAGES = ("en", "pt", "es", "de", "fr")
+#: The number of labels per query. Each label is sent once per language.
+LABEL_CHUNK_SIZE = 50
+
 
 def _removeprefix(s: str, prefix: str) -> str:
     if s.startswith(prefix):
@@ -50,3 +57,62 @@ def update_curation_dictionary(
     )
     curation_dictionary.update((label, qid) for label, qid in new_entries if label != qid)
     path.write_text(json.dumps(curation_dictionary, indent=2, sort_keys=True, ensure_ascii=False))
+
+
+def lookup_labels(
+    labels: Iterable[str],
+    parents: Union[str, Collection[str]],
+    clause: str = "?item wdt:P279* ?ancestor .",
+    languages: Collection[str] = LANGUAGES,
+    chunk_size: int = LABEL_CHUNK_SIZE,
+) -> Dict[str, str]:
+    """
+    Look up items by exact label or alias, in chunked VALUES queries.
+
+    Args:
+        labels: The labels to look up
+        parents: The ancestor classes the items must belong to, as in
+            :func:`update_curation_dictionary`
+        clause: The SPARQL clause relating ``?item`` to ``?ancestor``
+        languages: The languages in which labels and aliases are matched
+        chunk_size: The maximum number of labels per query
+
+    Returns:
+        A mapping from each label that matches exactly one item to its QID.
+        Ambiguous labels and labels without matches are left out.
+    """
+    if isinstance(parents, str):
+        parents = [parents]
+    ancestors = " ".join(f"wd:{v}" for v in parents)
+    # ORCID labels often carry stray whitespace, which Wikidata labels do not
+    originals: Dict[str, Set[str]] = defaultdict(set)
+    for label in labels:
+        if label.strip():
+            originals[label.strip()].add(label)
+    matches: Dict[str, Set[str]] = defaultdict(set)
+    for chunk in chunked(sorted(originals), chunk_size):
+        values = " ".join(
+            f"({literal} {literal}@{language})"
+            for literal in (json.dumps(label, ensure_ascii=False) for label in chunk)
+            for language in languages
+        )
+        query = dedent(
+            f"""\
+            SELECT DISTINCT ?string ?item
+            WHERE {{
+                VALUES (?string ?label) {{ {values} }}
+                VALUES ?ancestor {{ {ancestors} }}
+                ?item rdfs:label|skos:altLabel ?label .
+                {clause}
+            }}
+        """
+        )
+        for record in query_wikidata(query):
+            qid = _removeprefix(record["item"]["value"], "http://www.wikidata.org/entity/")
+            matches[record["string"]["value"]].add(qid)
+    return {
+        original: next(iter(qids))
+        for label, qids in matches.items()
+        if len(qids) == 1
+        for original in originals[label]
+    }
@@ -6,27 +6,59 @@ import datetime
 import json
 import logging
 import re
-from typing import Dict, List, Mapping, Optional, Tuple, Union
-import pydantic
-import requests
-from quickstatements_client import (
-    CreateLine,
-    DateQualifier,
-    EntityLine,
-    EntityQualifier,
-    Line,
-    Qualifier,
-    TextLine,
-    TextQualifier,
-    render_lines,
+import threading
+from collections import defaultdict
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
 )
-from wdcuration import add_key
 
-from .classes import AffiliationEntry
-from .dictionaries import dicts, stem_to_path
-from .wikidata_lookup import query_wikidata
+from .cache import CacheMiss, get_record_cache
+from .classes import AffiliationEntry, BatchResolution
+from .concurrency import map_ordered
+from .delta import drop_existing, lookup_existing_claims
+from .dictionaries import dicts
+from .dictionaries.index import get_fuzzy_threshold, get_label_index
+from .dictionaries.resolve import resolve_missing_labels
+from .http_client import get_client
+from .metrics import count, span, timed
+from .pending import echo_candidates, get_pending_queue
+from .state import get_last_modified, get_state_store
+from .statements import (
+    QID_REGEX,
+    Qualifier,
+    Statement,
+    date_qualifier,
+    entity_qualifier,
+    render_statements,
+    text_qualifier,
+)
+from .wikidata_lookup import chunked, query_wikidata
 
 logger = logging.getLogger(__name__)
+
+#: The number of identifiers sent to Wikidata in a single VALUES clause
+BATCH_SIZE = 200
+#: DOIs are long, so fewer of them fit in a single VALUES clause
+DOI_CHUNK_SIZE = 100
+#: The number of DOI chunks looked up at the same time
+DOI_WORKERS = 4
+
+#: The parts of an ORCID record that statements are built from
+RECORD_KEYS = ("person", "activities-summary")
+
+#: Guards interactive curation so that concurrent workers prompt one at a time. Hold it
+#: while reading from the terminal elsewhere, so prompts do not interleave.
+CURATION_LOCK = threading.RLock()
+
 EXTERNAL_ID_PROPERTIES = {
     "Loop profile": "P2798",
     "Scopus Author ID": "P1153",
@@ -36,6 +68,13 @@ EXTERNAL_ID_PROPERTIES = {
     "twitter": "P2002",
     "scopus": "P1153",
 }
+#: Wikidata properties for the organization identifiers used by ORCID disambiguation
+ORGANIZATION_ID_PROPERTIES = {
+    "GRID": "P2427",
+    "ROR": "P6782",
+}
+#: The prefix of ROR identifiers given as URLs
+ROR_PREFIX = "https://ror.org/"
 HTTP_REGEX = "(https?:\/\/)?"
 PREFIXES = [
     ("github", "github.com/"),
@@ -60,27 +99,273 @@ def get_external_ids(data) -> Mapping[str, str]:
     return rv
 
 
-def render_orcid_qs(orcid: str) -> str:
+def render_orcid_qs(
+    orcid: str,
+    researcher_qid: Optional[str] = None,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> str:
     """
     Import info from ORCID for Wikidata.
 
     Args:
         orcid: The ORCID of the researcher to reconcile to Wikidata.
+        researcher_qid: The QID of the researcher, if already known. Use "LAST"
+            to create a new item.
+        delta: If statements already on Wikidata are left out.
+        fetch: The function getting the ORCID record, by default :func:`get_orcid_data`.
+    """
+    data = fetch(orcid) if fetch is not None else None
+    lines = get_orcid_quickstatements(orcid, researcher_qid, data=data)
+    if delta:
+        lines = drop_existing(lines, lookup_existing_claims(lines))
+    with span("render_lines"):
+        return render_statements(lines)
+
+
+def render_orcids_qs(
+    orcids: Iterable[str],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> Iterator[str]:
+    """
+    Import info from ORCID for Wikidata for several researchers at once.
+
+    Args:
+        orcids: The ORCIDs of the researchers to reconcile to Wikidata.
+        workers: The number of researchers processed concurrently.
+        batch_size: The number of researchers whose QIDs are resolved together.
+        delta: If statements already on Wikidata are left out.
+        fetch: The function getting the ORCID record of a researcher, by default
+            :func:`get_orcid_data`
+
+    Yields:
+        The rendered QuickStatements of each researcher, ending with a newline, in the
+        same order as the input.
+    """
+    results = iter_orcids_qs(
+        orcids, workers=workers, batch_size=batch_size, delta=delta, fetch=fetch
+    )
+    for _, qs in results:
+        yield qs
+
+
+def iter_orcids_qs(
+    orcids: Iterable[str],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    catch_errors: bool = False,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> Iterator[Tuple[str, Union[str, Exception]]]:
+    """
+    Import info from ORCID for Wikidata for several researchers, paired with their ORCIDs.
+
+    Args:
+        orcids: The ORCIDs of the researchers to reconcile to Wikidata.
+        workers: The number of researchers processed concurrently.
+        batch_size: The number of researchers whose QIDs are resolved together.
+        catch_errors: If a researcher that cannot be fetched or rendered is yielded with
+            the error instead of aborting. If the QIDs of a batch cannot be resolved, all
+            of its researchers are yielded with the error.
+        delta: If statements already on Wikidata are left out. The claims of all
+            researchers in a batch are checked together.
+        fetch: The function getting the ORCID record of a researcher, by default
+            :func:`get_orcid_data`. Records are fetched for a batch at a time.
+
+    Yields:
+        Pairs of ORCID and rendered QuickStatements, or the error, in the same order
+        as the input. If a state store is configured (see :mod:`pyorcidator.state`),
+        researchers that have not changed since the last run get empty QuickStatements,
+        and the others are recorded in it once their whole batch is consumed.
     """
-    return render_lines(get_orcid_quickstatements(orcid), newline="\n")
+    store = get_state_store()
+    if fetch is None:
+        fetch = get_orcid_data
+
+    def _call(func, *args):
+        if not catch_errors:
+            return func(*args)
+        try:
+            return func(*args)
+        except Exception as e:
+            logger.warning("failed to process %s: %s", args[0], e)
+            return e
+
+    def _fetch_record(orcid: str) -> Dict:
+        return _check_record(orcid, fetch(orcid))
+
+    for batch in chunked(orcids, batch_size):
+        # A record that cannot be fetched or is not a record only fails its own ORCID,
+        # since the records that are resolved together must all be valid
+        records = list(map_ordered(lambda orcid: _call(_fetch_record, orcid), batch, workers))
+        if store is not None:
+            # Unchanged records are skipped before anything is resolved for them
+            records = [
+                None if isinstance(data, dict) and store.is_unchanged(orcid, data) else data
+                for orcid, data in zip(batch, records)
+            ]
+        fetched = [(orcid, data) for orcid, data in zip(batch, records) if isinstance(data, dict)]
+        resolution = (
+            _call(resolve_batch, [orcid for orcid, _ in fetched], [data for _, data in fetched])
+            if fetched
+            else BatchResolution()
+        )
+
+        def _lines(orcid: str, data: Dict) -> List[Statement]:
+            return get_orcid_quickstatements(orcid, data=data, resolution=resolution)
+
+        def _lines_or_error(orcid_and_data: Tuple[str, Union[None, Dict, Exception]]):
+            orcid, data = orcid_and_data
+            if data is None or isinstance(data, Exception):
+                return data
+            if isinstance(resolution, Exception):
+                return resolution
+            return _call(_lines, orcid, data)
+
+        results = list(map_ordered(_lines_or_error, zip(batch, records), workers=workers))
+        if delta:
+            # One set of queries checks the claims of the whole batch
+            existing = _call(
+                _lookup_existing_claims, batch, [r for r in results if isinstance(r, list)]
+            )
+            for i, result in enumerate(results):
+                if isinstance(result, list):
+                    results[i] = (
+                        existing
+                        if isinstance(existing, Exception)
+                        else drop_existing(result, existing)
+                    )
+
+        def _render(orcid: str, lines: List[Statement]) -> str:
+            with span("render_lines", orcid=orcid):
+                # Ends with a newline, so the output of researchers can be concatenated
+                return render_statements(lines) + "\n"
+
+        updates = []
+        for orcid, data, lines in zip(batch, records, results):
+            if lines is None:
+                yield orcid, ""
+                continue
+            qs = lines if isinstance(lines, Exception) else _call(_render, orcid, lines)
+            if store is None or isinstance(qs, Exception):
+                yield orcid, qs
+                continue
+            updates.append((orcid, get_last_modified(data), qs))
+            yield orcid, "" if store.is_same_output(orcid, qs) else qs
+        if updates:
+            # Only recorded once the consumer is done with the batch, e.g., has written it
+            store.put_many(updates)
+
+
+def _check_record(orcid: str, data) -> Dict:
+    if not isinstance(data, dict) or any(key not in data for key in RECORD_KEYS):
+        raise ValueError(f"not an ORCID record for {orcid}: {str(data)[:200]}")
+    return data
+
+
+def _lookup_existing_claims(orcids: List[str], lines_list: List[List[Statement]]) -> Set:
+    return lookup_existing_claims(line for lines in lines_list for line in lines)
+
+
+@timed("resolve_batch")
+def resolve_batch(orcids: List[str], records: List[Dict]) -> BatchResolution:
+    """
+    Resolve the QIDs needed by a batch of ORCID records with a few bulk queries.
+
+    Args:
+        orcids: The ORCIDs of the researchers in the batch
+        records: The ORCID records of the researchers, in the same order
+
+    Returns:
+        The QIDs of the researchers, of all disambiguated organizations they are
+        affiliated with, and of their papers. Roles, fields and institution names
+        missing from the curation dictionaries are looked up on Wikidata and added
+        to the dictionaries along the way.
+    """
+    affiliation_data = [entry for data in records for entry in _iter_affiliation_data(data)]
+    # DOIs shared by coauthors in the same batch are looked up only once
+    dois = {
+        doi
+        for data in records
+        for doi in get_paper_dois(data["activities-summary"]["works"]["group"])
+    }
+    organizations = lookup_organization_ids(get_organization_ids(affiliation_data))
+    resolve_missing_labels(get_curation_labels(records, organizations))
+    return BatchResolution(
+        researchers=lookup_ids(orcids, property="P496"),
+        organizations=organizations,
+        papers=get_paper_qids(dois),
+    )
+
+
+def get_curation_labels(
+    records: Iterable[Dict], organization_qids: Mapping[Tuple[str, str], str]
+) -> Dict[str, Set[str]]:
+    """
+    Get the labels that ORCID records will look up in the curation dictionaries.
+
+    Args:
+        records: ORCID records
+        organization_qids: The QIDs of disambiguated organizations, as returned by
+            :func:`lookup_organization_ids`
+
+    Returns:
+        A mapping from dictionary name to the keywords, role titles and names of
+        institutions that are not resolved by their GRID or ROR identifier
+    """
+    rv: Dict[str, Set[str]] = defaultdict(set)
+    for data in records:
+        rv["fields"].update(_split_keywords(data["person"]["keywords"]["keyword"]))
+        for data_entry in _iter_affiliation_data(data):
+            if data_entry["role-title"] is not None:
+                rv["role"].add(data_entry["role-title"])
+            organization_id = get_organization_id(data_entry["organization"])
+            # Mirrors get_institution_qid: unresolved organizations are looked up by name
+            if organization_id is None or organization_id not in organization_qids:
+                rv["institutions"].add(data_entry["organization"]["name"])
+    return rv
+
+
+def _iter_affiliation_data(data) -> Iterator[Dict]:
+    activities = data["activities-summary"]
+    yield from activities["employments"]["employment-summary"]
+    yield from activities["educations"]["education-summary"]
 
 
 def _get_orcid_qualifier(orcid: str) -> Qualifier:
-    return TextQualifier(predicate="S854", target=f"https://orcid.org/{orcid}")
+    return text_qualifier("S854", f"https://orcid.org/{orcid}")
 
 
-def get_orcid_quickstatements(orcid: str) -> List[Line]:
-    """Get a list of quickstatement line objects."""
-    data = get_orcid_data(orcid)
+@timed("get_orcid_quickstatements", per_orcid=True)
+def get_orcid_quickstatements(
+    orcid: str,
+    researcher_qid: Optional[str] = None,
+    *,
+    data: Optional[Dict] = None,
+    resolution: Optional[BatchResolution] = None,
+) -> List[Statement]:
+    """
+    Get a list of quickstatement line objects.
 
-    researcher_qid = lookup_id(orcid, property="P496", default="LAST")
+    Args:
+        orcid: The ORCID of the researcher to reconcile to Wikidata.
+        researcher_qid: The QID of the researcher, if already known.
+        data: The ORCID record of the researcher, if already fetched.
+        resolution: The QIDs resolved in bulk for the batch this researcher belongs to.
+    """
+    if data is None:
+        data = get_orcid_data(orcid)
+
+    if researcher_qid is None and resolution is not None:
+        researcher_qid = resolution.researchers.get(orcid, "LAST")
+    if researcher_qid is None:
+        researcher_qid = lookup_id(orcid, property="P496", default="LAST")
+    organization_qids = resolution.organizations if resolution is not None else None
 
-    lines: List[Line] = get_base_qs(orcid, data, researcher_qid)
+    lines: List[Statement] = get_base_qs(orcid, data, researcher_qid)
 
     keyword_data = data["person"]["keywords"]["keyword"]
     if len(keyword_data) > 0:
@@ -94,7 +379,7 @@ def get_orcid_quickstatements(orcid: str) -> List[Line]:
         )
 
     employment_data = data["activities-summary"]["employments"]["employment-summary"]
-    employment_entries = get_affiliation_info(employment_data)
+    employment_entries = get_affiliation_info(employment_data, organization_qids, orcid=orcid)
     lines.extend(
         process_affiliation_entries(
             orcid=orcid,
@@ -106,7 +391,7 @@ def get_orcid_quickstatements(orcid: str) -> List[Line]:
     )
 
     education_data = data["activities-summary"]["educations"]["education-summary"]
-    education_entries = get_affiliation_info(education_data)
+    education_entries = get_affiliation_info(education_data, organization_qids, orcid=orcid)
     lines.extend(
         process_affiliation_entries(
             orcid=orcid,
@@ -126,6 +411,7 @@ def get_orcid_quickstatements(orcid: str) -> List[Line]:
                 researcher_qid=researcher_qid,
                 paper_dois=papers_entries,
                 property_id="P50",
+                paper_qids=resolution.papers if resolution is not None else None,
             )
         )
 
@@ -135,78 +421,139 @@ def get_orcid_quickstatements(orcid: str) -> List[Line]:
         if predicate is None:
             continue
         lines.append(
-            TextLine(
-                subject=researcher_qid,
-                predicate=predicate,
-                target=value,
-                qualifiers=[_get_orcid_qualifier(orcid)],
-            )
+            Statement.text(researcher_qid, predicate, value, (_get_orcid_qualifier(orcid),))
         )
 
     return lines
 
 
-def get_base_qs(orcid, data, researcher_qid) -> List[Line]:
+def get_base_qs(orcid, data, researcher_qid) -> List[Statement]:
     """Returns the first lines for the new Quickstatements"""
     quickstatements = []
     if researcher_qid == "LAST":
-        quickstatements.append(CreateLine())
+        quickstatements.append(Statement.create())
         first_name = data["person"]["name"]["given-names"]["value"]
         last_name = data["person"]["name"]["family-name"]["value"]
-        quickstatements.append(
-            TextLine(subject=researcher_qid, predicate="Len", target=f"{first_name} {last_name}")
-        )
-        quickstatements.append(
-            TextLine(subject=researcher_qid, predicate="Den", target="researcher")
-        )
-    qualifiers = [_get_orcid_qualifier(orcid)]
-    quickstatements.append(
-        EntityLine(subject=researcher_qid, predicate="P31", target="Q5", qualifiers=qualifiers)
-    )
-    quickstatements.append(
-        EntityLine(
-            subject=researcher_qid, predicate="P106", target="Q1650915", qualifiers=qualifiers
-        )
-    )
-    quickstatements.append(
-        TextLine(subject=researcher_qid, predicate="P496", target=orcid, qualifiers=qualifiers)
-    )
+        quickstatements.append(Statement.text(researcher_qid, "Len", f"{first_name} {last_name}"))
+        quickstatements.append(Statement.text(researcher_qid, "Den", "researcher"))
+    qualifiers = (_get_orcid_qualifier(orcid),)
+    quickstatements.append(Statement.entity(researcher_qid, "P31", "Q5", qualifiers))
+    quickstatements.append(Statement.entity(researcher_qid, "P106", "Q1650915", qualifiers))
+    quickstatements.append(Statement.text(researcher_qid, "P496", orcid, qualifiers))
     return quickstatements
 
 
+@timed("get_orcid_data", per_orcid=True)
 def get_orcid_data(orcid):
-    """Pulls data from the ORCID API"""
+    """
+    Pulls data from the ORCID API
+
+    If a record cache is configured (see :func:`pyorcidator.cache.configure_record_cache`),
+    fresh records are served from it and stale ones are revalidated with their ETag
+    or Last-Modified header.
+    """
     # From https://pub.orcid.org/v3.0/#!/Public_API_v2.0/viewRecord
-    url = "https://pub.orcid.org/v2.0/"
+    client = get_client()
+    return get_orcid_json(f"{client.orcid_api_url}{orcid}", orcid)
+
+
+def get_record_orcid(data: Dict, default: str = "") -> str:
+    """Get the ORCID a record is for from its identifier, or the default if it has none."""
+    identifier = data.get("orcid-identifier") or {}
+    return identifier.get("path") or default
+
+
+def get_orcid_json(url: str, key: str):
+    """
+    Get a JSON response from the ORCID API, through the record cache if one is configured.
+
+    Args:
+        url: The URL of the record or of a part of it
+        key: The key of the response in the record cache
+    """
+    client = get_client()
     header = {"Accept": "application/json"}
-    r = requests.get(f"{url}{orcid}", headers=header)
+    cache = get_record_cache()
+    entry = cache.get(key) if cache is not None else None
+    if entry is not None and cache.is_fresh(entry):
+        count("orcid_record_cache_hits")
+        return entry.value
+    if cache is not None and cache.offline:
+        raise CacheMiss(f"ORCID record {key} is not in the cache at {cache.path}")
+    if entry is not None and entry.etag:
+        header["If-None-Match"] = entry.etag
+    if entry is not None and entry.last_modified:
+        header["If-Modified-Since"] = entry.last_modified
+    r = client.get(url, headers=header)
+    if r.status_code == 304 and entry is not None:
+        count("orcid_record_cache_revalidated")
+        cache.touch(key)
+        return entry.value
+    if not r.ok:
+        # e.g., a 404 with a JSON error for an unknown or deactivated ORCID
+        r.raise_for_status()
     data = r.json()
+    if cache is not None:
+        cache.put(
+            key,
+            data,
+            etag=r.headers.get("ETag"),
+            last_modified=r.headers.get("Last-Modified"),
+        )
     return data
 
 
-def get_qid_for_item(key: str, name: str) -> Optional[str]:
+@timed("dictionary_lookup")
+def get_qid_for_item(key: str, name: str, orcid: Optional[str] = None) -> Optional[str]:
     """
     Looks up the qid given a key using global dict of dicts.
-    If it is not present, it lets the user update the dict.
+    If it is not present, it tries normalized matches against the dict's label
+    index, and fuzzy ones if switched on, and then lets the user update the dict,
+    showing similar labels. In non-interactive mode (see :mod:`pyorcidator.pending`),
+    the name is queued instead.
 
     Args:
         key (str): The stem f the file path (e.g., `role` for
         `role.json`, `institutions` for `institutions.json`)
         name: The string to lookup in the dict
+        orcid: The ORCID of the record the name comes from, kept as an example
+            when the name is queued
 
     Returns:
-        qid:str
+        qid:str, or None if the name could not be resolved
     """
     data = dicts[key]
     if name in data:
+        count("dictionary_lookups", dictionary=key, result="exact")
         return data[name]
-    add_key(data, name)
-    qid = data.get(name)
-    if qid:
-        stem_to_path[key].write_text(json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False))
+    qid = get_label_index(key).match(name, threshold=get_fuzzy_threshold())
+    if qid is not None:
+        logger.info("matched %s %r to %s offline", key, name, qid)
+        count("dictionary_lookups", dictionary=key, result="index")
+        return qid
+    queue = get_pending_queue()
+    if queue is not None:
+        queue.record(key, name, orcid)
+        count("dictionary_lookups", dictionary=key, result="pending")
+        return None
+    count("dictionary_lookups", dictionary=key, result="curated")
+    with CURATION_LOCK:
+        # Another worker may have curated the same name while we were waiting
+        if name in data:
+            return data[name]
+        # wdcuration pulls in pandas, so it is only imported when curating interactively
+        from wdcuration import add_key
+
+        echo_candidates(key, name)
+        add_key(data, name)
+        qid = data.get(name)
+        if qid:
+            dicts.save(key)
+            get_label_index(key).add(name, qid)
     return qid
 
 
+@timed("lookup_id")
 def lookup_id(id, property, default):
     """
     Looks up a foreign ID on Wikidata based on its specific property.
@@ -226,16 +573,121 @@ def lookup_id(id, property, default):
         return default
 
 
-def get_organization_list(data):
+@timed("lookup_ids")
+def lookup_ids(ids: Iterable[str], property: str, chunk_size: int = BATCH_SIZE) -> Dict[str, str]:
+    """
+    Looks up many foreign IDs on Wikidata at once based on their specific property.
+
+    The IDs are sent in chunked VALUES queries, so resolving N IDs takes
+    N / chunk_size queries instead of N.
+
+    Args:
+        ids: The foreign IDs to look up
+        property: The Wikidata property for the foreign ID (e.g., P496 for ORCID)
+        chunk_size: The maximum number of IDs per query
+
+    Returns:
+        A mapping from foreign ID to QID. As in :func:`lookup_id`, IDs that match
+        no item or more than one item are left out.
+    """
+    matches: Dict[str, Set[str]] = defaultdict(set)
+    for chunk in chunked(sorted(set(ids)), chunk_size):
+        values = " ".join(json.dumps(id) for id in chunk)
+        query = f"""\
+            SELECT ?id ?item
+            WHERE
+            {{
+                VALUES ?id {{ {values} }}
+                ?item wdt:{property} ?id .
+            }}
+        """
+        for binding in query_wikidata(query):
+            matches[binding["id"]["value"]].add(binding["item"]["value"].split("/")[-1])
+    return {id: qids.pop() for id, qids in matches.items() if len(qids) == 1}
+
+
+def get_organization_id(organization) -> Optional[Tuple[str, str]]:
+    """
+    Get the disambiguated identifier of an organization on ORCID.
+
+    Returns:
+        A pair of the disambiguation source (e.g., GRID or ROR) and the identifier as stored
+        on Wikidata, or None if the organization is not disambiguated with a source that
+        has a Wikidata property.
+    """
+    disambiguated = organization["disambiguated-organization"]
+    if not disambiguated:
+        return None
+    source = disambiguated.get("disambiguation-source")
+    if source not in ORGANIZATION_ID_PROPERTIES:
+        return None
+    identifier = disambiguated["disambiguated-organization-identifier"]
+    if source == "ROR" and identifier.startswith(ROR_PREFIX):
+        identifier = identifier[len(ROR_PREFIX) :]
+    return source, identifier
+
+
+def get_organization_ids(data) -> List[Tuple[str, str]]:
+    """Get the disambiguated identifiers of the organizations in employment or education summaries."""
+    rv = []
+    for data_entry in data:
+        organization_id = get_organization_id(data_entry["organization"])
+        if organization_id is not None:
+            rv.append(organization_id)
+    return rv
+
+
+@timed("lookup_organization_ids")
+def lookup_organization_ids(
+    organization_ids: Iterable[Tuple[str, str]], chunk_size: int = BATCH_SIZE
+) -> Dict[Tuple[str, str], str]:
+    """
+    Looks up many disambiguated organizations on Wikidata at once.
+
+    GRID and ROR identifiers are resolved together in chunked VALUES queries.
+
+    Args:
+        organization_ids: Pairs of disambiguation source and identifier, as returned by
+            :func:`get_organization_id`
+        chunk_size: The maximum number of identifiers per query
+
+    Returns:
+        A mapping from (source, identifier) pairs to QIDs. Identifiers that match no item
+        or more than one item are left out.
+    """
+    source_for_property = {prop: source for source, prop in ORGANIZATION_ID_PROPERTIES.items()}
+    matches: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+    for chunk in chunked(sorted(set(organization_ids)), chunk_size):
+        values = " ".join(
+            f"(wdt:{ORGANIZATION_ID_PROPERTIES[source]} {json.dumps(identifier)})"
+            for source, identifier in chunk
+        )
+        query = f"""\
+            SELECT ?property ?id ?item
+            WHERE
+            {{
+                VALUES (?property ?id) {{ {values} }}
+                ?item ?property ?id .
+            }}
+        """
+        for binding in query_wikidata(query):
+            source = source_for_property[binding["property"]["value"].split("/")[-1]]
+            qid = binding["item"]["value"].split("/")[-1]
+            matches[source, binding["id"]["value"]].add(qid)
+    return {key: qids.pop() for key, qids in matches.items() if len(qids) == 1}
+
+
+def get_organization_list(data, organization_qids: Optional[Mapping[Tuple[str, str], str]] = None):
     organization_list = []
     for a in data:
         a = a["organization"]
         name = a["name"]
-        if a["disambiguated-organization"] is not None:
-            if a["disambiguated-organization"]["disambiguation-source"] == "GRID":
-                grid = a["disambiguated-organization"]["disambiguated-organization-identifier"]
-                id = lookup_id(grid, "P2427", name)
-                name = id
+        organization_id = get_organization_id(a)
+        if organization_id is not None and organization_id[0] == "GRID":
+            if organization_qids is None:
+                name = lookup_id(organization_id[1], "P2427", name)
+            else:
+                name = organization_qids.get(organization_id, name)
         organization_list.append(name)
     return organization_list
 
@@ -267,23 +719,37 @@ def get_date(
         return datetime.datetime(year=year, month=1, day=1), 9
 
 
-def get_affiliation_info(data) -> List[AffiliationEntry]:
+def get_affiliation_info(
+    data,
+    organization_qids: Optional[Mapping[Tuple[str, str], str]] = None,
+    orcid: Optional[str] = None,
+) -> List[AffiliationEntry]:
     """
     Parses ORCID data and returns a list of AffiliationEntry objects.
+
+    Args:
+        data: The employment or education summaries of an ORCID record
+        organization_qids: The QIDs of disambiguated organizations, as returned by
+            :func:`lookup_organization_ids`. If not given, each organization is looked up
+            separately.
+        orcid: The ORCID of the record, kept as an example for unresolved labels
     """
+    if organization_qids is None:
+        organization_qids = lookup_organization_ids(get_organization_ids(data))
+
     organization_list = []
 
     for data_entry in data:
         title = data_entry["role-title"]
         if title is not None:
-            role_qid = get_qid_for_item("role", title)
+            role_qid = get_qid_for_item("role", title, orcid=orcid)
         else:
             role_qid = None
         start_date, start_date_precision = get_date(data_entry, "start")
         end_date, end_date_precision = get_date(data_entry, "end")
         data_entry = data_entry["organization"]
         name = data_entry["name"]
-        institution_qid = get_institution_qid(data_entry, name)
+        institution_qid = get_institution_qid(data_entry, name, organization_qids, orcid=orcid)
 
         entry = AffiliationEntry(
             role=role_qid,
@@ -299,43 +765,52 @@ def get_affiliation_info(data) -> List[AffiliationEntry]:
     return organization_list
 
 
-def process_keyword_entries(
-    orcid: str, researcher_qid: str, keyword_data: List, property_id: str
-) -> List[EntityLine]:
+def _split_keywords(keyword_data: List) -> List[str]:
+    """Get the fields of work in ORCID keywords, some of which are lists separated by semicolons."""
     fields = [keyword["content"] for keyword in keyword_data]
-    field_of_work_list = []
+    rv = []
     for field in fields:
         if ";" in field:
             fields.extend(field.split(";"))
             continue
-        qualifiers = [_get_orcid_qualifier(orcid)]
+        rv.append(field)
+    return rv
 
-        field_qid = get_qid_for_item("fields", field)
 
-        entry = EntityLine(
-            subject=researcher_qid, predicate=property_id, target=field_qid, qualifiers=qualifiers
-        )
+def process_keyword_entries(
+    orcid: str, researcher_qid: str, keyword_data: List, property_id: str
+) -> List[Statement]:
+    field_of_work_list = []
+    qualifiers = (_get_orcid_qualifier(orcid),)
+    for field in _split_keywords(keyword_data):
+        field_qid = get_qid_for_item("fields", field, orcid=orcid)
+        if field_qid is None:
+            continue
+
+        entry = Statement.entity(researcher_qid, property_id, field_qid, qualifiers)
 
         field_of_work_list.append(entry)
 
     return field_of_work_list
 
 
-def get_institution_qid(data_entry, name) -> Optional[str]:
+def get_institution_qid(
+    data_entry,
+    name,
+    organization_qids: Optional[Mapping[Tuple[str, str], str]] = None,
+    orcid: Optional[str] = None,
+) -> Optional[str]:
     """Gets the QID for an academic institution"""
 
-    # Tries to get it from GRID: Global Research Identifier Database
-    if (
-        data_entry["disambiguated-organization"]
-        and "disambiguation-source" in data_entry["disambiguated-organization"]
-        and data_entry["disambiguated-organization"].get("disambiguation-source") == "GRID"
-    ):
-        grid = data_entry["disambiguated-organization"]["disambiguated-organization-identifier"]
-        institution_qid = lookup_id(grid, "P2427", name)
-    else:
-        # Gets the QID from the controlled vocabullary dict
-        institution_qid = get_qid_for_item("institutions", name)
-    return institution_qid
+    # Tries to get it from GRID (Global Research Identifier Database) or ROR
+    organization_id = get_organization_id(data_entry)
+    if organization_id is not None:
+        if organization_qids is None:
+            organization_qids = lookup_organization_ids([organization_id])
+        if organization_id in organization_qids:
+            return organization_qids[organization_id]
+    # Gets the QID from the controlled vocabullary dict, e.g., for GRID IDs not on Wikidata
+    return get_qid_for_item("institutions", name, orcid=orcid)
 
 
 def process_affiliation_entries(
@@ -345,34 +820,33 @@ def process_affiliation_entries(
     affiliation_entries: List[AffiliationEntry],
     property_id: str,
     role_property_id: str,
-) -> List[Line]:
+) -> List[Statement]:
     """
     From a list of EducationEntry objects, renders quickstatements for the QID.
     """
     # Quickstatements fails in the case of same institution for multliple roles.
     # See https://www.wikidata.org/wiki/Help:QuickStatements#Limitation
     rv = []
+    orcid_qualifier = _get_orcid_qualifier(orcid)
     for entry in affiliation_entries:
-        qualifiers = [_get_orcid_qualifier(orcid)]
+        if entry.institution is None:
+            # e.g., queued for curation in non-interactive mode
+            continue
+        if not QID_REGEX.match(entry.institution):
+            # e.g., a dictionary entry curated with a name instead of a QID
+            logger.warning("ungrounded institution: %s", entry.institution)
+            continue
+        qualifiers = [orcid_qualifier]
         if entry.role and entry.role.lower() != "none":
             if re.match(r"^[PQS]\d+$", entry.role):
-                qualifiers.append(EntityQualifier(predicate=role_property_id, target=entry.role))
+                qualifiers.append(entity_qualifier(role_property_id, entry.role))
             else:
                 logger.warning("ungrounded role: %s", entry.role)
         if entry.start_date:
-            qualifiers.append(
-                DateQualifier.start_time(entry.start_date, precision=entry.start_date_precision)
-            )
+            qualifiers.append(date_qualifier("P580", entry.start_date, entry.start_date_precision))
             if entry.end_date:
-                qualifiers.append(
-                    DateQualifier.end_time(entry.end_date, precision=entry.end_date_precision)
-                )
-        line = EntityLine(
-            subject=subject_qid,
-            predicate=property_id,
-            target=entry.institution,
-            qualifiers=qualifiers,
-        )
+                qualifiers.append(date_qualifier("P582", entry.end_date, entry.end_date_precision))
+        line = Statement.entity(subject_qid, property_id, entry.institution, tuple(qualifiers))
         rv.append(line)
     return rv
 
@@ -388,46 +862,86 @@ def get_paper_dois(group_of_works_from_orcid: List[Dict]) -> List[str]:
     return dois
 
 
-def get_paper_qids(papers_dois: List[str]) -> List[str]:
-    """Get QIDs for list of DOIs"""
+@timed("get_paper_qids")
+def get_paper_qids(
+    papers_dois: Iterable[str], chunk_size: int = DOI_CHUNK_SIZE, workers: int = DOI_WORKERS
+) -> Dict[str, str]:
+    """
+    Get QIDs for list of DOIs
 
-    filtered_list_of_dois = [a for a in papers_dois if a[0:3] == "10."]
-    print(filtered_list_of_dois)
-    doi_values = " ".join(f"'{doi.upper()}'" for doi in filtered_list_of_dois)
+    The DOIs are deduplicated and split into chunks that are queried concurrently,
+    so that prolific authors do not hit the query size and time limits of WDQS.
 
-    query = f"""\
-        SELECT ?item
-        WHERE
-        {{
-            VALUES ?doi {{{doi_values}}}
-            ?itemURL wdt:P356 ?doi .
-            BIND(REPLACE(STR(?itemURL), "http://www.wikidata.org/entity/", "") AS ?item)
-        }}
-    """
+    Args:
+        papers_dois: The DOIs to look up, as given on ORCID
+        chunk_size: The maximum number of DOIs per query
+        workers: The maximum number of queries run at the same time
 
-    bindings = query_wikidata(query)
-    if len(bindings) > 0:
-        return [binding["item"]["value"] for binding in bindings]
+    Returns:
+        A mapping from each DOI found on Wikidata to the QID of its item. DOIs
+        missing from Wikidata are left out.
+    """
+    # DOIs are stored in upper case on Wikidata
+    dois_for_key: Dict[str, List[str]] = defaultdict(list)
+    for doi in papers_dois:
+        if doi[0:3] == "10.":
+            dois_for_key[doi.upper()].append(doi)
+    logger.debug("looking up %d DOIs", len(dois_for_key))
+
+    def _query(chunk: List[str]) -> List[Dict]:
+        doi_values = " ".join(json.dumps(doi) for doi in chunk)
+        query = f"""\
+            SELECT ?doi ?item
+            WHERE
+            {{
+                VALUES ?doi {{ {doi_values} }}
+                ?itemURL wdt:P356 ?doi .
+                BIND(REPLACE(STR(?itemURL), "http://www.wikidata.org/entity/", "") AS ?item)
+            }}
+        """
+        return query_wikidata(query)
+
+    rv: Dict[str, str] = {}
+    chunks = chunked(sorted(dois_for_key), chunk_size)
+    for bindings in map_ordered(_query, chunks, workers=workers):
+        # Sorting makes the choice deterministic when a DOI is on more than one item
+        for binding in sorted(bindings, key=lambda b: b["item"]["value"]):
+            for doi in dois_for_key[binding["doi"]["value"]]:
+                rv.setdefault(doi, binding["item"]["value"])
+    return rv
 
 
 def process_paper_entries(
-    orcid: str, researcher_qid: str, paper_dois: List[str], property_id: str
-) -> List[EntityLine]:
-    """From a list of paper DOIs create statements for linking them to author"""
+    orcid: str,
+    researcher_qid: str,
+    paper_dois: List[str],
+    property_id: str,
+    paper_qids: Optional[Mapping[str, str]] = None,
+) -> List[Statement]:
+    """
+    From a list of paper DOIs create statements for linking them to author
 
-    paper_qids = get_paper_qids(paper_dois)
+    Args:
+        orcid: The ORCID of the author
+        researcher_qid: The QID of the author
+        paper_dois: The DOIs of the author's works
+        property_id: The property linking papers to the author, e.g., P50
+        paper_qids: The QIDs of the papers, as returned by :func:`get_paper_qids`.
+            If not given, the DOIs are looked up.
+    """
+    if paper_qids is None:
+        paper_qids = get_paper_qids(paper_dois)
 
     paper_statements = []
 
-    qualifiers = [_get_orcid_qualifier(orcid)]
+    qualifiers = (_get_orcid_qualifier(orcid),)
+    papers = dict.fromkeys(paper_qids[doi] for doi in paper_dois if doi in paper_qids)
     try:
-        for paper in paper_qids:
-            entry = EntityLine(
-                subject=paper, predicate=property_id, target=researcher_qid, qualifiers=qualifiers
-            )
+        for paper in papers:
+            entry = Statement.entity(paper, property_id, researcher_qid, qualifiers)
 
             paper_statements.append(entry)
-    except pydantic.error_wrappers.ValidationError:
-        # TODO
+    except ValueError:
+        # TODO papers cannot point to a new item, i.e., LAST
         pass
     return paper_statements
@@ -0,0 +1,214 @@
+"""A shared HTTP client for all requests to ORCID and Wikidata."""
+
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from .metrics import get_metrics
+from .ratelimit import backoff_delay, get_limiter
+
+__all__ = [
+    "HTTPClient",
+    "get_client",
+    "set_client",
+    "USER_AGENT",
+]
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "PyORCIDator (https://github.com/lubianat/pyorcidator)"
+ORCID_API_URL = "https://pub.orcid.org/v2.0/"
+ORCID_V3_API_URL = "https://pub.orcid.org/v3.0/"
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+#: Connect and read timeouts, in seconds. WDQS stops queries after 60 seconds.
+DEFAULT_TIMEOUT = (10.0, 65.0)
+#: The number of kept-alive connections per host
+DEFAULT_POOL_SIZE = 16
+#: The number of times a throttled or failed request is retried
+DEFAULT_MAX_RETRIES = 4
+#: Status codes with which hosts signal overload
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def _is_overloaded(res: requests.Response) -> bool:
+    # WDQS reports query timeouts as a 500 with a Java exception in the body
+    return res.status_code in RETRY_STATUSES or (
+        res.status_code == 500 and "TimeoutException" in res.text
+    )
+
+
+def _get_retry_after(res: Optional[requests.Response]) -> Optional[float]:
+    value = res.headers.get("Retry-After") if res is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _record(url: str, res: requests.Response) -> None:
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    host = urlparse(url).netloc
+    metrics.count("http_responses", host=host, status=str(res.status_code))
+    # The size on the wire, which is smaller than the content if it is compressed
+    size = res.headers.get("Content-Length")
+    metrics.count("http_bytes_downloaded", int(size) if size else len(res.content), host=host)
+    metrics.observe("http_request", res.elapsed.total_seconds(), host=host)
+
+
+class HTTPClient:
+    """
+    A pooled HTTP client with a common user agent, compression and timeouts.
+
+    Every request goes through the shared per-host limiter (see :mod:`pyorcidator.ratelimit`).
+    Requests that are throttled (429, 503, ``Retry-After``), time out or fail to connect are
+    retried with jittered exponential backoff. The endpoint URLs can be overridden, e.g., to
+    point tests at a local stand-in server.
+    """
+
+    def __init__(
+        self,
+        orcid_api_url: str = ORCID_API_URL,
+        sparql_url: str = WIKIDATA_SPARQL_URL,
+        wikidata_api_url: str = WIKIDATA_API_URL,
+        orcid_v3_api_url: str = ORCID_V3_API_URL,
+        timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        user_agent: str = USER_AGENT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ):
+        """
+        Create a client.
+
+        Args:
+            orcid_api_url: The base URL of the ORCID public API, ending with a slash
+            sparql_url: The URL of the Wikidata SPARQL endpoint
+            wikidata_api_url: The URL of the Wikidata action API
+            orcid_v3_api_url: The base URL of version 3.0 of the ORCID public API, used to
+                fetch parts of records, ending with a slash
+            timeout: The connect and read timeouts, in seconds
+            pool_size: The number of kept-alive connections per host
+            user_agent: The User-Agent header sent with every request
+            max_retries: The number of times a throttled or failed request is retried
+        """
+        self.orcid_api_url = orcid_api_url
+        self.sparql_url = sparql_url
+        self.wikidata_api_url = wikidata_api_url
+        self.orcid_v3_api_url = orcid_v3_api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {
+                "User-Agent": user_agent,
+                # Advertises every encoding urllib3 can decode here, e.g., br if brotli is installed
+                "Accept-Encoding": ACCEPT_ENCODING,
+            }
+        )
+
+    def request(
+        self, method: str, url: str, idempotent: bool = True, **kwargs
+    ) -> requests.Response:
+        """
+        Send a request, waiting for the target host's limiter and retrying on overload.
+
+        Args:
+            method: The HTTP method
+            url: The URL
+            idempotent: If the request can be sent again when it may have reached the
+                server, e.g., after a read timeout or a gateway error. Otherwise, it is
+                only retried when it cannot have been processed: on a connect timeout
+                or a 429 response.
+            kwargs: Passed on to :meth:`requests.Session.request`
+
+        Returns:
+            The first response that is not an overload signal, or the last response
+            once retries are exhausted
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        limiter = get_limiter(url)
+        for attempt in range(self.max_retries + 1):
+            res = None
+            with limiter.slot() as slot:
+                try:
+                    res = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    slot.overloaded()
+                    if attempt == self.max_retries:
+                        raise
+                    if not idempotent and not isinstance(e, requests.ConnectTimeout):
+                        raise
+                else:
+                    _record(url, res)
+                    if not _is_overloaded(res):
+                        slot.succeeded()
+                        return res
+                    slot.overloaded()
+                    if not idempotent and res.status_code != 429:
+                        return res
+            if res is not None and attempt == self.max_retries:
+                return res
+            delay = _get_retry_after(res)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            limiter.record_retry(delay)
+            logger.warning(
+                "retrying %s %s in %.1fs (attempt %d of %d)",
+                method,
+                url,
+                delay,
+                attempt + 1,
+                self.max_retries,
+            )
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        """Send a POST request, see :meth:`request` for ``idempotent``."""
+        return self.request("POST", url, idempotent=idempotent, **kwargs)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.session.close()
+
+
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HTTPClient:
+    """Get the shared HTTP client, creating a default one on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HTTPClient()
+        return _client
+
+
+def set_client(client: Optional[HTTPClient]) -> None:
+    """Replace the shared HTTP client. Pass None to go back to the default client."""
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,67 @@
+"""Import ORCID information from the ORCID public data file."""
+
+from typing import Optional, Tuple
+
+import click
+
+from .cache import cache_options
+from .data_file import RecordStream, affiliation_filter, iter_data_file
+from .helper import BATCH_SIZE
+from .import_info_from_list import import_options, import_orcids, read_orcids
+from .metrics import metrics_options
+from .pending import curation_options
+from .state import state_options
+
+__all__ = [
+    "main",
+]
+
+
+@click.command(name="import_data_file")
+@click.option(
+    "--source",
+    required=True,
+    type=click.Path(exists=True),
+    help="The summaries archive of the ORCID public data file, a directory of ORCID records "
+    "in JSON or XML, or a JSON Lines file of records",
+)
+@click.option(
+    "--orcid_list",
+    "--orcid-list",
+    type=click.Path(dir_okay=False, exists=True),
+    help="Only import the ORCIDs in this file, one per line",
+)
+@click.option(
+    "--affiliation",
+    "affiliations",
+    multiple=True,
+    help="Only import researchers employed or educated at this organization, given by ROR ID, "
+    "GRID ID or name. Can be given several times.",
+)
+@import_options
+@state_options
+@cache_options
+@curation_options
+@metrics_options
+def main(
+    source: str,
+    orcid_list: Optional[str],
+    affiliations: Tuple[str, ...],
+    batch_size: int,
+    **kwargs,
+):
+    """Import ORCID information from the ORCID public data file."""
+    orcids = set(read_orcids(orcid_list)) if orcid_list is not None else None
+    predicate = affiliation_filter(affiliations) if affiliations else None
+    stream = RecordStream(
+        iter_data_file(source, orcids=orcids, predicate=predicate),
+        max_held=2 * max(batch_size, BATCH_SIZE),
+    )
+    try:
+        import_orcids(stream, batch_size=batch_size, fetch=stream.fetch, **kwargs)
+    finally:
+        click.echo(f"{stream.streamed:,} records read from {source}", err=True)
+
+
+if __name__ == "__main__":
+    main()
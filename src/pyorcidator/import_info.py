@@ -5,14 +5,15 @@ from typing import Optional
 from urllib.parse import quote
 
 import click
-from quickstatements_client import (
-    QuickStatementsClient,
-    lines_to_new_tab,
-    lines_to_url,
-    render_lines,
-)
+from quickstatements_client import QuickStatementsClient
 
+from .cache import cache_options
+from .delta import drop_existing, lookup_existing_claims
 from .helper import get_orcid_quickstatements
+from .metrics import metrics_options
+from .pending import curation_options
+from .statements import render_statements, to_lines
+from .upload import text_to_urls
 
 __all__ = [
     "main",
@@ -36,16 +37,31 @@ __all__ = [
     "--batch-name",
     help="QuickStatements batch name.",
 )
-def main(orcid: str, open_browser: bool, upload: bool, batch_name: Optional[str]):
+@click.option(
+    "--delta",
+    is_flag=True,
+    help="Leave out statements that are already on Wikidata.",
+)
+@cache_options
+@curation_options
+@metrics_options
+def main(orcid: str, open_browser: bool, upload: bool, batch_name: Optional[str], delta: bool):
     """Import ORCID information into Wikidata."""
     lines = get_orcid_quickstatements(orcid)
-    print(render_lines(lines, sep="\t", newline="\n"))
-    print(lines_to_url(lines))
+    if delta:
+        lines = drop_existing(lines, lookup_existing_claims(lines))
+    qs = render_statements(lines, sep="\t")
+    print(qs)
+    # Researchers with many works need several URLs
+    urls = text_to_urls(qs)
+    for url in urls:
+        print(url)
     if open_browser:
-        lines_to_new_tab(lines)
+        for url in urls:
+            webbrowser.open_new_tab(url)
     if upload or batch_name is not None:
         client = QuickStatementsClient()
-        res = client.post(lines, batch_name=batch_name)
+        res = client.post(to_lines(lines), batch_name=batch_name)
         click.echo(f"Job posted to {res.batch_url}")
 
 
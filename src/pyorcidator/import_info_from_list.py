@@ -1,26 +1,360 @@
+import gzip
+import sys
 from pathlib import Path
-from urllib.parse import quote
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
 import click
-from .helper import *
+
+from .cache import cache_options
+from .helper import BATCH_SIZE, iter_orcids_qs, render_orcids_qs
+from .jobs import DEFAULT_SHARD_SIZE, SHARD_TEMPLATE, Job
+from .metrics import metrics_options
+from .pending import curation_options
+from .ratelimit import get_stats
+from .sections import STATEMENT_TYPES, statements_fetch
+from .state import get_state_store, state_options
+from .upload import (
+    DEFAULT_BATCH_BYTES,
+    DEFAULT_UPLOAD_LOG,
+    DEFAULT_UPLOAD_WORKERS,
+    BatchUploader,
+    iter_statement_groups,
+    text_to_urls,
+)
+
+__all__ = [
+    "main",
+    "read_orcids",
+    "open_output",
+    "write_orcids_qs",
+    "run_job",
+    "import_options",
+    "import_orcids",
+    "open_uploader",
+    "close_uploader",
+    "upload_job",
+]
+
+
+def read_orcids(path: str) -> Iterator[str]:
+    """Lazily read one ORCID per line from a file, skipping blank lines."""
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def open_output(path: str) -> IO[str]:
+    """Open a text file for writing QuickStatements. Use ``-`` for stdout and a ``.gz`` suffix for gzip."""
+    if path == "-":
+        return sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8")
+    return open(path, "w", encoding="utf-8")
+
+
+def write_orcids_qs(
+    orcids: Iterable[str],
+    file: IO[str],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    uploader: Optional[BatchUploader] = None,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> int:
+    """
+    Write the QuickStatements of each researcher to a file as soon as they are ready.
+
+    Only one batch of researchers is held in memory at a time. If an uploader is given,
+    the QuickStatements are also added to it. With ``delta``, statements already on
+    Wikidata are left out. ``fetch`` gets the ORCID record of a researcher, by default
+    from the ORCID API.
+
+    Returns:
+        The number of researchers written
+    """
+    count = 0
+    results = render_orcids_qs(
+        orcids, workers=workers, batch_size=batch_size, delta=delta, fetch=fetch
+    )
+    for qs in results:
+        file.write(qs)
+        file.flush()
+        if uploader is not None:
+            uploader.add(qs)
+        count += 1
+    return count
+
+
+def run_job(
+    orcids: Iterable[str],
+    job: Job,
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> None:
+    """Write the QuickStatements of the researchers a job has not finished yet to its shards."""
+    pending = job.pending(orcids)
+    results = iter_orcids_qs(
+        pending,
+        workers=workers,
+        batch_size=batch_size,
+        catch_errors=True,
+        delta=delta,
+        fetch=fetch,
+    )
+    for orcid, qs in results:
+        if isinstance(qs, Exception):
+            job.fail(orcid, qs)
+        else:
+            job.write(orcid, qs)
+
+
+def open_uploader(
+    upload: Optional[str],
+    job: Optional[str] = None,
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    workers: int = DEFAULT_UPLOAD_WORKERS,
+) -> Optional[BatchUploader]:
+    """Start an upload of batches with the given name, logged in the job directory if any."""
+    if upload is None:
+        return None
+    log_path = DEFAULT_UPLOAD_LOG
+    if job is not None:
+        Path(job).mkdir(parents=True, exist_ok=True)
+        log_path = Path(job, "batches.jsonl")
+    return BatchUploader(upload, max_bytes=batch_bytes, workers=workers, log_path=log_path)
+
+
+def close_uploader(uploader: BatchUploader) -> None:
+    """Submit the last batch, wait for all submissions and report them."""
+    uploader.close()
+    failed = uploader.failed
+    click.echo(
+        f"{len(uploader.records) - len(failed):,} batches submitted, {len(failed):,} failed, "
+        f"logged in {uploader.log_path}",
+        err=True,
+    )
+    unclear = [record["name"] for record in failed if record["status"] == "UNKNOWN"]
+    if unclear:
+        click.echo(
+            f"{len(unclear):,} batches may have been submitted anyway and will not be "
+            f"submitted again. Check them on QuickStatements: {', '.join(unclear)}",
+            err=True,
+        )
+
+
+def upload_job(job: Job, uploader: BatchUploader) -> None:
+    """Submit the QuickStatements in the shards of a job, in order."""
+    for path in sorted(job.directory.glob(SHARD_TEMPLATE.replace("{:05d}", "*"))):
+        with path.open(encoding="utf-8") as file:
+            for group in iter_statement_groups(file):
+                uploader.add(group)
+
+
+def import_options(f):
+    """Add the options of the concurrent list import to a command."""
+    options = [
+        click.option(
+            "--workers",
+            type=int,
+            default=1,
+            show_default=True,
+            help="The number of ORCIDs fetched and resolved concurrently",
+        ),
+        click.option(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            show_default=True,
+            help="The number of ORCIDs whose QIDs are resolved together",
+        ),
+        click.option(
+            "--delta",
+            is_flag=True,
+            help="Leave out statements that are already on Wikidata, checking the claims of "
+            "each batch of researchers and their papers together",
+        ),
+        click.option(
+            "--statement",
+            "statements",
+            type=click.Choice(STATEMENT_TYPES),
+            multiple=True,
+            help="Only emit statements of this type, fetching only the parts of ORCID records it "
+            "needs, with the complete identifiers of works. Can be given several times. By "
+            "default, all types are emitted from whole records.",
+        ),
+        click.option(
+            "-o",
+            "--output",
+            help="Stream QuickStatements to this file as they are ready instead of printing a "
+            "QuickStatements URL at the end. Use - for stdout and a .gz suffix for gzip.",
+        ),
+        click.option(
+            "--job",
+            type=click.Path(file_okay=False),
+            help="Run as a resumable job in this directory. Finished ORCIDs are journaled and "
+            "skipped when the job is run again, QuickStatements go to numbered shards, and ORCIDs "
+            "that fail are listed in retry.txt instead of aborting the run.",
+        ),
+        click.option(
+            "--shard-size",
+            type=int,
+            default=DEFAULT_SHARD_SIZE,
+            show_default=True,
+            help="The largest size of a job's output shards, in bytes",
+        ),
+        click.option(
+            "--upload",
+            metavar="NAME",
+            help="Submit the QuickStatements to the QuickStatements API in batches named after "
+            "NAME, with the credentials of the quickstatements pystow configuration. Submitted "
+            "batches are logged, with their URLs, and skipped when the import is run again.",
+        ),
+        click.option(
+            "--upload-batch-bytes",
+            type=int,
+            default=DEFAULT_BATCH_BYTES,
+            show_default=True,
+            help="The largest batch submitted to the QuickStatements API, in bytes",
+        ),
+        click.option(
+            "--upload-workers",
+            type=int,
+            default=DEFAULT_UPLOAD_WORKERS,
+            show_default=True,
+            help="The number of batches submitted at the same time",
+        ),
+    ]
+    for option in reversed(options):
+        f = option(f)
+    return f
+
+
+def import_orcids(
+    orcids: Iterable[str],
+    workers: int = 1,
+    batch_size: int = BATCH_SIZE,
+    output: Optional[str] = None,
+    job: Optional[str] = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    upload: Optional[str] = None,
+    upload_batch_bytes: int = DEFAULT_BATCH_BYTES,
+    upload_workers: int = DEFAULT_UPLOAD_WORKERS,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+    statements: Tuple[str, ...] = (),
+) -> None:
+    """
+    Import ORCID information for many researchers with the concurrent, batched pipeline.
+
+    Args:
+        orcids: The ORCIDs of the researchers
+        workers: The number of ORCIDs fetched and resolved concurrently
+        batch_size: The number of ORCIDs whose QIDs are resolved together
+        output: A file to stream QuickStatements to, see :func:`open_output`. If neither
+            this nor a job is given, the QuickStatements and their URL are printed.
+        job: The directory of a resumable job to run, see :class:`pyorcidator.jobs.Job`
+        shard_size: The largest size of a job's output shards, in bytes
+        upload: The name of the batches to submit the QuickStatements to the QuickStatements
+            API in, see :class:`pyorcidator.upload.BatchUploader`. A job's output is
+            submitted once the job is finished, with the log of submissions in its directory.
+        upload_batch_bytes: The largest batch submitted, in bytes
+        upload_workers: The number of batches submitted at the same time
+        delta: If statements already on Wikidata are left out
+        fetch: The function getting the ORCID record of a researcher, by default
+            :func:`pyorcidator.helper.get_orcid_data`
+        statements: The statement types to emit, see :func:`pyorcidator.sections.statements_fetch`.
+            By default, all of them are.
+    """
+    if job is not None and output is not None:
+        raise click.UsageError("--job and --output cannot be used together")
+    if statements and fetch is None and get_state_store() is not None:
+        # Sections have no history, so there would be no last-modified date to compare
+        raise click.UsageError(
+            "--statement cannot be used with --state-file or --since, except with "
+            "records from the ORCID public data file"
+        )
+    fetch = statements_fetch(statements, fetch)
+    uploader = open_uploader(upload, job, upload_batch_bytes, upload_workers)
+    try:
+        if job is not None:
+            with Job(job, shard_size=shard_size) as running:
+                run_job(
+                    orcids,
+                    running,
+                    workers=workers,
+                    batch_size=batch_size,
+                    delta=delta,
+                    fetch=fetch,
+                )
+            click.echo(
+                f"{running.written:,} researchers written to {running.directory}, "
+                f"{running.resumed:,} done before, {running.failed:,} failed",
+                err=True,
+            )
+            if running.failed:
+                click.echo(f"Failed ORCIDs are listed in {running.retry_path}", err=True)
+            if uploader is not None:
+                upload_job(running, uploader)
+        elif output is not None:
+            file = open_output(output)
+            try:
+                write_orcids_qs(
+                    orcids,
+                    file,
+                    workers=workers,
+                    batch_size=batch_size,
+                    uploader=uploader,
+                    delta=delta,
+                    fetch=fetch,
+                )
+            finally:
+                if file is not sys.stdout:
+                    file.close()
+        else:
+            results = render_orcids_qs(
+                orcids, workers=workers, batch_size=batch_size, delta=delta, fetch=fetch
+            )
+            if uploader is not None:
+                for qs in results:
+                    uploader.add(qs)
+                return
+            qs = "".join(results)
+            print(qs)
+            # A single URL for many researchers would be too long for browsers and servers
+            for url in text_to_urls(qs):
+                print(url)
+    finally:
+        if uploader is not None:
+            close_uploader(uploader)
+        for host, stats in get_stats().items():
+            if stats["retries"]:
+                click.echo(
+                    f"{host}: {stats['retries']:,} retries, "
+                    f"{stats['throttled_seconds']:.1f}s throttled",
+                    err=True,
+                )
 
 
 @click.command(name="import_list")
 @click.option(
     "--orcid_list",
+    "--orcid-list",
     prompt="Path to list of ORCIDs",
     type=click.Path(),
     help="The path for a txt file containing one ORCID per line",
 )
-def main(orcid_list: str):
-    p = Path(orcid_list)
-    list_of_orcids = p.read_text().split("\n")
-    qs = ""
-    for orcid in list_of_orcids:
-        qs = qs + render_orcid_qs(orcid)
-    quoted_qs = quote(qs.replace("\t", "|").replace("\n", "||"), safe="")
-    url = f"https://quickstatements.toolforge.org/#/v1={quoted_qs}\\"
-    print(qs)
-    print(url)
+@import_options
+@state_options
+@cache_options
+@curation_options
+@metrics_options
+def main(orcid_list: str, **kwargs):
+    """Import ORCID information for a list of ORCIDs into Wikidata."""
+    import_orcids(read_orcids(orcid_list), **kwargs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+"""Resumable imports with a journal of finished ORCIDs, sharded output and a retry file."""
+
+import logging
+import os
+from pathlib import Path
+from typing import IO, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+__all__ = [
+    "Journal",
+    "ShardedWriter",
+    "Job",
+]
+
+logger = logging.getLogger(__name__)
+
+#: The largest size of an output shard, in bytes
+DEFAULT_SHARD_SIZE = 50_000_000
+JOURNAL_NAME = "journal.tsv"
+RETRY_NAME = "retry.txt"
+SHARD_TEMPLATE = "quickstatements-{:05d}.txt"
+
+
+class Journal:
+    """
+    An append-only log of finished ORCIDs, loaded into a set.
+
+    Each line holds an ORCID, optionally followed by tab-separated fields. A plain list of
+    ORCIDs, one per line, is a valid journal.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """Open a journal, loading the ORCIDs already finished if the file exists."""
+        self.path = Path(path)
+        self.completed: Set[str] = set()
+        #: The fields of the last entry, e.g., to resume the output where it stopped
+        self.last: Optional[List[str]] = None
+        if self.path.is_file():
+            with self.path.open("rb+") as file:
+                data = file.read()
+                # A line without a newline was cut off by a crash, so it does not count
+                end = data.rfind(b"\n") + 1
+                if end < len(data):
+                    file.truncate(end)
+            for line in data[:end].decode("utf-8").splitlines():
+                fields = line.split("\t")
+                if fields[0]:
+                    self.completed.add(fields[0])
+                    self.last = fields
+        self._file: IO[str] = self.path.open("a", encoding="utf-8")
+
+    def __contains__(self, orcid: str) -> bool:
+        return orcid in self.completed
+
+    def __len__(self) -> int:
+        return len(self.completed)
+
+    def record(self, orcid: str, *fields: str) -> None:
+        """Mark an ORCID as finished. The entry is flushed before returning."""
+        self._file.write("\t".join((orcid, *fields)) + "\n")
+        self._file.flush()
+        self.completed.add(orcid)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        self._file.close()
+
+
+class ShardedWriter:
+    """Writes text to numbered files in a directory, starting a new one when full."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int = DEFAULT_SHARD_SIZE,
+        resume_at: Optional[Tuple[str, int]] = None,
+    ):
+        """
+        Open the shards for writing.
+
+        Args:
+            directory: The directory for the shards
+            max_bytes: The size above which a new shard is started. A single write is never
+                split, so a shard can be larger if one write is.
+            resume_at: The shard name and size after the last write that counts. Anything
+                written after it, e.g., before a crash, is discarded. If not given, any
+                existing shards are discarded.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        index, size = 0, 0
+        if resume_at is not None:
+            index, size = int(resume_at[0].split("-")[1].split(".")[0]), resume_at[1]
+        for path in self.directory.glob(SHARD_TEMPLATE.replace("{:05d}", "*")):
+            if int(path.stem.split("-")[1]) > index:
+                path.unlink()
+        self.index = index
+        self._file = self._open(size)
+
+    def _open(self, size: int) -> IO[bytes]:
+        path = self.directory.joinpath(SHARD_TEMPLATE.format(self.index))
+        file = path.open("r+b" if path.is_file() else "wb")
+        file.truncate(size)
+        file.seek(size)
+        return file
+
+    @property
+    def name(self) -> str:
+        """The name of the current shard."""
+        return SHARD_TEMPLATE.format(self.index)
+
+    def write(self, text: str) -> Tuple[str, int]:
+        """
+        Write text to the current shard, or to a new one if it would overflow.
+
+        Returns:
+            The name of the shard written to and its size after the write
+        """
+        data = text.encode("utf-8")
+        if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            self._file.close()
+            self.index += 1
+            self._file = self._open(0)
+        self._file.write(data)
+        self._file.flush()
+        return self.name, self._file.tell()
+
+    def close(self) -> None:
+        """Close the current shard."""
+        self._file.close()
+
+
+class Job:
+    """
+    A resumable import in a directory, with a journal, output shards and a retry file.
+
+    The output of a researcher is written to a shard before the researcher is journaled.
+    On resume, output after the last journaled researcher is discarded, so every
+    researcher is written exactly once however the previous run stopped. Researchers that
+    fail are listed in the retry file of the run instead of aborting it, and are retried
+    when the job is resumed.
+    """
+
+    def __init__(self, directory: Union[str, Path], shard_size: int = DEFAULT_SHARD_SIZE):
+        """
+        Open a job, resuming it if the directory has a journal.
+
+        Args:
+            directory: The directory of the job
+            shard_size: The largest size of an output shard, in bytes
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.journal = Journal(self.directory.joinpath(JOURNAL_NAME))
+        last = self.journal.last
+        resume_at = (last[1], int(last[2])) if last is not None and len(last) == 3 else None
+        self.shards = ShardedWriter(self.directory, shard_size, resume_at=resume_at)
+        self.retry_path = self.directory.joinpath(RETRY_NAME)
+        self._retry_file = self.retry_path.open("w", encoding="utf-8")
+        self.resumed = len(self.journal)
+        self.written = 0
+        self.failed = 0
+
+    def pending(self, orcids: Iterable[str]) -> Iterator[str]:
+        """Skip the ORCIDs that are already finished, and repeated ones."""
+        seen = set()
+        for orcid in orcids:
+            if orcid not in self.journal and orcid not in seen:
+                seen.add(orcid)
+                yield orcid
+
+    def write(self, orcid: str, qs: str) -> None:
+        """Write the QuickStatements of a researcher and mark it as finished."""
+        name, size = self.shards.write(qs)
+        self.journal.record(orcid, name, str(size))
+        self.written += 1
+
+    def fail(self, orcid: str, error: Exception) -> None:
+        """List a researcher in the retry file."""
+        logger.warning("queued %s for retry: %s", orcid, error)
+        self._retry_file.write(f"{orcid}\n")
+        self._retry_file.flush()
+        self.failed += 1
+
+    def close(self) -> None:
+        """Close the journal, the output and the retry file."""
+        self.journal.close()
+        self.shards.close()
+        self._retry_file.close()
+        if not self.failed:
+            os.remove(self.retry_path)
+
+    def __enter__(self) -> "Job":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
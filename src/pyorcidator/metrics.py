@@ -0,0 +1,310 @@
+"""Counters, latency histograms and per-ORCID traces for the hot paths of an import."""
+
+import bisect
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+import click
+
+__all__ = [
+    "Metrics",
+    "Tracer",
+    "get_metrics",
+    "set_metrics",
+    "get_tracer",
+    "set_tracer",
+    "count",
+    "span",
+    "timed",
+    "metrics_options",
+]
+
+F = TypeVar("F", bound=Callable)
+Labels = Tuple[Tuple[str, str], ...]
+
+#: Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+#: The prefix of all metric names in the Prometheus text format
+PROMETHEUS_PREFIX = "pyorcidator_"
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metrics:
+    """Thread-safe counters and latency histograms, with optional labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        """Add to a counter."""
+        key = name, _labels(labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        """Record a duration in a histogram."""
+        key = name, _labels(labels)
+        with self._lock:
+            # Bucket counts, then the sum of durations
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+            histogram[-1] += seconds
+
+    def collect(self) -> None:
+        """Copy the counters kept by the query cache and the rate limiters."""
+        from .cache import get_query_cache
+        from .ratelimit import get_stats
+
+        query_cache = get_query_cache()
+        if query_cache is not None:
+            for key, value in query_cache.stats().items():
+                self._set(f"query_cache_{key}", value)
+        for host, stats in get_stats().items():
+            for key, value in stats.items():
+                self._set(f"http_{key}", value, host=host)
+
+    def _set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self.counters[name, _labels(labels)] = value
+
+    def to_dict(self) -> Dict[str, List[Dict]]:
+        """Get all metrics as JSON-serializable data."""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": sum(histogram[:-1]),
+                    "sum": round(histogram[-1], 6),
+                    "buckets": dict(zip([*map(str, BUCKETS), "+Inf"], histogram[:-1])),
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Get all metrics in the Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = []
+        for name in sorted({counter["name"] for counter in data["counters"]}):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} counter")
+            for counter in data["counters"]:
+                if counter["name"] == name:
+                    lines.append(
+                        f"{PROMETHEUS_PREFIX}{name}{_format_labels(counter['labels'])} "
+                        f"{counter['value']}"
+                    )
+        for name in sorted({histogram["name"] for histogram in data["histograms"]}):
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name}_seconds histogram")
+            for histogram in data["histograms"]:
+                if histogram["name"] != name:
+                    continue
+                labels = histogram["labels"]
+                cumulative = 0
+                for bound, bucket_count in histogram["buckets"].items():
+                    cumulative += bucket_count
+                    lines.append(
+                        f"{PROMETHEUS_PREFIX}{name}_seconds_bucket"
+                        f"{_format_labels({**labels, 'le': bound})} {cumulative}"
+                    )
+                lines.append(
+                    f"{PROMETHEUS_PREFIX}{name}_seconds_sum{_format_labels(labels)} "
+                    f"{histogram['sum']}"
+                )
+                lines.append(
+                    f"{PROMETHEUS_PREFIX}{name}_seconds_count{_format_labels(labels)} "
+                    f"{histogram['count']}"
+                )
+        return "".join(f"{line}\n" for line in lines)
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Write the metrics to a file, as Prometheus text if it ends in ``.prom``, else as JSON."""
+        self.collect()
+        path = Path(path)
+        if path.suffix == ".prom":
+            path.write_text(self.to_prometheus())
+        else:
+            path.write_text(json.dumps(self.to_dict(), indent=2))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+
+class Tracer:
+    """Writes a JSON line for each finished span, with the ORCID it was for, if any."""
+
+    def __init__(self, file: IO[str]):
+        self.file = file
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def orcid(self) -> Optional[str]:
+        """The ORCID the current thread is working on."""
+        return getattr(self._local, "orcid", None)
+
+    @orcid.setter
+    def orcid(self, value: Optional[str]) -> None:
+        self._local.orcid = value
+
+    def write(self, name: str, orcid: Optional[str], start: float, duration: float) -> None:
+        """Write a finished span."""
+        line = json.dumps(
+            {
+                "name": name,
+                "orcid": orcid,
+                "start": round(start - self.started, 6),
+                "duration": round(duration, 6),
+                "thread": threading.current_thread().name,
+            }
+        )
+        with self._lock:
+            self.file.write(f"{line}\n")
+
+
+_metrics: Optional[Metrics] = None
+_tracer: Optional[Tracer] = None
+
+
+def get_metrics() -> Optional[Metrics]:
+    """Get the metrics being collected, if instrumentation is enabled."""
+    return _metrics
+
+
+def set_metrics(metrics: Optional[Metrics]) -> None:
+    """Set the metrics to collect into. Pass None to disable instrumentation."""
+    global _metrics
+    _metrics = metrics
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the tracer spans are written to, if tracing is enabled."""
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Set the tracer to write spans to. Pass None to disable tracing."""
+    global _tracer
+    _tracer = tracer
+
+
+def count(name: str, value: float = 1, **labels: str) -> None:
+    """Add to a counter, if instrumentation is enabled."""
+    if _metrics is not None:
+        _metrics.count(name, value, **labels)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name: str, orcid: Optional[str] = None):
+    """
+    Time a block, if instrumentation or tracing is enabled.
+
+    Args:
+        name: The name of the stage, used for its latency histogram and in the trace
+        orcid: The ORCID the block works on. Spans nested in it, in the same thread,
+            are attributed to the same ORCID in the trace.
+    """
+    if _metrics is None and _tracer is None:
+        return _NO_SPAN
+    return _span(name, orcid)
+
+
+@contextmanager
+def _span(name: str, orcid: Optional[str]) -> Iterator[None]:
+    metrics, tracer = _metrics, _tracer
+    outer = tracer.orcid if tracer is not None else None
+    if tracer is not None and orcid is not None:
+        tracer.orcid = orcid
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        if metrics is not None:
+            metrics.observe(name, duration)
+        if tracer is not None:
+            tracer.write(name, orcid or outer, start, duration)
+            tracer.orcid = outer
+
+
+def timed(name: str, per_orcid: bool = False) -> Callable[[F], F]:
+    """
+    Time every call of the decorated function as a span with the given name.
+
+    Args:
+        name: The name of the stage
+        per_orcid: If the first argument of the function is the ORCID it works on
+    """
+
+    def _decorator(func: F) -> F:
+        @functools.wraps(func)
+        def _wrapped(*args, **kwargs):
+            if _metrics is None and _tracer is None:
+                return func(*args, **kwargs)
+            with _span(name, args[0] if per_orcid and args else None):
+                return func(*args, **kwargs)
+
+        return _wrapped  # type: ignore
+
+    return _decorator
+
+
+def metrics_options(f):
+    """Add the ``--metrics-out`` and ``--trace`` options to a command."""
+
+    @click.option(
+        "--metrics-out",
+        type=click.Path(dir_okay=False),
+        help="Write counters and latency histograms to this file when done, in the "
+        "Prometheus text format if it ends in .prom and as JSON otherwise",
+    )
+    @click.option(
+        "--trace",
+        type=click.Path(dir_okay=False),
+        help="Write a JSON line for each timed step, with the ORCID it was for, to this file",
+    )
+    @functools.wraps(f)
+    def _wrapped(*args, metrics_out: Optional[str], trace: Optional[str], **kwargs):
+        if metrics_out is None and trace is None:
+            return f(*args, **kwargs)
+        trace_file = open(trace, "w") if trace is not None else None
+        set_metrics(Metrics() if metrics_out is not None else None)
+        set_tracer(Tracer(trace_file) if trace_file is not None else None)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            metrics = get_metrics()
+            set_metrics(None)
+            set_tracer(None)
+            if trace_file is not None:
+                trace_file.close()
+            if metrics is not None:
+                metrics.write(metrics_out)
+
+    return _wrapped
@@ -0,0 +1,194 @@
+"""A queue of labels that could not be resolved during a non-interactive run."""
+
+import functools
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import click
+
+from .dictionaries.index import DEFAULT_THRESHOLD, get_label_index, set_fuzzy_threshold
+
+__all__ = [
+    "PendingQueue",
+    "get_pending_queue",
+    "set_pending_queue",
+    "curation_options",
+    "echo_candidates",
+    "resolve_pending",
+]
+
+DEFAULT_PENDING_PATH = "pending_labels.json"
+#: The number of example ORCIDs kept for each pending label
+MAX_EXAMPLES = 3
+
+
+class PendingQueue:
+    """Deduplicated unresolved labels per dictionary, with counts and example ORCIDs."""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_PENDING_PATH):
+        """Open a queue, loading the labels already pending in the file if it exists."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Dict]] = (
+            json.loads(self.path.read_text()) if self.path.is_file() else {}
+        )
+
+    def record(self, key: str, label: str, orcid: Optional[str] = None) -> None:
+        """Record an occurrence of a label that is missing from the given dictionary."""
+        with self._lock:
+            entry = self._entries.setdefault(key, {}).setdefault(label, {"count": 0, "orcids": []})
+            entry["count"] += 1
+            if orcid and orcid not in entry["orcids"] and len(entry["orcids"]) < MAX_EXAMPLES:
+                entry["orcids"].append(orcid)
+
+    def remove(self, key: str, label: str) -> None:
+        """Remove a label from the queue once it is resolved."""
+        with self._lock:
+            self._entries.get(key, {}).pop(label, None)
+            if not self._entries.get(key):
+                self._entries.pop(key, None)
+
+    def items(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Iterate over (dictionary, label, entry) triples, most frequent first."""
+        with self._lock:
+            rows: List[Tuple[str, str, Dict]] = [
+                (key, label, dict(entry))
+                for key, labels in self._entries.items()
+                for label, entry in labels.items()
+            ]
+        rows.sort(key=lambda row: (-row[2]["count"], row[0], row[1]))
+        return iter(rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(labels) for labels in self._entries.values())
+
+    def save(self) -> None:
+        """Write the queue to its file."""
+        with self._lock:
+            text = json.dumps(self._entries, indent=2, sort_keys=True, ensure_ascii=False)
+        self.path.write_text(text)
+
+
+_queue: Optional[PendingQueue] = None
+
+
+def get_pending_queue() -> Optional[PendingQueue]:
+    """Get the queue for unresolved labels. If one is set, curation is non-interactive."""
+    return _queue
+
+
+def set_pending_queue(queue: Optional[PendingQueue]) -> None:
+    """Set the queue for unresolved labels. Pass None to curate interactively."""
+    global _queue
+    _queue = queue
+
+
+def echo_candidates(key: str, label: str, limit: int = 3) -> None:
+    """Show the labels of a dictionary most similar to a label that is being curated."""
+    candidates = get_label_index(key).candidates(label, limit=limit)
+    if candidates:
+        similar = ", ".join(f"{other!r} ({qid}, {score:.2f})" for qid, other, score in candidates)
+        click.echo(f"similar {key} labels: {similar}")
+
+
+def curation_options(f):
+    """Add the ``--non-interactive``, ``--pending-file`` and ``--fuzzy-threshold`` options."""
+
+    @click.option(
+        "--non-interactive",
+        is_flag=True,
+        help="Queue unknown roles, fields and institutions instead of prompting for them",
+    )
+    @click.option(
+        "--pending-file",
+        type=click.Path(dir_okay=False),
+        default=DEFAULT_PENDING_PATH,
+        show_default=True,
+        help="Where unknown labels are queued in non-interactive mode",
+    )
+    @click.option(
+        "--fuzzy-threshold",
+        type=click.FloatRange(0, 1),
+        help="Accept fuzzy dictionary matches with at least this similarity without curating "
+        f"them, e.g., {DEFAULT_THRESHOLD}. By default, only normalized labels are matched.",
+    )
+    @functools.wraps(f)
+    def _wrapped(
+        *args,
+        non_interactive: bool,
+        pending_file: str,
+        fuzzy_threshold: Optional[float],
+        **kwargs,
+    ):
+        set_fuzzy_threshold(fuzzy_threshold)
+        if not non_interactive:
+            set_pending_queue(None)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                set_fuzzy_threshold(None)
+        queue = PendingQueue(pending_file)
+        set_pending_queue(queue)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            set_fuzzy_threshold(None)
+            set_pending_queue(None)
+            queue.save()
+            if len(queue):
+                click.echo(
+                    f"{len(queue):,} unresolved labels queued in {queue.path}. "
+                    "Run `pyorcidator resolve-pending` to curate them.",
+                    err=True,
+                )
+
+    return _wrapped
+
+
+@click.command(name="resolve-pending")
+@click.option(
+    "--pending-file",
+    type=click.Path(dir_okay=False, exists=True),
+    default=DEFAULT_PENDING_PATH,
+    show_default=True,
+    help="The queue written by a non-interactive run",
+)
+def resolve_pending(pending_file: str):
+    """Curate the labels queued by non-interactive runs."""
+    # wdcuration pulls in pandas, so it is only imported when curating interactively
+    from wdcuration import add_key
+
+    from .dictionaries import dicts
+
+    queue = PendingQueue(pending_file)
+    changed = set()
+    try:
+        for key, label, entry in queue.items():
+            data = dicts[key]
+            if label not in data:
+                qid = get_label_index(key).match(label)
+                if qid is not None:
+                    data[label] = qid
+                else:
+                    examples = ", ".join(entry["orcids"])
+                    click.echo(f"\n{key}: {label!r} seen {entry['count']} times, e.g., {examples}")
+                    echo_candidates(key, label)
+                    add_key(data, label)
+                if label not in data:
+                    continue
+                changed.add(key)
+                get_label_index(key).add(label, data[label])
+            queue.remove(key, label)
+    finally:
+        # Each dictionary is written once, however many labels were curated
+        for key in sorted(changed):
+            dicts.save(key)
+        queue.save()
+    click.echo(f"{len(queue):,} labels still pending")
+
+
+if __name__ == "__main__":
+    resolve_pending()
@@ -0,0 +1,250 @@
+"""Per-host rate limiting with adaptive concurrency, shared by all outbound requests."""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+__all__ = [
+    "HostPolicy",
+    "HostLimiter",
+    "HOST_POLICIES",
+    "parse_host_policies",
+    "get_limiter",
+    "get_stats",
+    "reset_limiters",
+    "backoff_delay",
+]
+
+
+@dataclass
+class HostPolicy:
+    """Class for the request limits of a host."""
+
+    #: Sustained requests per second
+    rate: float
+    #: Requests that can be sent at once after an idle period
+    burst: int
+    #: The most simultaneous requests. The limiter adapts between 1 and this.
+    max_concurrency: int
+
+
+#: Limits for each host. ORCID allows 24 requests per second with bursts of 40, see
+#: https://info.orcid.org/ufaqs/what-are-the-api-limits/. WDQS allows five parallel
+#: queries per client, see https://www.mediawiki.org/wiki/Wikidata_Query_Service/User_Manual#Query_limits
+HOST_POLICIES: Dict[str, HostPolicy] = {
+    "pub.orcid.org": HostPolicy(rate=24, burst=40, max_concurrency=8),
+    "query.wikidata.org": HostPolicy(rate=10, burst=10, max_concurrency=5),
+    "www.wikidata.org": HostPolicy(rate=10, burst=10, max_concurrency=5),
+    # Each request stores a whole batch, so few are sent at a time
+    "quickstatements.toolforge.org": HostPolicy(rate=1, burst=2, max_concurrency=2),
+}
+DEFAULT_POLICY = HostPolicy(rate=10, burst=10, max_concurrency=4)
+
+
+def parse_host_policies(
+    text: str, policies: Optional[Dict[str, HostPolicy]] = None
+) -> Dict[str, HostPolicy]:
+    """
+    Parse overrides of the limits of hosts.
+
+    Args:
+        text: Semicolon-separated hosts, each followed by a colon and comma-separated
+            fields of :class:`HostPolicy` to change, e.g.,
+            ``pub.orcid.org:rate=12,max_concurrency=4;query.wikidata.org:max_concurrency=2``
+        policies: The limits to change, :data:`HOST_POLICIES` by default. Hosts that are
+            not in them start from the default limits.
+
+    Returns:
+        The changed limits of each host in the text
+
+    Raises:
+        ValueError: If a field is unknown or its value is not a positive number
+    """
+    if policies is None:
+        policies = HOST_POLICIES
+    types = {field.name: field.type for field in fields(HostPolicy)}
+    rv = {}
+    for entry in filter(None, (entry.strip() for entry in text.split(";"))):
+        # Fields have no colons, so a port stays with the host
+        host, _, assignments = entry.rpartition(":")
+        changes = {}
+        for assignment in assignments.split(","):
+            name, _, value = assignment.partition("=")
+            name = name.strip()
+            if not host or name not in types:
+                raise ValueError(f"invalid host limit {assignment!r} in {entry!r}")
+            changes[name] = types[name](value)
+            if changes[name] <= 0:
+                raise ValueError(f"host limits must be positive: {assignment!r} in {entry!r}")
+        host = host.strip()
+        rv[host] = replace(policies.get(host, DEFAULT_POLICY), **changes)
+    return rv
+
+
+#: Set to override the limits of hosts, in the format of :func:`parse_host_policies`
+HOST_POLICIES_ENV = "PYORCIDATOR_HOST_LIMITS"
+HOST_POLICIES.update(parse_host_policies(os.environ.get(HOST_POLICIES_ENV, "")))
+
+#: Seconds for the first retry, doubled for each further attempt
+BACKOFF_BASE = 1.0
+#: Longest wait between two attempts, in seconds
+BACKOFF_MAX = 60.0
+#: Latencies above this multiple of the best recent latency count as congestion
+CONGESTION_FACTOR = 3.0
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Get an exponential backoff delay with full jitter for the given attempt, starting at 0."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class HostLimiter:
+    """
+    A token bucket and an adaptive concurrency limit for one host.
+
+    The concurrency limit follows additive increase, multiplicative decrease: it is halved
+    when the host throttles or times out, and grows back by about one slot per round of
+    successful requests, as long as latency stays close to the best seen recently.
+    """
+
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self._condition = threading.Condition()
+        self._tokens = float(policy.burst)
+        self._refilled_at = time.monotonic()
+        self._limit = float(policy.max_concurrency)
+        self._in_flight = 0
+        self._best_latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.throttle_events = 0
+        self.throttled_seconds = 0.0
+
+    @property
+    def concurrency(self) -> int:
+        """The current number of simultaneous requests allowed."""
+        return max(1, int(self._limit))
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._tokens = min(self.policy.burst, self._tokens + elapsed * self.policy.rate)
+        self._refilled_at = now
+
+    def acquire(self) -> None:
+        """Wait for a free concurrency slot and a token."""
+        started = time.monotonic()
+        with self._condition:
+            while self._in_flight >= self.concurrency:
+                self._condition.wait()
+            self._in_flight += 1
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                self._condition.wait((1 - self._tokens) / self.policy.rate)
+            self.requests += 1
+            self.throttled_seconds += time.monotonic() - started
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """
+        Free a slot and adapt the concurrency limit.
+
+        Args:
+            latency: The duration of the request, in seconds, if it got a response
+            throttled: If the host signalled overload, e.g., with a 429, 503 or a timeout
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                self.throttle_events += 1
+                # Decreases at most once per second, so one burst of errors halves the limit once
+                if now - self._last_decrease > 1.0:
+                    self._limit = max(1.0, self._limit / 2)
+                    self._last_decrease = now
+            elif latency is not None:
+                if self._best_latency is None or latency < self._best_latency:
+                    self._best_latency = latency
+                else:
+                    # Slowly forgets the best latency, so the baseline follows the host
+                    self._best_latency += 0.01 * (latency - self._best_latency)
+                if latency <= CONGESTION_FACTOR * self._best_latency:
+                    self._limit = min(
+                        float(self.policy.max_concurrency), self._limit + 1 / self._limit
+                    )
+            self._condition.notify_all()
+
+    def record_retry(self, delay: float) -> None:
+        """Count a retry and the time spent waiting before it."""
+        with self._condition:
+            self.retries += 1
+            self.throttled_seconds += delay
+
+    @contextmanager
+    def slot(self) -> Iterator["_Slot"]:
+        """Hold a request slot. Report the outcome on the yielded object."""
+        self.acquire()
+        slot = _Slot()
+        try:
+            yield slot
+        finally:
+            self.release(latency=slot.latency, throttled=slot.throttled)
+
+    def stats(self) -> Dict[str, float]:
+        """Get the request, retry and throttling counters."""
+        with self._condition:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttle_events": self.throttle_events,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+                "concurrency": self.concurrency,
+            }
+
+
+class _Slot:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latency: Optional[float] = None
+        self.throttled = False
+
+    def succeeded(self) -> None:
+        self.latency = time.monotonic() - self.started
+
+    def overloaded(self) -> None:
+        self.throttled = True
+
+
+_limiters: Dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url: str) -> HostLimiter:
+    """Get the shared limiter for the host of the given URL."""
+    host = urlparse(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = HostLimiter(HOST_POLICIES.get(host, DEFAULT_POLICY))
+        return limiter
+
+
+def get_stats() -> Dict[str, Dict[str, float]]:
+    """Get the counters of every host contacted so far."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {host: limiter.stats() for host, limiter in sorted(limiters.items())}
+
+
+def reset_limiters() -> None:
+    """Forget all limiters, e.g., after changing :data:`HOST_POLICIES`."""
+    with _limiters_lock:
+        _limiters.clear()
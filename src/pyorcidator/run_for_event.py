@@ -1,59 +1,235 @@
-import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
 import click
-from urllib.parse import quote
-from SPARQLWrapper import SPARQLWrapper, JSON
-from pyorcidator.helper import render_orcid_qs
+from pyorcidator.cache import cache_options
+from pyorcidator.concurrency import prefetch
+from pyorcidator.helper import BATCH_SIZE, CURATION_LOCK, lookup_ids, render_orcid_qs
+from pyorcidator.import_info_from_list import (
+    close_uploader,
+    import_options,
+    import_orcids,
+    open_uploader,
+)
+from pyorcidator.jobs import Job, Journal
+from pyorcidator.metrics import metrics_options
+from pyorcidator.pending import curation_options
+from pyorcidator.sections import statements_fetch
+from pyorcidator.state import get_state_store, state_options
+from pyorcidator.upload import BatchUploader, text_to_urls
+from pyorcidator.wikidata_lookup import chunked, query_wikidata
+
+#: The number of researchers prepared ahead of the one being reviewed
+DEFAULT_PREFETCH = 3
+#: Properties linking an event to the researchers to import: speaker
+DEFAULT_PROPERTIES = ("P823",)
 
 
 def get_orcids_for_event(event_qid):
-    endpoint_url = "https://query.wikidata.org/sparql"
+    return get_orcids_for_events([event_qid])
+
+
+def get_orcids_for_events(
+    event_qids: Iterable[str] = (),
+    series_qids: Iterable[str] = (),
+    properties: Iterable[str] = DEFAULT_PROPERTIES,
+    chunk_size: int = BATCH_SIZE,
+) -> List[str]:
+    """
+    Get the ORCIDs of the participants of many events with chunked VALUES queries.
+
+    Args:
+        event_qids: The QIDs of events
+        series_qids: The QIDs of event series, whose events are linked with P179 (part of
+            the series)
+        properties: The properties linking an event to its participants, e.g., P823 (speaker)
+            and P710 (participant)
+        chunk_size: The maximum number of events or series per query
+
+    Returns:
+        The sorted ORCIDs of the participants, each listed once however many events
+        they took part in
+    """
+    property_values = " ".join(f"wdt:{prop}" for prop in properties)
+    orcids = set()
+    for qids, pattern in ((event_qids, "?event"), (series_qids, "?series")):
+        for chunk in chunked(sorted(set(qids)), chunk_size):
+            values = " ".join(f"wd:{qid}" for qid in chunk)
+            series_clause = "?event wdt:P179 ?series ." if pattern == "?series" else ""
+            query = f"""\
+                SELECT DISTINCT ?orcid WHERE {{
+                  VALUES {pattern} {{ {values} }}
+                  VALUES ?property {{ {property_values} }}
+                  {series_clause}
+                  ?event ?property ?participant .
+                  ?participant wdt:P496 ?orcid .
+                }}
+            """
+            orcids.update(result["orcid"]["value"] for result in query_wikidata(query))
+    return sorted(orcids)
+
+
+def review_orcids(
+    orcids: List[str],
+    job: Optional[Job] = None,
+    prefetch_depth: int = 0,
+    uploader: Optional[BatchUploader] = None,
+    delta: bool = False,
+    fetch: Optional[Callable[[str], Dict]] = None,
+) -> None:
+    """
+    Show the QuickStatements of each researcher for review, one at a time.
 
-    query = f"""
-    SELECT DISTINCT ?orcid WHERE {{
-      wd:{event_qid} wdt:P823 ?speaker.
-      ?speaker wdt:P496 ?orcid.
-    }}
+    Args:
+        orcids: The ORCIDs of the researchers
+        job: A job to journal reviewed researchers in and write their QuickStatements to.
+            If not given, reviewed researchers are journaled in processed_orcids.txt.
+        prefetch_depth: The number of researchers prepared in the background while one
+            is reviewed
+        uploader: An upload to add the QuickStatements of reviewed researchers to
+        delta: If statements already on Wikidata are left out
+        fetch: The function getting the ORCID record of a researcher, by default
+            :func:`pyorcidator.helper.get_orcid_data`
     """
+    journal = job.journal if job is not None else Journal("processed_orcids.txt")
+    try:
+        orcids_to_process = [orcid for orcid in orcids if orcid not in journal]
+        researcher_qids = lookup_ids(orcids_to_process, property="P496")
+
+        def _render(orcid: str) -> Union[str, Exception]:
+            try:
+                researcher_qid = researcher_qids.get(orcid, "LAST")
+                return render_orcid_qs(
+                    orcid, researcher_qid=researcher_qid, delta=delta, fetch=fetch
+                )
+            except Exception as e:
+                if job is None:
+                    raise
+                return e
 
-    sparql = SPARQLWrapper(endpoint_url)
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
+        # The next researchers are fetched and resolved while the current one is reviewed
+        results = prefetch(_render, orcids_to_process, depth=prefetch_depth)
+        try:
+            for orcid, qs in zip(orcids_to_process, results):
+                if isinstance(qs, Exception):
+                    job.fail(orcid, qs)
+                    continue
+                # Background curation prompts wait until the review is done
+                with CURATION_LOCK:
+                    print(f"===== Running for {orcid} ======")
+                    print(qs)
+                    for url in text_to_urls(qs):
+                        print(url)
+                    mock = input("Enter anything to continue.")
 
-    orcids = [result["orcid"]["value"] for result in results["results"]["bindings"]]
-    return orcids
+                if uploader is not None:
+                    uploader.add(qs)
+                # Record processed ORCIDs
+                if job is not None:
+                    job.write(orcid, qs + "\n")
+                else:
+                    journal.record(orcid)
+        finally:
+            results.close()
+    finally:
+        if job is None:
+            journal.close()
 
 
 @click.command(name="parse_event")
 @click.option(
     "--event_qid",
-    prompt="Event QID",
-    help="The QID of the event you are interested in",
+    "event_qids",
+    multiple=True,
+    help="The QID of an event you are interested in. Can be given several times.",
+)
+@click.option(
+    "--series",
+    "series_qids",
+    multiple=True,
+    help="The QID of an event series, whose events are all imported. Can be given several times.",
+)
+@click.option(
+    "--property",
+    "properties",
+    multiple=True,
+    default=DEFAULT_PROPERTIES,
+    show_default=True,
+    help="A property linking events to the researchers to import, e.g., P710 for participants",
+)
+@click.option(
+    "--no-review",
+    is_flag=True,
+    help="Import all researchers with the concurrent list pipeline instead of reviewing "
+    "them one at a time",
+)
+@click.option(
+    "--prefetch",
+    "prefetch_depth",
+    type=int,
+    default=DEFAULT_PREFETCH,
+    show_default=True,
+    help="The number of researchers prepared in the background while one is reviewed",
 )
-def import_orcids_from_event(event_qid: str):
-    processed_orcids_file = "processed_orcids.txt"
-    if os.path.exists(processed_orcids_file):
-        with open(processed_orcids_file) as f:
-            processed_orcids = f.read().splitlines()
-    else:
-        processed_orcids = []
-
-    orcids = get_orcids_for_event(event_qid)
-    orcids_to_process = [orcid for orcid in orcids if orcid not in processed_orcids]
-
-    for orcid in orcids_to_process:
-        print(f"===== Running for {orcid} ======")
-        qs = render_orcid_qs(orcid)
-        quoted_qs = quote(qs.replace("\t", "|").replace("\n", "||"), safe="")
-        url = f"https://quickstatements.toolforge.org/#/v1={quoted_qs}\\"
-        print(qs)
-        print(url)
-        mock = input("Enter anything to continue.")
-
-        # Record processed ORCIDs
-        processed_orcids.append(orcid)
-        with open(processed_orcids_file, "a") as f:
-            f.write(f"{orcid}\n")
+@import_options
+@state_options
+@cache_options
+@curation_options
+@metrics_options
+def import_orcids_from_event(
+    event_qids: Tuple[str, ...],
+    series_qids: Tuple[str, ...],
+    properties: Tuple[str, ...],
+    no_review: bool,
+    prefetch_depth: int,
+    job: Optional[str],
+    shard_size: int,
+    output: Optional[str],
+    upload: Optional[str],
+    upload_batch_bytes: int,
+    upload_workers: int,
+    delta: bool,
+    statements: Tuple[str, ...],
+    **kwargs,
+):
+    """Import ORCID information for the speakers of events."""
+    if not event_qids and not series_qids:
+        event_qids = (click.prompt("Event QID"),)
+    orcids = get_orcids_for_events(event_qids, series_qids, properties)
+    click.echo(f"Found {len(orcids):,} researchers", err=True)
+    if no_review:
+        import_orcids(
+            orcids,
+            job=job,
+            shard_size=shard_size,
+            output=output,
+            upload=upload,
+            upload_batch_bytes=upload_batch_bytes,
+            upload_workers=upload_workers,
+            delta=delta,
+            statements=statements,
+            **kwargs,
+        )
+        return
+    if output is not None:
+        raise click.UsageError("--output requires --no-review")
+    if get_state_store() is not None:
+        raise click.UsageError("--state-file and --since require --no-review")
+    # Reviewed researchers are submitted in batches as the review goes on
+    uploader = open_uploader(upload, job, upload_batch_bytes, upload_workers)
+    review_options = dict(
+        prefetch_depth=prefetch_depth,
+        uploader=uploader,
+        delta=delta,
+        fetch=statements_fetch(statements),
+    )
+    try:
+        if job is None:
+            review_orcids(orcids, **review_options)
+            return
+        with Job(job, shard_size=shard_size) as running:
+            review_orcids(orcids, job=running, **review_options)
+    finally:
+        if uploader is not None:
+            close_uploader(uploader)
 
 
 if __name__ == "__main__":
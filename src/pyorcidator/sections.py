@@ -0,0 +1,196 @@
+"""Fetch only the sections of ORCID records needed for the enabled statement types."""
+
+import logging
+from functools import partial
+from typing import Callable, Collection, Dict, Iterable, List, Optional
+
+from .helper import get_orcid_json, get_record_orcid
+from .http_client import get_client
+from .metrics import timed
+from .wikidata_lookup import chunked
+
+__all__ = [
+    "STATEMENT_TYPES",
+    "get_orcid_sections",
+    "get_works_bulk",
+    "select_statements",
+    "statements_fetch",
+]
+
+logger = logging.getLogger(__name__)
+
+#: Statement types that can be enabled, beyond the P31, P106 and P496 claims emitted for
+#: every researcher: fields of work (P101), employers (P108), education (P69), authorship
+#: of papers (P50) and identifiers on other sites, e.g., Scopus
+STATEMENT_TYPES = ("keywords", "employments", "educations", "works", "identifiers")
+#: The largest number of works the bulk works endpoint returns in a single call
+MAX_BULK_WORKS = 100
+
+
+def _empty_record(orcid: str) -> Dict:
+    # The shape of a version 2.0 record, as read by get_orcid_quickstatements
+    return {
+        "orcid-identifier": {"path": orcid},
+        "history": None,
+        "person": {
+            "name": None,
+            "keywords": {"keyword": []},
+            "external-identifiers": {"external-identifier": []},
+            "researcher-urls": {"researcher-url": []},
+        },
+        "activities-summary": {
+            "employments": {"employment-summary": []},
+            "educations": {"education-summary": []},
+            "works": {"group": []},
+        },
+    }
+
+
+def _get_section(orcid: str, section: str) -> Dict:
+    url = f"{get_client().orcid_v3_api_url}{orcid}/{section}"
+    return get_orcid_json(url, f"{orcid}/v3.0/{section}") or {}
+
+
+def _affiliation_summaries(section: Dict, kind: str) -> List[Dict]:
+    return [
+        summary[f"{kind}-summary"]
+        for group in section.get("affiliation-group", [])
+        for summary in group.get("summaries", [])
+    ]
+
+
+@timed("get_orcid_sections", per_orcid=True)
+def get_orcid_sections(
+    orcid: str, statements: Collection[str] = STATEMENT_TYPES, complete_works: bool = True
+) -> Dict:
+    """
+    Fetch the sections of an ORCID record needed for the given statement types.
+
+    The sections are fetched from the version 3.0 API and put together in the shape of a
+    whole version 2.0 record, as returned by :func:`pyorcidator.helper.get_orcid_data`,
+    with the sections that are not needed left empty. The name is always fetched, since
+    it labels new items. The history is not fetched, so the record has no last-modified
+    date for :class:`pyorcidator.state.StateStore` to compare.
+
+    Args:
+        orcid: The ORCID of the researcher
+        statements: The statement types to fetch sections for, see :data:`STATEMENT_TYPES`
+        complete_works: If all external identifiers of each work are fetched with the
+            bulk works endpoint, instead of only those grouping the works in the summary
+
+    Returns:
+        The record, with the parts of the enabled statement types
+    """
+    unknown = set(statements).difference(STATEMENT_TYPES)
+    if unknown:
+        raise ValueError(f"unknown statement types: {', '.join(sorted(unknown))}")
+    rv = _empty_record(orcid)
+    person = rv["person"]
+    if "identifiers" in statements:
+        # The person section has the name, keywords, identifiers and URLs in one response
+        data = _get_section(orcid, "person")
+        person["name"] = data.get("name")
+        person["external-identifiers"] = data.get("external-identifiers") or {
+            "external-identifier": []
+        }
+        person["researcher-urls"] = data.get("researcher-urls") or {"researcher-url": []}
+        if "keywords" in statements:
+            person["keywords"] = data.get("keywords") or {"keyword": []}
+    else:
+        person["name"] = _get_section(orcid, "personal-details").get("name")
+        if "keywords" in statements:
+            person["keywords"] = {"keyword": _get_section(orcid, "keywords").get("keyword", [])}
+
+    activities = rv["activities-summary"]
+    for kind in ("employment", "education"):
+        if f"{kind}s" in statements:
+            summaries = _affiliation_summaries(_get_section(orcid, f"{kind}s"), kind)
+            activities[f"{kind}s"][f"{kind}-summary"] = summaries
+    if "works" in statements:
+        groups = _get_section(orcid, "works").get("group", [])
+        if complete_works:
+            _complete_work_groups(orcid, groups)
+        activities["works"]["group"] = groups
+    return rv
+
+
+def _complete_work_groups(orcid: str, groups: List[Dict]) -> None:
+    put_codes = [
+        summary["put-code"] for group in groups for summary in group.get("work-summary", [])
+    ]
+    external_ids = {}
+    for work in get_works_bulk(orcid, put_codes):
+        external_ids[work["put-code"]] = (work.get("external-ids") or {}).get("external-id") or []
+    for group in groups:
+        ids = group.setdefault("external-ids", {}).setdefault("external-id", [])
+        seen = {(i["external-id-type"], i["external-id-value"]) for i in ids}
+        for summary in group.get("work-summary", []):
+            for external_id in external_ids.get(summary["put-code"], []):
+                key = external_id["external-id-type"], external_id["external-id-value"]
+                if key not in seen:
+                    seen.add(key)
+                    ids.append(external_id)
+
+
+def get_works_bulk(orcid: str, put_codes: Iterable[int]) -> List[Dict]:
+    """
+    Fetch full works with the bulk works endpoint, up to 100 in a single call.
+
+    Args:
+        orcid: The ORCID of the researcher
+        put_codes: The put codes of the works, as in the work summaries
+
+    Returns:
+        The works that could be fetched. Works the API reports an error for are left out.
+    """
+    rv = []
+    for chunk in chunked(sorted(set(put_codes)), MAX_BULK_WORKS):
+        codes = ",".join(map(str, chunk))
+        url = f"{get_client().orcid_v3_api_url}{orcid}/works/{codes}"
+        data = get_orcid_json(url, f"{orcid}/v3.0/works/{codes}") or {}
+        for item in data.get("bulk", []):
+            if "work" in item:
+                rv.append(item["work"])
+            else:
+                logger.warning("could not fetch a work of %s: %s", orcid, item.get("error"))
+    return rv
+
+
+def select_statements(data: Dict, statements: Collection[str]) -> Dict:
+    """Empty the sections of a whole version 2.0 record that the statement types do not need."""
+    rv = _empty_record(get_record_orcid(data))
+    rv["history"] = data.get("history")
+    person, activities = data["person"], data["activities-summary"]
+    rv["person"]["name"] = person["name"]
+    if "keywords" in statements:
+        rv["person"]["keywords"] = person["keywords"]
+    if "identifiers" in statements:
+        rv["person"]["external-identifiers"] = person["external-identifiers"]
+        rv["person"]["researcher-urls"] = person["researcher-urls"]
+    for section in ("employments", "educations", "works"):
+        if section in statements:
+            rv["activities-summary"][section] = activities[section]
+    return rv
+
+
+def statements_fetch(
+    statements: Collection[str], fetch: Optional[Callable[[str], Dict]] = None
+) -> Optional[Callable[[str], Dict]]:
+    """
+    Get a function getting the ORCID record of a researcher for the given statement types.
+
+    Args:
+        statements: The enabled statement types. If none are given, all of them are and the
+            whole record is used, as by default.
+        fetch: The function getting whole records, if not the ORCID API. Its records are
+            reduced with :func:`select_statements` instead of fetching sections.
+
+    Returns:
+        The function, or ``fetch`` if all statement types are enabled
+    """
+    if not statements:
+        return fetch
+    statements = tuple(statements)
+    if fetch is None:
+        return partial(get_orcid_sections, statements=statements)
+    return lambda orcid: select_statements(fetch(orcid), statements)
@@ -0,0 +1,187 @@
+"""The state of earlier runs, to skip researchers whose ORCID records have not changed."""
+
+import datetime
+import functools
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import click
+
+from .metrics import count
+
+__all__ = [
+    "StateStore",
+    "get_last_modified",
+    "hash_qs",
+    "parse_since",
+    "get_state_store",
+    "set_state_store",
+    "state_options",
+]
+
+SCHEMA = """\
+CREATE TABLE IF NOT EXISTS records (
+    orcid TEXT PRIMARY KEY,
+    last_modified INTEGER,
+    qs_hash TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def get_last_modified(data: Dict) -> Optional[int]:
+    """Get when an ORCID record was last modified, in milliseconds since the epoch."""
+    history = data.get("history") or {}
+    date = history.get("last-modified-date")
+    return int(date["value"]) if date else None
+
+
+def hash_qs(qs: str) -> str:
+    """Get a hash of the QuickStatements emitted for a researcher."""
+    return hashlib.sha1(qs.encode("utf-8")).hexdigest()
+
+
+def parse_since(value: str) -> int:
+    """Parse an ISO 8601 date or date and time, in UTC unless given, to epoch milliseconds."""
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+class StateStore:
+    """
+    The last-modified date of each researcher's ORCID record and a hash of what was emitted.
+
+    A researcher is skipped before any QIDs are resolved if its record has not been
+    modified since the last run, or was last modified before ``since``. Researchers
+    whose QuickStatements come out the same as in the last run are not emitted again.
+    """
+
+    def __init__(self, path: Union[str, Path] = ":memory:", since: Optional[int] = None):
+        """
+        Open or create a state store.
+
+        Args:
+            path: The path of the SQLite file. By default, the state is only kept in memory,
+                e.g., to filter by ``since`` alone.
+            since: Skip records last modified before this time, in milliseconds since
+                the epoch
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.since = since
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+
+    def get(self, orcid: str) -> Optional[Tuple[Optional[int], str]]:
+        """Get the last-modified date and QuickStatements hash recorded for a researcher."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT last_modified, qs_hash FROM records WHERE orcid = ?", (orcid,)
+            ).fetchone()
+
+    def is_unchanged(self, orcid: str, data: Dict) -> bool:
+        """Check if a record can be skipped without resolving anything, counting it if so."""
+        last_modified = get_last_modified(data)
+        if last_modified is None:
+            return False
+        if self.since is not None and last_modified < self.since:
+            skip = True
+        else:
+            row = self.get(orcid)
+            skip = row is not None and row[0] == last_modified
+        if skip:
+            count("researchers_skipped", reason="unchanged")
+            with self._lock:
+                self.skipped += 1
+        return skip
+
+    def is_same_output(self, orcid: str, qs: str) -> bool:
+        """Check if a researcher's QuickStatements are the same as last run, counting it if so."""
+        row = self.get(orcid)
+        same = row is not None and row[1] == hash_qs(qs)
+        if same:
+            count("researchers_skipped", reason="same_output")
+            with self._lock:
+                self.skipped += 1
+        return same
+
+    def put_many(self, entries: Iterable[Tuple[str, Optional[int], str]]) -> None:
+        """
+        Record researchers as emitted.
+
+        Args:
+            entries: Triples of ORCID, last-modified date and emitted QuickStatements
+        """
+        now = time.time()
+        rows = [(orcid, last_modified, hash_qs(qs), now) for orcid, last_modified, qs in entries]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO records (orcid, last_modified, qs_hash, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+
+_state_store: Optional[StateStore] = None
+
+
+def get_state_store() -> Optional[StateStore]:
+    """Get the state store unchanged researchers are skipped with, if one is configured."""
+    return _state_store
+
+
+def set_state_store(store: Optional[StateStore]) -> None:
+    """Set the state store to skip unchanged researchers with. Pass None to process all."""
+    global _state_store
+    _state_store = store
+
+
+def state_options(f):
+    """Add the ``--state-file`` and ``--since`` options to a command."""
+
+    @click.option(
+        "--state-file",
+        type=click.Path(dir_okay=False),
+        help="Skip researchers whose ORCID record or QuickStatements have not changed since "
+        "the last run with this file, and record this run in it",
+    )
+    @click.option(
+        "--since",
+        help="Only process records modified at or after this ISO 8601 date, e.g., 2024-01-31",
+    )
+    @functools.wraps(f)
+    def _wrapped(*args, state_file: Optional[str], since: Optional[str], **kwargs):
+        if state_file is None and since is None:
+            return f(*args, **kwargs)
+        try:
+            since_ms = parse_since(since) if since is not None else None
+        except ValueError:
+            raise click.BadParameter(f"not an ISO 8601 date: {since}", param_hint="--since")
+        store = StateStore(state_file or ":memory:", since=since_ms)
+        set_state_store(store)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            set_state_store(None)
+            store.close()
+            if store.skipped:
+                click.echo(f"{store.skipped:,} unchanged researchers skipped", err=True)
+
+    return _wrapped
@@ -0,0 +1,202 @@
+"""A compact model of QuickStatements, rendered directly to the V1 text format."""
+
+import datetime
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+
+if TYPE_CHECKING:
+    from quickstatements_client import Line
+
+__all__ = [
+    "Qualifier",
+    "Statement",
+    "entity_qualifier",
+    "text_qualifier",
+    "date_qualifier",
+    "render_statements",
+    "to_lines",
+]
+
+#: A qualifier or reference as (type, property, target), with the type being Entity, Text or
+#: Date as in :mod:`quickstatements_client`. Date targets are already formatted.
+Qualifier = Tuple[str, str, str]
+
+#: Matches the QID of an existing item, as opposed to LAST or a label
+QID_REGEX = re.compile(r"^Q\d+$")
+
+
+def entity_qualifier(predicate: str, target: str) -> Qualifier:
+    """Get a qualifier pointing to a Wikidata item."""
+    return "Entity", predicate, target
+
+
+def text_qualifier(predicate: str, target: str) -> Qualifier:
+    """Get a qualifier pointing to a string, e.g., a reference URL with S854."""
+    return "Text", predicate, target
+
+
+def date_qualifier(predicate: str, target: datetime.date, precision: int) -> Qualifier:
+    """
+    Get a qualifier pointing to a date, e.g., with P580 for a start time.
+
+    Args:
+        predicate: The property of the qualifier
+        target: The date
+        precision: The Wikidata precision of the date: 9 for a year, 10 for a month or 11
+            for a day
+
+    Raises:
+        ValueError: If the precision is not one of these
+    """
+    # The same format as quickstatements_client.DateQualifier, without building one
+    if precision == 11:
+        date = f"+{target.year:04}-{target.month:02}-{target.day:02}"
+    elif precision == 10:
+        date = f"+{target.year:04}-{target.month:02}-00"
+    elif precision == 9:
+        date = f"+{target.year:04}-00-00"
+    else:
+        raise ValueError(f"Invalid precision: {precision}")
+    return "Date", predicate, f"{date}T00:00:00Z/{precision}"
+
+
+class Statement:
+    """
+    Class for a single QuickStatements line, without validating it.
+
+    Validating the pydantic models of :mod:`quickstatements_client` for every statement
+    is most of the work of rendering large batches, so lines are kept in this form and
+    rendered with :func:`render_statements`. Only the QuickStatements API client needs
+    the pydantic models, see :func:`to_lines`, so pydantic is only imported for it.
+    """
+
+    # Written out rather than with dataclass(slots=True), which needs Python 3.10
+    __slots__ = ("type", "subject", "predicate", "target", "qualifiers")
+
+    def __init__(
+        self,
+        type: str,
+        subject: str = "",
+        predicate: str = "",
+        target: str = "",
+        qualifiers: Tuple[Qualifier, ...] = (),
+    ):
+        """
+        Get a statement.
+
+        Args:
+            type: Entity, Text or Create, as the ``type`` of the lines of
+                :mod:`quickstatements_client`
+            subject: The QID of the item, or LAST for the last created one
+            predicate: The property, or a label or description code, e.g., Len
+            target: The QID or string the statement points to
+            qualifiers: Qualifiers and references. Statements of a researcher can share
+                the same tuple.
+        """
+        self.type = type
+        self.subject = subject
+        self.predicate = predicate
+        self.target = target
+        self.qualifiers = qualifiers
+
+    def _key(self) -> Tuple:
+        return self.type, self.subject, self.predicate, self.target, self.qualifiers
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Statement):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in zip(self.__slots__, self._key()))
+        return f"Statement({fields})"
+
+    @classmethod
+    def create(cls) -> "Statement":
+        """Get a CREATE line."""
+        return cls("Create")
+
+    @classmethod
+    def entity(
+        cls, subject: str, predicate: str, target: str, qualifiers: Tuple[Qualifier, ...] = ()
+    ) -> "Statement":
+        """
+        Get a line whose target is a Wikidata item.
+
+        Raises:
+            ValueError: If the target is not a QID, as EntityLine would
+        """
+        if not QID_REGEX.match(target):
+            raise ValueError(f"invalid target for {subject}|{predicate}: {target!r}")
+        return cls("Entity", subject, predicate, target, qualifiers)
+
+    @classmethod
+    def text(
+        cls, subject: str, predicate: str, target: str, qualifiers: Tuple[Qualifier, ...] = ()
+    ) -> "Statement":
+        """Get a line whose target is a string, or a label or description, e.g., with Len."""
+        return cls("Text", subject, predicate, target, qualifiers)
+
+    def get_line(self, sep: str = "|") -> str:
+        """Get the QuickStatements line, as the lines of :mod:`quickstatements_client` do."""
+        return render_statements([self], sep=sep)
+
+    def to_line(self) -> "Line":
+        """Get the pydantic model of the line, validating it."""
+        from quickstatements_client import CreateLine, EntityLine, TextLine
+
+        if self.type == "Create":
+            return CreateLine()
+        cls = EntityLine if self.type == "Entity" else TextLine
+        return cls(
+            subject=self.subject,
+            predicate=self.predicate,
+            target=self.target,
+            qualifiers=[_to_qualifier(qualifier) for qualifier in self.qualifiers],
+        )
+
+
+def _to_qualifier(qualifier: Qualifier):
+    from quickstatements_client import DateQualifier, EntityQualifier, TextQualifier
+
+    kind, predicate, target = qualifier
+    cls = {"Entity": EntityQualifier, "Text": TextQualifier, "Date": DateQualifier}[kind]
+    return cls(predicate=predicate, target=target)
+
+
+def _render_target(kind: str, target: str) -> str:
+    return f'"{target}"' if kind == "Text" else target
+
+
+def render_statements(statements: Iterable[Statement], sep: str = "|", newline: str = "\n") -> str:
+    """
+    Render statements in the QuickStatements V1 format, as ``render_lines`` would.
+
+    The qualifiers shared by many statements, such as the ORCID reference of a researcher,
+    are rendered once.
+
+    Args:
+        statements: The statements to render
+        sep: The separator of the parts of a line, e.g., a tab for pasting in the tool
+        newline: The separator of lines, e.g., ``||`` for URLs
+    """
+    rendered_qualifiers: Dict[Tuple[Qualifier, ...], str] = {}
+    rv: List[str] = []
+    for statement in statements:
+        if statement.type == "Create":
+            rv.append("CREATE")
+            continue
+        qualifiers = rendered_qualifiers.get(statement.qualifiers)
+        if qualifiers is None:
+            qualifiers = rendered_qualifiers[statement.qualifiers] = "".join(
+                f"{sep}{predicate}{sep}{_render_target(kind, target)}"
+                for kind, predicate, target in statement.qualifiers
+            )
+        target = _render_target(statement.type, statement.target)
+        rv.append(f"{statement.subject}{sep}{statement.predicate}{sep}{target}{qualifiers}")
+    return newline.join(rv)
+
+
+def to_lines(statements: Iterable[Statement]) -> List["Line"]:
+    """Get the pydantic models of statements, e.g., to post them with the QuickStatements API."""
+    return [statement.to_line() for statement in statements]
@@ -0,0 +1,293 @@
+"""Submit QuickStatements in size-bounded batches, or split them over several URLs."""
+
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union
+from urllib.parse import quote
+
+import requests
+
+from .http_client import get_client
+
+__all__ = [
+    "BatchUploader",
+    "pack",
+    "iter_statement_groups",
+    "quickstatements_urls",
+    "text_to_urls",
+]
+
+logger = logging.getLogger(__name__)
+
+QUICKSTATEMENTS_URL = "https://quickstatements.toolforge.org"
+#: The longest QuickStatements URL. The payload is in the fragment, which browsers handle
+#: up to far longer URLs, but copying, sharing and proxies commonly cut URLs past 8 KB.
+DEFAULT_MAX_URL_LENGTH = 8_000
+#: The largest batch submitted to the QuickStatements API, in bytes
+DEFAULT_BATCH_BYTES = 1_000_000
+#: The number of batches submitted at the same time
+DEFAULT_UPLOAD_WORKERS = 2
+DEFAULT_UPLOAD_LOG = "quickstatements_batches.jsonl"
+#: Statuses from a gateway in front of the API, which may have passed the batch on anyway
+UNCLEAR_STATUSES = {502, 503, 504}
+
+
+def pack(chunks: Iterable[str], max_size: int, size=len) -> Iterator[List[str]]:
+    """
+    Pack chunks, e.g., the QuickStatements of each researcher, into groups of bounded size.
+
+    A chunk is never split, so the CREATE and LAST lines of a new item stay together. A chunk
+    larger than the limit gets a group of its own.
+
+    Args:
+        chunks: The chunks, in order
+        max_size: The largest total size of a group
+        size: The function giving the size of a chunk
+
+    Yields:
+        Groups of consecutive chunks
+    """
+    group: List[str] = []
+    total = 0
+    for chunk in chunks:
+        chunk_size = size(chunk)
+        if group and total + chunk_size > max_size:
+            yield group
+            group, total = [], 0
+        group.append(chunk)
+        total += chunk_size
+    if group:
+        yield group
+
+
+def iter_statement_groups(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Group lines of QuickStatements that have to be submitted together.
+
+    A ``LAST`` line refers to the item created by the ``CREATE`` before it, so it is kept
+    in the group of the line before it. Every other line starts a new group.
+
+    Args:
+        lines: The lines, with their line endings, e.g., an open QuickStatements file
+
+    Yields:
+        The text of each group
+    """
+    group: List[str] = []
+    for line in lines:
+        if group and not line.startswith("LAST"):
+            yield "".join(group)
+            group = []
+        if line.strip():
+            group.append(line)
+    if group:
+        yield "".join(group)
+
+
+def _to_v1(qs: str) -> str:
+    # The v1 format of URLs and the API separates lines with a double pipe
+    return qs.rstrip("\n").replace("\t", "|").replace("\n", "||")
+
+
+def quickstatements_urls(
+    chunks: Iterable[str], max_length: int = DEFAULT_MAX_URL_LENGTH
+) -> List[str]:
+    """
+    Get QuickStatements URLs for QuickStatements that may be too long for a single URL.
+
+    The chunks are packed into as few URLs as fit the length limit. A chunk is never split,
+    so a chunk longer than the limit gets an overlong URL of its own.
+
+    Args:
+        chunks: The QuickStatements, in chunks that can go to different URLs, e.g., from
+            :func:`iter_statement_groups`
+        max_length: The longest URL
+
+    Returns:
+        The URLs, in order
+    """
+    prefix = f"{QUICKSTATEMENTS_URL}/#/v1="
+    # Quoting is per character, so the quoted parts add up, with a quoted "||" between them
+    separator = quote("||", safe="")
+    quoted = (quote(_to_v1(chunk), safe="") for chunk in chunks if chunk.strip())
+    budget = max_length - len(prefix)
+    return [
+        prefix + separator.join(group)
+        for group in pack(quoted, budget, size=lambda part: len(part) + len(separator))
+    ]
+
+
+def text_to_urls(qs: str, max_length: int = DEFAULT_MAX_URL_LENGTH) -> List[str]:
+    """Get QuickStatements URLs for tab-separated QuickStatements, split at safe places."""
+    return quickstatements_urls(iter_statement_groups(qs.splitlines(keepends=True)), max_length)
+
+
+class BatchUploader:
+    """
+    Packs QuickStatements of many researchers into batches and submits them concurrently.
+
+    Each batch is named after the job, its position and a hash of its content, so the
+    same batch gets the same name on every run. Every submission is logged as a JSON line,
+    and batches logged as submitted by an earlier run are not submitted again.
+
+    Submitting a batch twice creates its items twice, so submissions are never retried
+    once they may have reached the API. Batches whose submission timed out or got a
+    gateway error are logged with the UNKNOWN status. They count as failed, but are not
+    submitted again by later runs either: check them on QuickStatements by hand, and
+    remove their lines from the log to submit them again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int = DEFAULT_BATCH_BYTES,
+        workers: int = DEFAULT_UPLOAD_WORKERS,
+        log_path: Union[str, Path] = DEFAULT_UPLOAD_LOG,
+        client=None,
+    ):
+        """
+        Start an upload.
+
+        Args:
+            name: The prefix of the batch names
+            max_bytes: The largest batch, in bytes. A researcher is never split over batches.
+            workers: The number of batches submitted at the same time
+            log_path: The file submissions are logged to
+            client: A :class:`quickstatements_client.QuickStatementsClient` with the API
+                endpoint and credentials. By default, the credentials are loaded from the
+                ``quickstatements`` pystow configuration.
+        """
+        if client is None:
+            from quickstatements_client import QuickStatementsClient
+
+            client = QuickStatementsClient()
+        self.name = name
+        self.max_bytes = max_bytes
+        self.client = client
+        self.log_path = Path(log_path)
+        self.submitted = set()
+        self.unclear = set()
+        if self.log_path.is_file():
+            for line in self.log_path.read_text().splitlines():
+                record = json.loads(line)
+                if record["status"] == "OK":
+                    self.submitted.add(record["name"])
+                elif record["status"] == "UNKNOWN":
+                    self.unclear.add(record["name"])
+        self.records: List[Dict] = []
+        self._buffer: List[str] = []
+        self._size = 0
+        self._index = 0
+        self._lock = threading.Lock()
+        self._log = self.log_path.open("a", encoding="utf-8")
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        # Bounds the batches held in memory while waiting for a free worker
+        self._slots = threading.BoundedSemaphore(2 * workers)
+
+    def add(self, qs: str) -> None:
+        """Add the QuickStatements of a researcher, submitting a batch when it is full."""
+        data = _to_v1(qs)
+        if not data:
+            return
+        size = len(data.encode("utf-8")) + 2
+        if self._buffer and self._size + size > self.max_bytes:
+            self.flush()
+        self._buffer.append(data)
+        self._size += size
+
+    def flush(self) -> None:
+        """Submit the researchers added since the last batch."""
+        if not self._buffer:
+            return
+        data = "||".join(self._buffer)
+        digest = hashlib.sha1(data.encode("utf-8")).hexdigest()[:8]
+        batch_name = f"{self.name}-{self._index:04d}-{digest}"
+        count = len(self._buffer)
+        self._buffer, self._size = [], 0
+        self._index += 1
+        if batch_name in self.submitted:
+            logger.info("skipping batch %s, which was submitted before", batch_name)
+            return
+        if batch_name in self.unclear:
+            logger.warning(
+                "skipping batch %s, which may have been submitted before. Check it by hand.",
+                batch_name,
+            )
+            return
+        self._slots.acquire()
+        self._executor.submit(self._submit, batch_name, data, count)
+
+    def _submit(self, batch_name: str, data: str, count: int) -> None:
+        record = {"name": batch_name, "researchers": count, "bytes": len(data.encode("utf-8"))}
+        try:
+            res = get_client().post(
+                self.client.endpoint,
+                data={
+                    "action": "import",
+                    "submit": 1,
+                    "format": "v1",
+                    "site": "wikidata",
+                    "compress": 0,
+                    "username": self.client.username,
+                    "token": self.client.token,
+                    "batchname": batch_name,
+                    "data": data,
+                },
+                # Large batches take a while to be stored
+                timeout=(10, 300),
+                idempotent=False,
+            )
+            if res.status_code in UNCLEAR_STATUSES:
+                record["status"] = "UNKNOWN"
+                record["error"] = f"{res.status_code} from the gateway, the batch may exist"
+                logger.warning("batch %s may have been submitted: %s", batch_name, res.status_code)
+                return
+            res.raise_for_status()
+            response = res.json()
+            record["status"] = response.get("status", "")
+            batch_id = response.get("batch_id")
+            if record["status"] == "OK" and batch_id is not None:
+                record["batch_id"] = batch_id
+                record["batch_url"] = f"{self.client.base_url}/#/batch/{batch_id}"
+            else:
+                record["error"] = json.dumps(response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            # Only a connect timeout is sure not to have reached the API
+            unclear = not isinstance(e, requests.ConnectTimeout)
+            logger.warning("failed to submit batch %s: %s", batch_name, e)
+            record["status"] = "UNKNOWN" if unclear else "ERROR"
+            record["error"] = str(e)
+        except Exception as e:
+            logger.warning("failed to submit batch %s: %s", batch_name, e)
+            record["status"] = "ERROR"
+            record["error"] = str(e)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.records.append(record)
+                self._log.write(json.dumps(record) + "\n")
+                self._log.flush()
+
+    @property
+    def failed(self) -> List[Dict]:
+        """The records of the batches that could not be submitted."""
+        with self._lock:
+            return [record for record in self.records if record["status"] != "OK"]
+
+    def close(self) -> None:
+        """Submit the last batch and wait for all submissions to finish."""
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._log.close()
+
+    def __enter__(self) -> "BatchUploader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
@@ -1,23 +1,51 @@
-import requests
-from SPARQLWrapper import JSON, SPARQLWrapper
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
+
+from .cache import get_query_cache
+from .http_client import get_client
 
 __all__ = [
+    "chunked",
     "query_wikidata",
     "search_wikidata",
     "parse_wikidata_result",
 ]
 
+X = TypeVar("X")
+
+
+def chunked(iterable: Iterable[X], size: int) -> Iterator[List[X]]:
+    """Split an iterable into lists of at most the given size, e.g., for SPARQL VALUES clauses."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 
 def query_wikidata(query):
-    """Run a query against wikidata."""
-    sparql = SPARQLWrapper(
-        "https://query.wikidata.org/sparql",
-        agent="PyORCIDator (https://github.com/lubianat/pyorcidator)",
+    """
+    Run a query against wikidata.
+
+    Results are memoized by the query cache (see :func:`pyorcidator.cache.configure_query_cache`).
+    """
+    cache = get_query_cache()
+    if cache is None:
+        return _query_wikidata(query)
+    return cache.get_or_compute(query, _query_wikidata)
+
+
+def _query_wikidata(query):
+    client = get_client()
+    # POST keeps long VALUES queries clear of URL length limits
+    res = client.post(
+        client.sparql_url,
+        data={"query": query},
+        headers={"Accept": "application/sparql-results+json"},
     )
-    sparql.setQuery(query)
-    sparql.setReturnFormat(JSON)
-    results = sparql.query().convert()
-    return results["results"]["bindings"]
+    res.raise_for_status()
+    return res.json()["results"]["bindings"]
 
 
 def search_wikidata(search_term):
@@ -25,7 +53,7 @@ def search_wikidata(search_term):
     Looks up string for institution on Wikidata
     """
 
-    base_url = "https://www.wikidata.org/w/api.php"
+    client = get_client()
     payload = {
         "action": "wbsearchentities",
         "search": search_term,
@@ -34,7 +62,7 @@ def search_wikidata(search_term):
         "origin": "*",
     }
 
-    res = requests.get(base_url, params=payload)
+    res = client.get(client.wikidata_api_url, params=payload)
 
     parsed_res = parse_wikidata_result(res.json())
     return parsed_res
@@ -0,0 +1,339 @@
+"""
+Offline benchmarks for PyORCIDator.
+
+ORCID records derived from ``sample.json`` and answers from a synthetic Wikidata are
+replayed by a local stand-in server, so runs are reproducible without network access.
+Each case runs in a fresh process, which reports its wall time and peak memory, while
+the server counts the requests sent to each API. Run ``python tests/benchmark.py --help``
+or ``tox -e bench`` for the options, e.g., to fail on regressions against a baseline.
+"""
+
+import io
+import json
+import os
+import re
+import resource
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional, Sequence
+
+import click
+from stand_in import StandInServer
+
+__all__ = [
+    "STAGES",
+    "Fixtures",
+    "run_benchmarks",
+    "compare",
+]
+
+HERE = Path(__file__).parent
+SAMPLE_PATH = HERE.joinpath("sample.json")
+SAMPLE_ORCID = "0000-0003-4423-4370"
+#: The code paths driven by the benchmarks
+STAGES = ("quickstatements", "import_list", "parse_event")
+DEFAULT_SIZES = (1, 100, 10_000)
+#: The share of a record's papers that all researchers have in common
+SHARED_PAPERS = 0.5
+ENTITY = "http://www.wikidata.org/entity/"
+DOI_PATTERN = re.compile(r'("external-id-type": "doi", "external-id-value": ")([^"]+)')
+
+
+def make_orcid(index: int) -> str:
+    """Get the ORCID of the researcher with the given index in the fixtures."""
+    return f"0000-0001-{index // 10_000:04d}-{index % 10_000:04d}"
+
+
+def _is_found(value: str) -> bool:
+    # About half of the identifiers are on the synthetic Wikidata, the same on every run
+    return zlib.crc32(value.encode("utf-8")) % 2 == 0
+
+
+def _qid(value: str) -> str:
+    return f"Q{100_000_000 + zlib.crc32(value.encode('utf-8')) % 100_000_000}"
+
+
+def _literal(value: str) -> Dict[str, str]:
+    return {"type": "literal", "value": value}
+
+
+def _uri(value: str) -> Dict[str, str]:
+    return {"type": "uri", "value": value}
+
+
+class Fixtures:
+    """ORCID records and Wikidata answers for a number of synthetic researchers."""
+
+    def __init__(self, size: int):
+        """
+        Derive the fixtures from the sample record.
+
+        Args:
+            size: The number of researchers. Each gets the sample record under its own
+                ORCID, with some papers shared by everyone and the others its own.
+        """
+        self.size = size
+        self._template = json.dumps(json.loads(SAMPLE_PATH.read_text()))
+        dois = sorted({match.group(2) for match in DOI_PATTERN.finditer(self._template)})
+        self._own_dois = set(dois[int(len(dois) * SHARED_PAPERS) :])
+
+    def orcids(self) -> List[str]:
+        """Get the ORCIDs of all researchers."""
+        return [make_orcid(index) for index in range(self.size)]
+
+    def routes(self):
+        """Get the routes serving the fixtures on a :class:`stand_in.StandInServer`."""
+        return {
+            "/orcid/": self.record,
+            "/sparql": self.sparql,
+            "/w/api.php": lambda params: {"search": []},
+        }
+
+    def record(self, params, orcid: str):
+        """Serve the ORCID record of a researcher, as pre-serialized JSON."""
+        match = re.fullmatch(r"0000-0001-(\d{4})-(\d{4})", orcid)
+        index = int(match.group(1) + match.group(2)) if match else self.size
+        if index >= self.size:
+            return 404, {"error-desc": f"{orcid} not found"}, {}
+
+        def _own_doi(doi_match) -> str:
+            prefix, doi = doi_match.groups()
+            return f"{prefix}{doi}.{index}" if doi in self._own_dois else doi_match.group(0)
+
+        return DOI_PATTERN.sub(_own_doi, self._template.replace(SAMPLE_ORCID, orcid))
+
+    def sparql(self, params):
+        """Answer the SPARQL queries PyORCIDator sends. Others get no results."""
+        query = params["query"][0]
+        if "wdt:P823" in query:
+            size = min(self.size, int(re.search(r"wd:Q(\d+)", query).group(1)))
+            bindings = [{"orcid": _literal(make_orcid(index))} for index in range(size)]
+        elif "VALUES (?property ?id)" in query:
+            bindings = [
+                {
+                    "property": _uri(f"http://www.wikidata.org/prop/direct/{prop}"),
+                    "id": _literal(value),
+                    "item": _uri(ENTITY + _qid(value)),
+                }
+                for prop, value in re.findall(r'\(wdt:(P\d+) "([^"]*)"\)', query)
+                if _is_found(value)
+            ]
+        elif "VALUES ?doi" in query:
+            bindings = [
+                {"doi": _literal(doi), "item": _literal(_qid(doi))}
+                for doi in _values(query)
+                if _is_found(doi)
+            ]
+        elif "VALUES ?id" in query:
+            bindings = [
+                {"id": _literal(value), "item": _uri(ENTITY + _qid(value))}
+                for value in _values(query)
+                if _is_found(value)
+            ]
+        else:
+            match = re.search(r'\?item wdt:P\d+ "([^"]*)"', query)
+            found = match is not None and _is_found(match.group(1))
+            bindings = [{"item": _uri(ENTITY + _qid(match.group(1)))}] if found else []
+        return {"head": {"vars": []}, "results": {"bindings": bindings}}
+
+
+def _values(query: str) -> List[str]:
+    block = re.search(r"VALUES \?\w+ \{(.*?)\}", query, re.DOTALL).group(1)
+    return re.findall(r'"([^"]*)"', block)
+
+
+def _run_case(
+    stage: str, size: int, url: str, workers: int, batch_size: int, directory: str
+) -> Dict[str, float]:
+    """Run one case in a fresh process and measure it."""
+    from pyorcidator import ratelimit
+    from pyorcidator.helper import get_orcid_quickstatements
+    from pyorcidator.http_client import HTTPClient, set_client
+    from pyorcidator.import_info_from_list import main as import_list
+    from pyorcidator.pending import PendingQueue, set_pending_queue
+    from pyorcidator.run_for_event import import_orcids_from_event
+
+    os.chdir(directory)
+    set_client(
+        HTTPClient(
+            orcid_api_url=f"{url}/orcid/",
+            sparql_url=f"{url}/sparql",
+            wikidata_api_url=f"{url}/w/api.php",
+        )
+    )
+    # The stand-in is not rate limited, so the benchmarks measure PyORCIDator alone
+    ratelimit.HOST_POLICIES[url.split("//")[1]] = ratelimit.HostPolicy(
+        rate=1e9, burst=10**9, max_concurrency=64
+    )
+    orcids = Fixtures(size).orcids()
+    Path("orcids.txt").write_text("".join(f"{orcid}\n" for orcid in orcids))
+    curation = ["--non-interactive", "--pending-file", "pending.json"]
+
+    started = time.perf_counter()
+    if stage == "quickstatements":
+        set_pending_queue(PendingQueue("pending.json"))
+        for orcid in orcids:
+            get_orcid_quickstatements(orcid)
+    elif stage == "import_list":
+        args = ["--orcid_list", "orcids.txt", "--workers", str(workers), "-o", "qs.txt"]
+        args += ["--batch-size", str(batch_size), *curation]
+        import_list.main(args, standalone_mode=False)
+    elif stage == "parse_event":
+        # Confirms each researcher's QuickStatements and discards the printout
+        sys.stdin = io.StringIO("\n" * size)
+        sys.stdout = open(os.devnull, "w")
+        import_orcids_from_event.main(["--event_qid", f"Q{size}", *curation], standalone_mode=False)
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+    else:
+        raise ValueError(f"unknown stage: {stage}")
+    seconds = time.perf_counter() - started
+
+    return {
+        "seconds": round(seconds, 3),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_memory_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run_benchmarks(
+    stages: Sequence[str] = STAGES,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    latency: float = 0.0,
+    workers: int = 8,
+    batch_size: int = 200,
+) -> List[Dict]:
+    """
+    Run each stage for each number of records against a local stand-in server.
+
+    Args:
+        stages: The code paths to run, see :data:`STAGES`
+        sizes: The numbers of records to run them for
+        latency: Seconds each stand-in response is delayed by
+        workers: The number of workers for ``import_list``
+        batch_size: The batch size for ``import_list``
+
+    Returns:
+        A result for each case, with its wall time, peak memory, throughput in records
+        per second and the number of requests sent to each API
+    """
+    results = []
+    with StandInServer(latency=latency, keep_requests=False) as server:
+        for size in sizes:
+            server.routes = Fixtures(size).routes()
+            for stage in stages:
+                server.counts.clear()
+                with TemporaryDirectory() as directory, ProcessPoolExecutor(
+                    max_workers=1, mp_context=get_context("spawn")
+                ) as executor:
+                    args = (stage, size, server.url, workers, batch_size, directory)
+                    result = executor.submit(_run_case, *args).result()
+                requests = {key: server.counts[key] for key in sorted(server.counts)}
+                results.append(
+                    {
+                        "stage": stage,
+                        "size": size,
+                        **result,
+                        "records_per_second": round(size / max(result["seconds"], 1e-9), 1),
+                        "requests": requests,
+                        "total_requests": sum(requests.values()),
+                    }
+                )
+    return results
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float = 1.5) -> List[str]:
+    """
+    Find regressions against a baseline from an earlier run.
+
+    The request counts are deterministic, so any increase is a regression. Wall time
+    and peak memory are regressions when they grow by more than the tolerance factor.
+
+    Returns:
+        A description of each regression
+    """
+    baseline_cases = {(case["stage"], case["size"]): case for case in baseline}
+    rv = []
+    for case in results:
+        before = baseline_cases.get((case["stage"], case["size"]))
+        if before is None:
+            continue
+        name = f"{case['stage']} at {case['size']:,} records"
+        if case["total_requests"] > before["total_requests"]:
+            rv.append(
+                f"{name}: {case['total_requests']:,} requests, was {before['total_requests']:,}"
+            )
+        for key in ("seconds", "peak_memory_mb"):
+            if case[key] > before[key] * tolerance:
+                rv.append(f"{name}: {key} is {case[key]}, was {before[key]}")
+    return rv
+
+
+@click.command()
+@click.option("--stage", "stages", multiple=True, type=click.Choice(STAGES), default=STAGES)
+@click.option(
+    "--sizes",
+    default=",".join(map(str, DEFAULT_SIZES)),
+    show_default=True,
+    help="Comma-separated numbers of records",
+)
+@click.option("--latency", type=float, default=0.0, show_default=True, help="Seconds per response")
+@click.option("--workers", type=int, default=8, show_default=True)
+@click.option("--batch-size", type=int, default=200, show_default=True)
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Write results as JSON")
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False, exists=True),
+    help="Results of an earlier run. Exits with an error on regressions.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=1.5,
+    show_default=True,
+    help="The factor by which wall time and memory may grow over the baseline",
+)
+def main(
+    stages: Sequence[str],
+    sizes: str,
+    latency: float,
+    workers: int,
+    batch_size: int,
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+):
+    """Run the offline benchmarks."""
+    results = run_benchmarks(
+        stages=stages,
+        sizes=[int(size) for size in sizes.split(",")],
+        latency=latency,
+        workers=workers,
+        batch_size=batch_size,
+    )
+    click.echo(
+        f"{'stage':<16}{'records':>8}{'seconds':>10}{'records/s':>11}{'peak MB':>9}  requests"
+    )
+    for case in results:
+        requests = ", ".join(f"{key}={count:,}" for key, count in case["requests"].items())
+        click.echo(
+            f"{case['stage']:<16}{case['size']:>8,}{case['seconds']:>10.2f}"
+            f"{case['records_per_second']:>11,.1f}{case['peak_memory_mb']:>9.1f}  {requests}"
+        )
+    if output:
+        Path(output).write_text(json.dumps(results, indent=2))
+    if baseline:
+        regressions = compare(results, json.loads(Path(baseline).read_text()), tolerance)
+        for regression in regressions:
+            click.echo(f"regression: {regression}", err=True)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
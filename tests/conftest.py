@@ -2,7 +2,9 @@ import json
 from pathlib import Path
 
 import pytest
+from stand_in import StandInServer
 
+from pyorcidator import cache, http_client, ratelimit
 from pyorcidator.helper import get_external_ids, get_orcid_data
 
 
@@ -37,3 +39,28 @@ def orcid_w_other_external_links():
     ids = get_external_ids(data)
 
     return ids
+
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    """
+    A local HTTP server standing in for the ORCID and Wikidata APIs.
+
+    Register a function from query parameters to a JSON response on ``server.routes``
+    for each path, e.g., ``/orcid/0000-0003-4423-4370``, ``/orcid3/0000-0003-4423-4370/works``
+    (version 3.0) or ``/sparql``, as described in :class:`stand_in.StandInServer`. The shared
+    HTTP client points at the server, with an empty query cache and fresh rate limiters, while
+    the fixture is active.
+    """
+    with StandInServer() as server:
+        client = http_client.HTTPClient(
+            orcid_api_url=f"{server.url}/orcid/",
+            sparql_url=f"{server.url}/sparql",
+            wikidata_api_url=f"{server.url}/w/api.php",
+            orcid_v3_api_url=f"{server.url}/orcid3/",
+        )
+        monkeypatch.setattr(http_client, "_client", client)
+        monkeypatch.setattr(cache, "_query_cache", cache.QueryCache())
+        ratelimit.reset_limiters()
+        yield server
+        client.close()
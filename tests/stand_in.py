@@ -0,0 +1,102 @@
+"""A local HTTP server standing in for the ORCID and Wikidata APIs in tests and benchmarks."""
+
+import gzip
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+__all__ = [
+    "StandInServer",
+]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves the responses registered on the server's routes."""
+
+    def do_GET(self):
+        self._respond(parse_qs(urlparse(self.path).query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+        self._respond(parse_qs(body))
+
+    def _respond(self, params):
+        path = urlparse(self.path).path
+        server = self.server
+        if server.keep_requests:
+            server.requests.append((self.command, self.path, dict(self.headers), params))
+        with server.lock:
+            server.counts[path.split("/")[1]] += 1
+        if server.latency:
+            time.sleep(server.latency)
+        handler = server.routes.get(path)
+        if handler is not None:
+            result = handler(params)
+        else:
+            # Routes ending in a slash serve every path below them, given the last segment
+            parent, _, name = path.rpartition("/")
+            handler = server.routes.get(f"{parent}/")
+            if handler is None:
+                self.send_error(404)
+                return
+            result = handler(params, name)
+        status, result, headers = result if isinstance(result, tuple) else (200, result, {})
+        # Pre-serialized JSON is sent as is
+        body = (result if isinstance(result, str) else json.dumps(result)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    A threaded local server answering with the functions registered on :attr:`routes`.
+
+    A route maps a path, e.g., ``/orcid/0000-0003-4423-4370`` or ``/sparql``, to a function
+    from query parameters to a response. A path ending in a slash, e.g., ``/orcid/``,
+    serves every path below it, and its function also gets the last segment of the path.
+    A response is JSON-serializable, pre-serialized JSON, or a ``(status, response, headers)``
+    tuple to answer with another status, e.g., a 429 with a ``Retry-After`` header.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, keep_requests: bool = True):
+        """
+        Create a server on a free local port. Use it as a context manager to serve.
+
+        Args:
+            latency: Seconds each response is delayed by, to mimic a remote host
+            keep_requests: If every request is kept in :attr:`requests`. The number of
+                requests per top-level path is always counted in :attr:`counts`.
+        """
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.latency = latency
+        self.keep_requests = keep_requests
+        self.routes = {}
+        self.requests = []
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.url = f"http://127.0.0.1:{self.server_port}"
+        self.host = f"127.0.0.1:{self.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
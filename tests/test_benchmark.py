@@ -0,0 +1,46 @@
+"""
+Tests for the offline benchmarks
+"""
+
+import json
+
+from benchmark import STAGES, Fixtures, compare, make_orcid, run_benchmarks
+
+
+def test_fixtures_records():
+    fixtures = Fixtures(3)
+    first, second = (json.loads(fixtures.record({}, orcid)) for orcid in fixtures.orcids()[:2])
+
+    assert first["orcid-identifier"]["path"] == make_orcid(0)
+    assert second["orcid-identifier"]["path"] == make_orcid(1)
+    assert fixtures.record({}, make_orcid(3))[0] == 404
+
+
+def test_fixtures_answer_values_queries():
+    fixtures = Fixtures(3)
+    query = 'SELECT ?id ?item WHERE { VALUES ?id { "a" "b" "c" "d" } ?item wdt:P496 ?id . }'
+    bindings = fixtures.sparql({"query": [query]})["results"]["bindings"]
+
+    assert 0 < len(bindings) < 4
+    assert bindings == fixtures.sparql({"query": [query]})["results"]["bindings"]
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(sizes=[2], workers=2)
+
+    assert [case["stage"] for case in results] == list(STAGES)
+    for case in results:
+        assert case["requests"]["orcid"] == 2
+        assert case["seconds"] > 0
+        assert case["peak_memory_mb"] > 0
+    assert compare(results, results) == []
+
+
+def test_compare_finds_regressions():
+    before = {"stage": "import_list", "size": 100, "seconds": 1.0, "peak_memory_mb": 50.0}
+    after = {**before, "seconds": 2.0}
+
+    assert compare([{**after, "total_requests": 10}], [{**before, "total_requests": 10}]) == [
+        "import_list at 100 records: seconds is 2.0, was 1.0"
+    ]
+    assert len(compare([{**before, "total_requests": 11}], [{**before, "total_requests": 10}])) == 1
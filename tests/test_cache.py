@@ -0,0 +1,155 @@
+"""
+Tests for the cache module
+"""
+
+import threading
+import time
+
+import pytest
+
+from pyorcidator import http_client
+from pyorcidator.cache import CacheMiss, DiskCache, QueryCache, set_record_cache
+from pyorcidator.helper import get_orcid_data
+
+ORCID = "0000-0003-4423-4370"
+
+
+@pytest.fixture
+def record_cache(tmp_path):
+    cache = DiskCache(tmp_path.joinpath("records.sqlite"))
+    set_record_cache(cache)
+    yield cache
+    set_record_cache(None)
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.headers = headers or {}
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_put_and_get(tmp_path):
+    cache = DiskCache(tmp_path.joinpath("cache.sqlite"))
+    cache.put("key", {"a": [1, 2]}, etag='"abc"')
+    entry = cache.get("key")
+    assert entry.value == {"a": [1, 2]}
+    assert entry.etag == '"abc"'
+    assert cache.is_fresh(entry)
+    assert cache.get("missing") is None
+
+
+def test_lru_eviction(tmp_path):
+    cache = DiskCache(tmp_path.joinpath("cache.sqlite"), max_bytes=None)
+    cache.put("a", "x" * 1000)
+    entry_size = cache.size()
+    cache.max_bytes = 2 * entry_size
+    cache.put("b", "y" * 1000)
+    cache.get("a")  # "b" is now the least recently used entry
+    cache.put("c", "z" * 1000)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_get_orcid_data_uses_cache(record_cache, sample_orcid_data, monkeypatch):
+    calls = []
+
+    class FakeClient:
+        orcid_api_url = "https://pub.orcid.org/v2.0/"
+
+        def get(self, url, headers):
+            calls.append(headers)
+            if "If-None-Match" in headers:
+                return FakeResponse(304)
+            return FakeResponse(200, sample_orcid_data, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(http_client, "_client", FakeClient())
+    assert get_orcid_data(ORCID) == sample_orcid_data
+    assert get_orcid_data(ORCID) == sample_orcid_data
+    assert len(calls) == 1
+
+    # Once stale, the record is revalidated with its ETag
+    record_cache.ttl = 0
+    assert get_orcid_data(ORCID) == sample_orcid_data
+    assert len(calls) == 2
+    assert calls[1]["If-None-Match"] == '"v1"'
+
+
+def test_offline_cache_miss(record_cache):
+    record_cache.offline = True
+    with pytest.raises(CacheMiss):
+        get_orcid_data(ORCID)
+
+
+def test_query_cache_normalizes_layout():
+    cache = QueryCache()
+    calls = []
+
+    def run(query):
+        calls.append(query)
+        return [{"item": {"value": "Q1"}}]
+
+    assert cache.get_or_compute("SELECT ?item\n  WHERE { }", run) == [{"item": {"value": "Q1"}}]
+    assert cache.get_or_compute("  SELECT ?item\n\n    WHERE { }\n", run) == [
+        {"item": {"value": "Q1"}}
+    ]
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_query_cache_ttl_and_lru():
+    cache = QueryCache(maxsize=1, ttl=0)
+    cache.get_or_compute("a", str.upper)
+    cache.get_or_compute("a", str.upper)
+    assert cache.stats()["misses"] == 2
+
+    cache = QueryCache(maxsize=1)
+    cache.get_or_compute("a", str.upper)
+    cache.get_or_compute("b", str.upper)
+    cache.get_or_compute("a", str.upper)
+    assert cache.stats()["misses"] == 3
+
+
+def test_query_cache_single_flight():
+    cache = QueryCache()
+    calls = []
+    release = threading.Event()
+
+    def slow(query):
+        calls.append(query)
+        release.wait()
+        return query.upper()
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("q", slow)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["Q"] * 5
+    assert len(calls) == 1
+
+
+def test_query_cache_persistent_store(tmp_path):
+    store = DiskCache(tmp_path.joinpath("sparql.sqlite"))
+    QueryCache(store=store).get_or_compute("q", str.upper)
+
+    cache = QueryCache(store=store)
+    assert cache.get_or_compute("q", lambda query: pytest.fail("should be served from disk")) == "Q"
+    assert cache.stats()["store_hits"] == 1
+
+    store.offline = True
+    with pytest.raises(CacheMiss):
+        cache.get_or_compute("other", str.upper)
@@ -0,0 +1,61 @@
+"""
+Tests for the command line interface
+"""
+
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from pyorcidator.cli import LAZY_COMMANDS, cli
+
+#: Modules that take seconds to import, so the CLI only imports them when a command runs
+HEAVY_MODULES = [
+    "pyorcidator.helper",
+    "quickstatements_client",
+    "pydantic",
+    "wdcuration",
+    "clipboard",
+    "pandas",
+]
+
+
+def _run_python(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+
+def test_cli_import_is_light():
+    """Guard against heavy dependencies creeping into the startup path."""
+    code = f"""\
+import sys
+import pyorcidator.cli
+print(sorted(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+    assert _run_python(code).strip() == "[]"
+
+
+def test_dictionaries_load_lazily():
+    code = """\
+from pyorcidator.dictionaries import dicts
+print(any(dicts.is_loaded(key) for key in dicts))
+dicts["role"]
+print(dicts.is_loaded("role"), dicts.is_loaded("fields"))
+"""
+    assert _run_python(code).split() == ["False", "True", "False"]
+
+
+def test_help_lists_lazy_commands():
+    result = CliRunner().invoke(cli, ["--help"])
+    assert result.exit_code == 0
+    for name, (_, short_help) in LAZY_COMMANDS.items():
+        assert name in result.output
+        assert short_help in result.output
+
+
+def test_lazy_command_help_matches():
+    """The short help in the lazy command table should match each command's docstring."""
+    for name, (_, short_help) in LAZY_COMMANDS.items():
+        command = cli.get_command(None, name)
+        assert command.get_short_help_str(limit=200) == short_help
@@ -0,0 +1,52 @@
+"""
+Tests for the concurrency module
+"""
+
+import random
+import time
+
+from pyorcidator.concurrency import map_ordered, prefetch
+
+
+def test_map_ordered_keeps_input_order():
+    def slow_square(x):
+        time.sleep(random.random() / 100)
+        return x * x
+
+    assert list(map_ordered(slow_square, range(50), workers=8)) == [x * x for x in range(50)]
+
+
+def test_map_ordered_single_worker():
+    assert list(map_ordered(str, iter([1, 2, 3]))) == ["1", "2", "3"]
+
+
+def test_prefetch_computes_ahead():
+    started = []
+
+    def record(x):
+        started.append(x)
+        return x
+
+    results = prefetch(record, range(10), depth=3)
+    assert next(results) == 0
+    deadline = time.monotonic() + 1
+    while len(started) < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # The next three items are prepared while the first is consumed, but no more
+    assert sorted(started) == [0, 1, 2, 3]
+    assert list(results) == list(range(1, 10))
+
+
+def test_prefetch_close_cancels_pending_items():
+    started = []
+
+    def slow(x):
+        started.append(x)
+        time.sleep(0.05)
+        return x
+
+    results = prefetch(slow, range(100), depth=2)
+    assert next(results) == 0
+    results.close()
+    time.sleep(0.1)
+    assert len(started) <= 4
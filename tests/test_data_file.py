@@ -0,0 +1,154 @@
+"""
+Tests for the data_file module
+"""
+
+import io
+import json
+import tarfile
+
+from click.testing import CliRunner
+
+from pyorcidator.data_file import (
+    RecordStream,
+    affiliation_filter,
+    iter_data_file,
+    parse_record_xml,
+)
+from pyorcidator.helper import get_affiliation_info, get_paper_dois
+from pyorcidator.import_data_file import main
+
+ORCID = "0000-0002-1825-0097"
+RECORD_XML = f"""\
+<?xml version="1.0" encoding="UTF-8"?>
+<record:record xmlns:record="http://www.orcid.org/ns/record"
+    xmlns:common="http://www.orcid.org/ns/common" xmlns:person="http://www.orcid.org/ns/person"
+    xmlns:personal-details="http://www.orcid.org/ns/personal-details"
+    xmlns:keyword="http://www.orcid.org/ns/keyword"
+    xmlns:external-identifier="http://www.orcid.org/ns/external-identifier"
+    xmlns:activities="http://www.orcid.org/ns/activities"
+    xmlns:employment="http://www.orcid.org/ns/employment"
+    xmlns:history="http://www.orcid.org/ns/history" path="/{ORCID}">
+  <common:orcid-identifier><common:path>{ORCID}</common:path></common:orcid-identifier>
+  <history:history>
+    <common:last-modified-date>2022-04-25T11:55:29.184Z</common:last-modified-date>
+  </history:history>
+  <person:person>
+    <person:name>
+      <personal-details:given-names>Josiah</personal-details:given-names>
+      <personal-details:family-name>Carberry</personal-details:family-name>
+    </person:name>
+    <keyword:keywords>
+      <keyword:keyword><keyword:content>psychoceramics</keyword:content></keyword:keyword>
+    </keyword:keywords>
+    <external-identifier:external-identifiers>
+      <external-identifier:external-identifier>
+        <common:external-id-type>Scopus Author ID</common:external-id-type>
+        <common:external-id-value>7007156898</common:external-id-value>
+      </external-identifier:external-identifier>
+    </external-identifier:external-identifiers>
+  </person:person>
+  <activities:activities-summary>
+    <activities:employments>
+      <activities:affiliation-group>
+        <employment:employment-summary>
+          <common:role-title>Professor</common:role-title>
+          <common:start-date><common:year>2016</common:year><common:month>05</common:month></common:start-date>
+          <common:organization>
+            <common:name>Brown University</common:name>
+            <common:disambiguated-organization>
+              <common:disambiguated-organization-identifier>https://ror.org/05gq02987</common:disambiguated-organization-identifier>
+              <common:disambiguation-source>ROR</common:disambiguation-source>
+            </common:disambiguated-organization>
+          </common:organization>
+        </employment:employment-summary>
+      </activities:affiliation-group>
+    </activities:employments>
+    <activities:works>
+      <activities:group>
+        <common:external-ids>
+          <common:external-id>
+            <common:external-id-type>doi</common:external-id-type>
+            <common:external-id-value>10.1087/20120404</common:external-id-value>
+          </common:external-id>
+        </common:external-ids>
+      </activities:group>
+    </activities:works>
+  </activities:activities-summary>
+</record:record>
+"""
+
+
+def test_parse_record_xml():
+    data = parse_record_xml(io.BytesIO(RECORD_XML.encode("utf-8")))
+
+    assert data["history"]["last-modified-date"] == {"value": 1650887729184}
+    assert data["person"]["name"]["family-name"] == {"value": "Carberry"}
+    assert data["person"]["keywords"]["keyword"] == [{"content": "psychoceramics"}]
+    assert get_paper_dois(data["activities-summary"]["works"]["group"]) == ["10.1087/20120404"]
+    employments = data["activities-summary"]["employments"]["employment-summary"]
+    organization_qids = {("ROR", "05gq02987"): "Q49114"}
+    [entry] = get_affiliation_info(employments, organization_qids)
+    assert entry.institution == "Q49114"
+    assert (entry.start_date.year, entry.start_date.month, entry.start_date_precision) == (
+        2016,
+        5,
+        10,
+    )
+    assert affiliation_filter(["05gq02987"])(data)
+    assert affiliation_filter(["brown university"])(data)
+    assert not affiliation_filter(["grid.40263.33"])(data)
+
+
+def test_stream_archive(tmp_path):
+    path = tmp_path.joinpath("summaries.tar.gz")
+    with tarfile.open(path, "w:gz") as archive:
+        for orcid in (ORCID, "0000-0003-4423-4370"):
+            content = RECORD_XML.replace(ORCID, orcid).encode("utf-8")
+            info = tarfile.TarInfo(f"summaries/{orcid[-3:]}/{orcid}.xml")
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+
+    assert [orcid for orcid, _ in iter_data_file(str(path))] == [ORCID, "0000-0003-4423-4370"]
+    assert [orcid for orcid, _ in iter_data_file(str(path), orcids={ORCID})] == [ORCID]
+
+
+def test_record_stream_holds_a_bounded_number_of_records():
+    stream = RecordStream(((str(index), {"index": index}) for index in range(5)), max_held=2)
+
+    assert list(stream) == ["0", "1", "2", "3", "4"]
+    assert stream.fetch("4") == {"index": 4}
+    assert len(stream._held) == 1
+
+
+def test_import_data_file(stand_in_server, sample_orcid_data, tmp_path):
+    orcid = "0000-0003-4423-4370"
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": []}}
+    source = tmp_path.joinpath("records.jsonl")
+    source.write_text(json.dumps(sample_orcid_data) + "\n")
+    output = tmp_path.joinpath("qs.txt")
+
+    args = ["--source", str(source), "-o", str(output), "--non-interactive"]
+    args += ["--pending-file", str(tmp_path.joinpath("pending.json"))]
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 0, result.output
+    assert f'|P496|"{orcid}"' in output.read_text()
+    # The record comes from the file, not from the ORCID API
+    assert not [request for request in stand_in_server.requests if "/orcid/" in request[1]]
+
+
+def test_unreadable_records_are_skipped(tmp_path):
+    tmp_path.joinpath(f"{ORCID}.xml").write_text(RECORD_XML)
+    tmp_path.joinpath("0000-0003-4423-4370.xml").write_text("<record:record")
+    tmp_path.joinpath("0000-0001-5109-3700.json").write_text("{")
+
+    assert [orcid for orcid, _ in iter_data_file(str(tmp_path))] == [ORCID]
+
+
+def test_unreadable_lines_are_skipped(tmp_path, caplog):
+    path = tmp_path.joinpath("records.jsonl")
+    records = [{"orcid-identifier": {"path": orcid}} for orcid in (ORCID, "0000-0003-4423-4370")]
+    path.write_text(f"{json.dumps(records[0])}\n{{\n{json.dumps(records[1])}\n")
+
+    assert [orcid for orcid, _ in iter_data_file(str(path))] == [ORCID, "0000-0003-4423-4370"]
+    assert "line 2 of" in caplog.text
@@ -0,0 +1,59 @@
+"""
+Tests for the delta module
+"""
+
+from quickstatements_client import CreateLine, EntityLine, TextLine
+
+from pyorcidator.delta import drop_existing, get_claim, lookup_existing_claims
+
+ENTITY = "http://www.wikidata.org/entity/"
+
+
+def test_get_claim():
+    assert get_claim(EntityLine(subject="Q1", predicate="P31", target="Q5")) == ("Q1", "P31", "Q5")
+    assert get_claim(TextLine(subject="Q1", predicate="P496", target="0000-0003-4423-4370")) == (
+        "Q1",
+        "P496",
+        "0000-0003-4423-4370",
+    )
+    assert get_claim(CreateLine()) is None
+    assert get_claim(TextLine(subject="LAST", predicate="P31", target="Q5")) is None
+    assert get_claim(TextLine(subject="Q1", predicate="Len", target="Jane Doe")) is None
+
+
+def test_drop_existing(stand_in_server):
+    stand_in_server.routes["/sparql"] = lambda params: {
+        "results": {
+            "bindings": [
+                {
+                    "item": {"type": "uri", "value": f"{ENTITY}Q1"},
+                    "property": {"type": "uri", "value": f"{ENTITY}P31"},
+                    "value": {"type": "uri", "value": f"{ENTITY}Q5"},
+                },
+                {
+                    "item": {"type": "uri", "value": f"{ENTITY}Q1"},
+                    "property": {"type": "uri", "value": f"{ENTITY}P496"},
+                    "value": {"type": "literal", "value": "0000-0003-4423-4370"},
+                },
+            ]
+        }
+    }
+    lines = [
+        EntityLine(subject="Q1", predicate="P31", target="Q5"),
+        EntityLine(subject="Q1", predicate="P106", target="Q1650915"),
+        TextLine(subject="Q1", predicate="P496", target="0000-0003-4423-4370"),
+        EntityLine(subject="Q2", predicate="P50", target="Q1"),
+    ]
+
+    existing = lookup_existing_claims(lines, chunk_size=2)
+
+    assert existing == {("Q1", "P31", "Q5"), ("Q1", "P496", "0000-0003-4423-4370")}
+    assert len(stand_in_server.requests) == 2
+    queries = [params["query"][0] for _, _, _, params in stand_in_server.requests]
+    assert any('(wd:Q1 wd:P496 "0000-0003-4423-4370")' in query for query in queries)
+    assert drop_existing(lines, existing) == [lines[1], lines[3]]
+
+
+def test_nothing_to_check(stand_in_server):
+    assert lookup_existing_claims([CreateLine()]) == set()
+    assert stand_in_server.requests == []
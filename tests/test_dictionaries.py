@@ -0,0 +1,194 @@
+"""
+Tests for the dictionaries package
+"""
+
+import json
+
+from pyorcidator import cache, wikidata_lookup
+from pyorcidator.dictionaries import LazyDicts, index, resolve, utils
+from pyorcidator.dictionaries.index import LabelIndex, normalize_label
+from pyorcidator.dictionaries.resolve import resolve_missing_labels
+from pyorcidator.dictionaries.store import SQLiteDictionary
+from pyorcidator.dictionaries.utils import lookup_labels
+from pyorcidator.helper import get_curation_labels
+
+
+def test_sqlite_dictionary(tmp_path):
+    data = SQLiteDictionary(tmp_path.joinpath("dictionaries.sqlite"), "role")
+    data["Assistant Professor"] = "Q5669847"
+    data.update_many([("Postdoc", "Q1"), ("Professor", "Q121594")])
+    data["Postdoc"] = "Q7233564"
+
+    assert data["Postdoc"] == "Q7233564"
+    assert "Professor" in data
+    assert "Lecturer" not in data
+    assert data.get("Lecturer") is None
+    assert list(data) == ["Assistant Professor", "Postdoc", "Professor"]
+
+    del data["Professor"]
+    assert len(data) == 2
+    # Vocabularies sharing a file are kept apart
+    assert len(SQLiteDictionary(data.path, "fields")) == 0
+
+
+def test_lazy_dicts_with_sqlite(tmp_path):
+    json_path = tmp_path.joinpath("role.json")
+    json_path.write_text(json.dumps({"Assistant Professor": "Q5669847"}))
+    dicts = LazyDicts({"role": json_path}, db_path=tmp_path.joinpath("dictionaries.sqlite"))
+
+    assert dicts["role"]["Assistant Professor"] == "Q5669847"
+    dicts["role"]["Postdoc"] = "Q7233564"
+    dicts.save("role")
+    # Inserts are persisted without rewriting the JSON file
+    assert "Postdoc" not in json.loads(json_path.read_text())
+
+    dicts.export_json("role")
+    assert json.loads(json_path.read_text()) == {
+        "Assistant Professor": "Q5669847",
+        "Postdoc": "Q7233564",
+    }
+
+    # Reopening the store does not lose labels that only live there
+    dicts.use_sqlite(dicts.db_path)
+    assert dicts["role"]["Postdoc"] == "Q7233564"
+
+
+def test_lazy_dicts_with_json(tmp_path):
+    json_path = tmp_path.joinpath("fields.json")
+    json_path.write_text(json.dumps({"ecology": "Q7150"}))
+    dicts = LazyDicts({"fields": json_path})
+
+    dicts["fields"]["bioinformatics"] = "Q128570"
+    dicts.save("fields")
+
+    assert json.loads(json_path.read_text()) == {"bioinformatics": "Q128570", "ecology": "Q7150"}
+
+
+def test_normalize_label():
+    assert normalize_label("Univ. of São Paulo") == "university sao paulo"
+    assert normalize_label("UNIVERSITY OF SAO PAULO") == "university sao paulo"
+    assert normalize_label("Ｕｎｉｖｅｒｓｉｔｙ") == "university"
+
+
+def test_label_index():
+    index = LabelIndex(
+        {
+            "University of São Paulo": "Q835960",
+            "Associate Professor": "Q9344260",
+            "Assistant Professor": "Q5669847",
+            "Post doc": "Q1",
+            "Post-doc": "Q2",
+        }
+    )
+    assert index.lookup("univ. of sao paulo, Brazil") == "Q835960"
+    assert index.lookup("Assoc. Prof.") == "Q9344260"
+    # Ambiguous normalized labels are never matched
+    assert index.lookup("post doc") is None
+
+    # Fuzzy matches are only accepted when asked for
+    assert index.match("Asistant Professor") is None
+    assert index.match("Asistant Professor", threshold=0.9) == "Q5669847"
+    assert index.match("Professor", threshold=0.9) is None
+    qids = [qid for qid, _, _ in index.candidates("Professor")]
+    assert set(qids[:2]) == {"Q9344260", "Q5669847"}
+
+
+def test_label_index_near_misses():
+    index = LabelIndex(
+        {
+            "University of California": "Q168756",
+            "RNA Computational Biology": "Q117275654",
+            "Harvard University": "Q13371",
+        }
+    )
+    # Only place names are dropped from the end of a label
+    assert index.match("Harvard University, USA") == "Q13371"
+    assert index.match("University of California, Berkeley") is None
+    assert index.match("Computational Biology") is None
+    # They are still offered as candidates for curation
+    [(qid, label, _)] = index.candidates("Computational Biology", limit=1)
+    assert (qid, label) == ("Q117275654", "RNA Computational Biology")
+
+
+def fake_label_query(queries):
+    def query_wikidata(query):
+        queries.append(query)
+        return [
+            {
+                "string": {"value": "Professor"},
+                "item": {"value": "http://www.wikidata.org/entity/Q121594"},
+            },
+            {
+                "string": {"value": "Lecturer"},
+                "item": {"value": "http://www.wikidata.org/entity/Q1"},
+            },
+            {
+                "string": {"value": "Lecturer"},
+                "item": {"value": "http://www.wikidata.org/entity/Q2"},
+            },
+        ]
+
+    return query_wikidata
+
+
+def test_lookup_labels(monkeypatch):
+    queries = []
+    monkeypatch.setattr(utils, "query_wikidata", fake_label_query(queries))
+
+    qids = lookup_labels(["Professor ", "Lecturer", "Chief Wizard"], parents=["Q189533"])
+
+    # Ambiguous labels are left for interactive curation
+    assert qids == {"Professor ": "Q121594"}
+    assert len(queries) == 1
+    assert '("Professor" "Professor"@pt)' in queries[0]
+    assert "VALUES ?ancestor { wd:Q189533 }" in queries[0]
+
+
+def test_resolve_missing_labels(tmp_path, monkeypatch):
+    path = tmp_path.joinpath("role.json")
+    path.write_text(json.dumps({"Assistant Professor": "Q5669847"}))
+    temporary_dicts = LazyDicts({"role": path})
+    monkeypatch.setattr(resolve, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "_indexes", {})
+    queries = []
+    monkeypatch.setattr(utils, "query_wikidata", fake_label_query(queries))
+
+    found = resolve_missing_labels(
+        {"role": {"Assistant Professor", "asst. professor", "Professor"}}
+    )
+
+    assert found == {"role": {"Professor": "Q121594"}}
+    # Labels in the dictionary or matched by its index are not sent to Wikidata
+    assert "Assistant" not in queries[0]
+    assert json.loads(path.read_text())["Professor"] == "Q121594"
+
+
+def test_resolve_missing_labels_offline_rerun(tmp_path, monkeypatch):
+    path = tmp_path.joinpath("role.json")
+    path.write_text(json.dumps({}))
+    temporary_dicts = LazyDicts({"role": path})
+    monkeypatch.setattr(resolve, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "_indexes", {})
+    monkeypatch.setattr(cache, "_query_cache", None)
+    queries = []
+    monkeypatch.setattr(wikidata_lookup, "_query_wikidata", fake_label_query(queries))
+    labels = {"role": {"Professor", "Lecturer"}}
+
+    cache.configure_query_cache(tmp_path.joinpath("cache"))
+    assert resolve_missing_labels(labels) == {"role": {"Professor": "Q121594"}}
+
+    # Only the ambiguous label is still missing, which makes a query that was never cached
+    cache.configure_query_cache(tmp_path.joinpath("cache"), offline=True)
+    assert resolve_missing_labels(labels) == {}
+    assert len(queries) == 1
+
+
+def test_get_curation_labels(sample_orcid_data):
+    labels = get_curation_labels([sample_orcid_data], {})
+
+    assert "Fraunhofer SCAI" in labels["institutions"]
+    # Unresolved GRID identifiers fall back to the institutions dictionary, by name
+    assert "University of Bonn" in labels["institutions"]
+    assert len(labels["fields"]) == 5
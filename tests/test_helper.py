@@ -2,17 +2,31 @@
 Tests for the helper module
 """
 
+import sys
+from types import SimpleNamespace
+
+from pyorcidator import helper
 from pyorcidator.helper import (
+    get_affiliation_info,
     get_date,
     get_external_ids,
     get_orcid_data,
+    get_organization_id,
     get_organization_list,
     get_paper_dois,
+    get_paper_qids,
+    get_qid_for_item,
     lookup_id,
+    lookup_ids,
+    lookup_organization_ids,
+    process_affiliation_entries,
     process_keyword_entries,
     process_paper_entries,
     render_orcid_qs,
 )
+from pyorcidator.pending import PendingQueue, set_pending_queue
+
+ENTITY = "http://www.wikidata.org/entity/"
 
 
 def test_lookup_id():
@@ -20,6 +34,26 @@ def test_lookup_id():
     assert tiago == "Q90076935"
 
 
+def test_lookup_ids(monkeypatch):
+    queries = []
+
+    def fake_query_wikidata(query):
+        queries.append(query)
+        return [
+            {"id": {"value": "0000-0003-2473-2313"}, "item": {"value": f"{ENTITY}Q90076935"}},
+            # Ambiguous IDs are left out, as with lookup_id
+            {"id": {"value": "0000-0001-7513-7376"}, "item": {"value": f"{ENTITY}Q1"}},
+            {"id": {"value": "0000-0001-7513-7376"}, "item": {"value": f"{ENTITY}Q2"}},
+        ]
+
+    monkeypatch.setattr(helper, "query_wikidata", fake_query_wikidata)
+    orcids = ["0000-0003-2473-2313", "0000-0001-7513-7376", "0000-0003-4423-4370"]
+    qids = lookup_ids(orcids, "P496", chunk_size=2)
+    assert qids == {"0000-0003-2473-2313": "Q90076935"}
+    assert len(queries) == 2
+    assert '"0000-0003-2473-2313"' in queries[0]
+
+
 def test_get_paper_dois(sample_orcid_data):
     test_papers = sample_orcid_data["activities-summary"]["works"]["group"]
 
@@ -45,6 +79,38 @@ def test_process_paper_entries(sample_orcid_data):
     assert entries_qids[1:3] == ["Q63709723", "Q82511885"]
 
 
+def test_process_resolved_paper_entries(sample_orcid_data):
+    test_papers = sample_orcid_data["activities-summary"]["works"]["group"]
+    test_dois = get_paper_dois(test_papers)
+
+    entries = process_paper_entries(
+        orcid="0000-0003-4423-4370",
+        researcher_qid="Q47475003",
+        paper_dois=test_dois,
+        property_id="P50",
+        paper_qids={"10.3233/jad-201397": "Q104491555"},
+    )
+
+    assert [(entry.subject, entry.target) for entry in entries] == [("Q104491555", "Q47475003")]
+
+
+def test_get_paper_qids(monkeypatch):
+    queries = []
+
+    def fake_query_wikidata(query):
+        queries.append(query)
+        if "10.1/A" not in query:
+            return []
+        return [{"doi": {"value": "10.1/A"}, "item": {"value": "Q1"}}]
+
+    monkeypatch.setattr(helper, "query_wikidata", fake_query_wikidata)
+    qids = get_paper_qids(["10.1/a", "10.1/A", "10.2/b", "10.3/c", "not-a-doi"], chunk_size=2)
+
+    assert qids == {"10.1/a": "Q1", "10.1/A": "Q1"}
+    assert len(queries) == 2
+    assert all("not-a-doi" not in query for query in queries)
+
+
 def test_get_org_list(sample_orcid_data):
     employment_data = sample_orcid_data["activities-summary"]["employments"]["employment-summary"]
 
@@ -60,6 +126,102 @@ def test_get_org_list(sample_orcid_data):
     ]
 
 
+def test_get_org_list_with_resolved_ids(sample_orcid_data):
+    employment_data = sample_orcid_data["activities-summary"]["employments"]["employment-summary"]
+
+    data = get_organization_list(employment_data, {("GRID", "grid.10388.32"): "Q152171"})
+
+    assert data == [
+        "Harvard Medical School",
+        "Enveda Biosciences",
+        "Q152171",
+        "Fraunhofer SCAI",
+    ]
+
+
+def test_unresolved_grid_institution_is_curated_by_name(tmp_path):
+    def summary(name):
+        organization = {
+            "name": name,
+            "disambiguated-organization": {
+                "disambiguated-organization-identifier": "grid.0000.0",
+                "disambiguation-source": "GRID",
+            },
+        }
+        return {
+            "role-title": None,
+            "start-date": None,
+            "end-date": None,
+            "organization": organization,
+        }
+
+    queue = PendingQueue(tmp_path.joinpath("pending.json"))
+    set_pending_queue(queue)
+    try:
+        entries = get_affiliation_info(
+            [summary("Unlisted Institute"), summary("Harvard University")], {}
+        )
+    finally:
+        set_pending_queue(None)
+
+    # Not the name as is, which is not a QID
+    assert [entry.institution for entry in entries] == [None, "Q13371"]
+    assert [label for _, label, _ in queue.items()] == ["Unlisted Institute"]
+    lines = process_affiliation_entries(
+        orcid="0000-0003-4423-4370",
+        subject_qid="Q1",
+        affiliation_entries=entries,
+        property_id="P108",
+        role_property_id="P2868",
+    )
+    assert [line.target for line in lines] == ["Q13371"]
+
+
+def test_get_organization_id():
+    def organization(source, identifier):
+        return {
+            "disambiguated-organization": {
+                "disambiguated-organization-identifier": identifier,
+                "disambiguation-source": source,
+            }
+        }
+
+    assert get_organization_id(organization("GRID", "grid.10388.32")) == ("GRID", "grid.10388.32")
+    assert get_organization_id(organization("ROR", "https://ror.org/041nas322")) == (
+        "ROR",
+        "041nas322",
+    )
+    assert get_organization_id(organization("RINGGOLD", "9374")) is None
+    assert get_organization_id({"disambiguated-organization": None}) is None
+
+
+def test_lookup_organization_ids(monkeypatch):
+    queries = []
+
+    def fake_query_wikidata(query):
+        queries.append(query)
+        return [
+            {
+                "property": {"value": "http://www.wikidata.org/prop/direct/P2427"},
+                "id": {"value": "grid.10388.32"},
+                "item": {"value": f"{ENTITY}Q152171"},
+            },
+            {
+                "property": {"value": "http://www.wikidata.org/prop/direct/P6782"},
+                "id": {"value": "041nas322"},
+                "item": {"value": f"{ENTITY}Q152171"},
+            },
+        ]
+
+    monkeypatch.setattr(helper, "query_wikidata", fake_query_wikidata)
+    qids = lookup_organization_ids(
+        [("GRID", "grid.10388.32"), ("ROR", "041nas322"), ("GRID", "grid.10388.32")]
+    )
+    assert qids == {("GRID", "grid.10388.32"): "Q152171", ("ROR", "041nas322"): "Q152171"}
+    assert len(queries) == 1
+    assert '(wdt:P6782 "041nas322")' in queries[0]
+
+
 def test_get_field_of_work(sample_orcid_data):
 
     keyword_data = sample_orcid_data["person"]["keywords"]["keyword"]
@@ -75,6 +237,15 @@ def test_get_field_of_work(sample_orcid_data):
     assert fields[1].target == "Q114662947"
 
 
+def test_get_qid_for_item_matches_variants_offline(monkeypatch):
+    def fail_add_key(*args, **kwargs):
+        raise AssertionError("should not prompt")
+
+    monkeypatch.setitem(sys.modules, "wdcuration", SimpleNamespace(add_key=fail_add_key))
+    assert get_qid_for_item("role", "Assistant Professor") == "Q5669847"
+    assert get_qid_for_item("role", "asst. professor") == "Q5669847"
+
+
 def test_get_loop_id(sample_orcid_data):
     goal = "827476"
     result = get_external_ids(sample_orcid_data)
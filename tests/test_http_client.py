@@ -0,0 +1,38 @@
+"""
+Tests for the http_client module
+"""
+
+from pyorcidator.helper import get_orcid_data
+from pyorcidator.http_client import USER_AGENT
+from pyorcidator.wikidata_lookup import query_wikidata, search_wikidata
+
+
+def test_orcid_record_from_stand_in(stand_in_server, sample_orcid_data):
+    orcid = "0000-0003-4423-4370"
+    stand_in_server.routes[f"/orcid/{orcid}"] = lambda params: sample_orcid_data
+
+    assert get_orcid_data(orcid) == sample_orcid_data
+
+    method, path, headers, _ = stand_in_server.requests[0]
+    assert (method, path) == ("GET", f"/orcid/{orcid}")
+    assert headers["User-Agent"] == USER_AGENT
+    assert "gzip" in headers["Accept-Encoding"]
+
+
+def test_query_wikidata_posts_query(stand_in_server):
+    bindings = [{"item": {"value": "http://www.wikidata.org/entity/Q90076935"}}]
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": bindings}}
+    query = 'SELECT ?item WHERE { ?item wdt:P496 "0000-0003-2473-2313" . }'
+
+    assert query_wikidata(query) == bindings
+
+    method, _, _, params = stand_in_server.requests[0]
+    assert method == "POST"
+    assert params["query"] == [query]
+
+
+def test_search_wikidata(stand_in_server, wikidata_api_result):
+    stand_in_server.routes["/w/api.php"] = lambda params: wikidata_api_result
+
+    assert search_wikidata("Universidade de São Paulo")["id"] == "Q835960"
+    assert stand_in_server.requests[0][3]["search"] == ["Universidade de São Paulo"]
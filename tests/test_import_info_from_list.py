@@ -0,0 +1,36 @@
+"""
+Tests for the import_info_from_list module
+"""
+
+import gzip
+
+import pytest
+from click.testing import CliRunner
+
+from pyorcidator import import_info_from_list
+from pyorcidator.import_info_from_list import main, read_orcids
+
+
+def fake_render_orcids_qs(orcids, workers=1, batch_size=1, delta=False, fetch=None):
+    for orcid in orcids:
+        yield f"LAST\tP496\t{orcid}\n"
+
+
+def test_read_orcids(tmp_path):
+    path = tmp_path.joinpath("orcids.txt")
+    path.write_text("0000-0003-4423-4370\n\n 0000-0003-2473-2313 \n")
+    assert list(read_orcids(str(path))) == ["0000-0003-4423-4370", "0000-0003-2473-2313"]
+
+
+@pytest.mark.parametrize("option", ["--orcid_list", "--orcid-list"])
+def test_stream_to_gzip(tmp_path, monkeypatch, option):
+    monkeypatch.setattr(import_info_from_list, "render_orcids_qs", fake_render_orcids_qs)
+    orcid_list = tmp_path.joinpath("orcids.txt")
+    orcid_list.write_text("0000-0003-4423-4370\n0000-0003-2473-2313\n")
+    output = tmp_path.joinpath("qs.txt.gz")
+
+    result = CliRunner().invoke(main, [option, str(orcid_list), "--output", str(output)])
+
+    assert result.exit_code == 0, result.output
+    with gzip.open(output, "rt") as file:
+        assert file.read() == "LAST\tP496\t0000-0003-4423-4370\nLAST\tP496\t0000-0003-2473-2313\n"
@@ -0,0 +1,100 @@
+"""
+Tests for the jobs module
+"""
+
+from click.testing import CliRunner
+
+from pyorcidator.import_info_from_list import main
+from pyorcidator.jobs import Job, Journal, ShardedWriter
+
+
+def test_journal_ignores_cut_off_entry(tmp_path):
+    path = tmp_path.joinpath("processed_orcids.txt")
+    path.write_text("0000-0003-4423-4370\n0000-0003-2473-2313\t")
+
+    journal = Journal(path)
+    journal.record("0000-0002-0791-1347")
+    journal.close()
+
+    assert "0000-0003-4423-4370" in journal
+    assert "0000-0003-2473-2313" not in journal
+    assert path.read_text() == "0000-0003-4423-4370\n0000-0002-0791-1347\n"
+
+
+def test_sharded_writer_rotates(tmp_path):
+    writer = ShardedWriter(tmp_path, max_bytes=10)
+    assert writer.write("LAST\tP31\tQ5\n") == ("quickstatements-00000.txt", 12)
+    assert writer.write("LAST\tP31\tQ5\n") == ("quickstatements-00001.txt", 12)
+    writer.close()
+
+
+def test_job_resumes_after_last_journaled_researcher(tmp_path):
+    with Job(tmp_path, shard_size=15) as job:
+        job.write("0000-0003-4423-4370", "Q1\tP31\tQ5\n")
+        job.write("0000-0003-2473-2313", "Q2\tP31\tQ5\n")
+    # A crash after writing output, but before journaling it
+    tmp_path.joinpath("quickstatements-00001.txt").open("a").write("Q3\tP31")
+    tmp_path.joinpath("quickstatements-00002.txt").write_text("Q3\tP31\tQ5\n")
+
+    orcids = ["0000-0003-4423-4370", "0000-0002-0791-1347", "0000-0002-0791-1347"]
+    with Job(tmp_path, shard_size=15) as job:
+        assert list(job.pending(orcids)) == ["0000-0002-0791-1347"]
+        job.write("0000-0002-0791-1347", "Q3\tP31\tQ5\n")
+
+    assert sorted(path.name for path in tmp_path.glob("quickstatements-*")) == [
+        "quickstatements-00000.txt",
+        "quickstatements-00001.txt",
+        "quickstatements-00002.txt",
+    ]
+    assert tmp_path.joinpath("quickstatements-00001.txt").read_text() == "Q2\tP31\tQ5\n"
+    assert tmp_path.joinpath("quickstatements-00002.txt").read_text() == "Q3\tP31\tQ5\n"
+    assert not tmp_path.joinpath("retry.txt").exists()
+
+
+def test_import_list_job(stand_in_server, sample_orcid_data, tmp_path):
+    orcid, missing = "0000-0003-4423-4370", "0000-0003-2473-2313"
+    stand_in_server.routes[f"/orcid/{orcid}"] = lambda params: sample_orcid_data
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": []}}
+    orcid_list = tmp_path.joinpath("orcids.txt")
+    orcid_list.write_text(f"{orcid}\n{missing}\n")
+    job = tmp_path.joinpath("job")
+    args = ["--orcid_list", str(orcid_list), "--job", str(job), "--non-interactive"]
+    args += ["--pending-file", str(tmp_path.joinpath("pending.json"))]
+
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert job.joinpath("retry.txt").read_text() == f"{missing}\n"
+    assert f'|P496|"{orcid}"' in job.joinpath("quickstatements-00000.txt").read_text()
+    fetched = len(stand_in_server.requests)
+
+    stand_in_server.routes[f"/orcid/{missing}"] = lambda params: sample_orcid_data
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert [path for _, path, _, _ in stand_in_server.requests[fetched:]].count(
+        f"/orcid/{orcid}"
+    ) == 0
+    assert "1 researchers written" in result.stderr
+    assert not job.joinpath("retry.txt").exists()
+
+
+def test_unknown_orcid_fails_alone(stand_in_server, sample_orcid_data, tmp_path):
+    orcid, unknown = "0000-0003-4423-4370", "0000-0003-2473-2313"
+    stand_in_server.routes[f"/orcid/{orcid}"] = lambda params: sample_orcid_data
+    # The ORCID API answers unknown and deactivated ORCIDs with a JSON error
+    stand_in_server.routes[f"/orcid/{unknown}"] = lambda params: (
+        404,
+        {"response-code": 404, "developer-message": "404 Not Found: The resource was not found."},
+        {},
+    )
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": []}}
+    orcid_list = tmp_path.joinpath("orcids.txt")
+    orcid_list.write_text(f"{unknown}\n{orcid}\n")
+    job = tmp_path.joinpath("job")
+    args = ["--orcid_list", str(orcid_list), "--job", str(job), "--non-interactive"]
+    args += ["--pending-file", str(tmp_path.joinpath("pending.json"))]
+
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 0, result.output
+    assert job.joinpath("retry.txt").read_text() == f"{unknown}\n"
+    assert f'|P496|"{orcid}"' in job.joinpath("quickstatements-00000.txt").read_text()
@@ -0,0 +1,89 @@
+"""
+Tests for the metrics module
+"""
+
+import json
+
+from click.testing import CliRunner
+
+from pyorcidator import metrics
+from pyorcidator.import_info_from_list import main
+from pyorcidator.metrics import Metrics, Tracer, span, timed
+
+
+def test_metrics_to_prometheus():
+    collected = Metrics()
+    collected.count("http_responses", host="pub.orcid.org", status="200")
+    collected.count("http_responses", 2, host="pub.orcid.org", status="200")
+    collected.observe("lookup_ids", 0.003)
+    collected.observe("lookup_ids", 120)
+
+    text = collected.to_prometheus()
+
+    assert "# TYPE pyorcidator_http_responses counter" in text
+    assert 'pyorcidator_http_responses{host="pub.orcid.org",status="200"} 3' in text
+    assert 'pyorcidator_lookup_ids_seconds_bucket{le="0.001"} 0' in text
+    assert 'pyorcidator_lookup_ids_seconds_bucket{le="0.005"} 1' in text
+    assert 'pyorcidator_lookup_ids_seconds_bucket{le="+Inf"} 2' in text
+    assert "pyorcidator_lookup_ids_seconds_count 2" in text
+
+
+def test_spans_are_attributed_to_orcids(tmp_path, monkeypatch):
+    collected = Metrics()
+    trace = tmp_path.joinpath("trace.jsonl")
+    with trace.open("w") as file:
+        monkeypatch.setattr(metrics, "_metrics", collected)
+        monkeypatch.setattr(metrics, "_tracer", Tracer(file))
+
+        @timed("lookup", per_orcid=True)
+        def lookup(orcid):
+            with span("render_lines"):
+                pass
+
+        lookup("0000-0003-4423-4370")
+        with span("resolve_batch"):
+            pass
+
+    spans = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert [(s["name"], s["orcid"]) for s in spans] == [
+        ("render_lines", "0000-0003-4423-4370"),
+        ("lookup", "0000-0003-4423-4370"),
+        ("resolve_batch", None),
+    ]
+    assert {h["name"] for h in collected.to_dict()["histograms"]} == {
+        "lookup",
+        "render_lines",
+        "resolve_batch",
+    }
+
+
+def test_span_is_a_no_op_when_disabled():
+    assert metrics.get_metrics() is None and metrics.get_tracer() is None
+    assert span("lookup_ids") is span("get_paper_qids")
+
+
+def test_import_list_writes_metrics(stand_in_server, sample_orcid_data, tmp_path):
+    orcid = "0000-0003-4423-4370"
+    stand_in_server.routes[f"/orcid/{orcid}"] = lambda params: sample_orcid_data
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": []}}
+    orcid_list = tmp_path.joinpath("orcids.txt")
+    orcid_list.write_text(f"{orcid}\n")
+    metrics_out = tmp_path.joinpath("metrics.json")
+    trace = tmp_path.joinpath("trace.jsonl")
+
+    args = ["--orcid_list", str(orcid_list), "-o", str(tmp_path.joinpath("qs.txt"))]
+    args += ["--non-interactive", "--pending-file", str(tmp_path.joinpath("pending.json"))]
+    args += ["--metrics-out", str(metrics_out), "--trace", str(trace)]
+    result = CliRunner().invoke(main, args)
+
+    assert result.exit_code == 0, result.output
+    data = json.loads(metrics_out.read_text())
+    counters = {(c["name"], c["labels"].get("status")): c["value"] for c in data["counters"]}
+    assert counters["http_responses", "200"] == len(stand_in_server.requests)
+    assert counters["http_bytes_downloaded", None] > 0
+    histograms = {h["name"]: h["count"] for h in data["histograms"]}
+    assert histograms["get_orcid_data"] == 1
+    assert histograms["get_orcid_quickstatements"] == 1
+    spans = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert {"get_orcid_data", "render_lines"} <= {s["name"] for s in spans if s["orcid"] == orcid}
+    assert metrics.get_metrics() is None
@@ -0,0 +1,108 @@
+"""
+Tests for the pending module
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+from click.testing import CliRunner
+
+from pyorcidator import dictionaries
+from pyorcidator.dictionaries import LazyDicts, index
+from pyorcidator.helper import get_qid_for_item, process_keyword_entries
+from pyorcidator.pending import PendingQueue, resolve_pending, set_pending_queue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = PendingQueue(tmp_path.joinpath("pending.json"))
+    set_pending_queue(queue)
+    yield queue
+    set_pending_queue(None)
+
+
+@pytest.fixture
+def role_dicts(tmp_path, monkeypatch):
+    """Curation dictionaries backed by temporary JSON files."""
+    path = tmp_path.joinpath("role.json")
+    path.write_text(json.dumps({"Assistant Professor": "Q5669847"}))
+    temporary_dicts = LazyDicts({"role": path})
+    monkeypatch.setattr(dictionaries, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "dicts", temporary_dicts)
+    monkeypatch.setattr(index, "_indexes", {})
+    return path
+
+
+def test_queue_counts_and_examples(queue):
+    for i in range(5):
+        queue.record("role", "Chief Wizard", f"0000-0000-0000-000{i}")
+    queue.record("fields", "alchemy")
+    queue.save()
+
+    reloaded = PendingQueue(queue.path)
+    assert len(reloaded) == 2
+    key, label, entry = next(reloaded.items())
+    assert (key, label, entry["count"]) == ("role", "Chief Wizard", 5)
+    assert len(entry["orcids"]) == 3
+
+
+def test_non_interactive_lookup_is_queued(queue):
+    orcid = "0000-0003-4423-4370"
+    assert get_qid_for_item("fields", "very obscure field of study", orcid=orcid) is None
+
+    keyword_data = [{"content": "very obscure field of study"}, {"content": "bioinformatics"}]
+    lines = process_keyword_entries(orcid, "Q47475003", keyword_data, "P101")
+
+    assert [line.target for line in lines] == ["Q128570"]
+    _, _, entry = next(queue.items())
+    assert entry == {"count": 2, "orcids": [orcid]}
+
+
+def test_fuzzy_matches_are_opt_in(queue, role_dicts):
+    assert get_qid_for_item("role", "Asistant Professor") is None
+    index.set_fuzzy_threshold(0.9)
+    try:
+        assert get_qid_for_item("role", "Asistant Professor") == "Q5669847"
+    finally:
+        index.set_fuzzy_threshold(None)
+    assert [label for _, label, _ in queue.items()] == ["Asistant Professor"]
+
+
+def test_resolve_pending(queue, role_dicts, monkeypatch):
+    queue.record("role", "Chief Wizard")
+    queue.record("role", "Asst. Professor")
+    queue.record("role", "Court Jester")
+    queue.save()
+
+    def fake_add_key(data, label):
+        if label == "Chief Wizard":
+            data[label] = "Q42"
+
+    monkeypatch.setitem(sys.modules, "wdcuration", SimpleNamespace(add_key=fake_add_key))
+    result = CliRunner().invoke(resolve_pending, ["--pending-file", str(queue.path)])
+
+    assert result.exit_code == 0, result.output
+    assert json.loads(role_dicts.read_text()) == {
+        "Assistant Professor": "Q5669847",
+        "Asst. Professor": "Q5669847",
+        "Chief Wizard": "Q42",
+    }
+    assert [label for _, label, _ in PendingQueue(queue.path).items()] == ["Court Jester"]
+
+
+def test_resolve_pending_offers_candidates(queue, role_dicts, monkeypatch):
+    queue.record("role", "Asistant Professor")
+    queue.save()
+
+    monkeypatch.setitem(
+        sys.modules, "wdcuration", SimpleNamespace(add_key=lambda data, label: None)
+    )
+    result = CliRunner().invoke(resolve_pending, ["--pending-file", str(queue.path)])
+
+    assert result.exit_code == 0, result.output
+    assert "similar role labels: 'Assistant Professor' (Q5669847" in result.output
+    # The near miss is not accepted without the curator
+    assert json.loads(role_dicts.read_text()) == {"Assistant Professor": "Q5669847"}
+    assert len(PendingQueue(queue.path)) == 1
@@ -0,0 +1,136 @@
+"""
+Tests for the ratelimit module
+"""
+
+import threading
+import time
+
+import pytest
+
+from pyorcidator.concurrency import map_ordered
+from pyorcidator.http_client import get_client
+from pyorcidator.ratelimit import (
+    DEFAULT_POLICY,
+    HOST_POLICIES,
+    HostLimiter,
+    HostPolicy,
+    backoff_delay,
+    get_limiter,
+    get_stats,
+    parse_host_policies,
+)
+
+
+def test_limiter_caps_concurrency():
+    limiter = HostLimiter(HostPolicy(rate=1000, burst=1000, max_concurrency=2))
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def request(_):
+        with limiter.slot() as slot:
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.01)
+            with lock:
+                active.pop()
+            slot.succeeded()
+
+    list(map_ordered(request, range(12), workers=6))
+    assert max(peak) == 2
+    assert limiter.stats()["requests"] == 12
+
+
+def test_limiter_token_bucket():
+    limiter = HostLimiter(HostPolicy(rate=50, burst=2, max_concurrency=4))
+    started = time.monotonic()
+    for _ in range(7):
+        with limiter.slot() as slot:
+            slot.succeeded()
+    # Two requests use the burst, the other five wait 1/50 s each for a token
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats()["throttled_seconds"] > 0
+
+
+def test_limiter_adapts_concurrency():
+    limiter = HostLimiter(HostPolicy(rate=1000, burst=1000, max_concurrency=8))
+    for _ in range(3):
+        with limiter.slot() as slot:
+            slot.overloaded()
+    # A burst of errors only halves the limit once
+    assert limiter.concurrency == 4
+    assert limiter.stats()["throttle_events"] == 3
+
+    for _ in range(30):
+        with limiter.slot() as slot:
+            slot.succeeded()
+    assert limiter.concurrency == 8
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, base=1, cap=5) <= 5 for attempt in range(10))
+
+
+def test_parse_host_policies():
+    policies = parse_host_policies(
+        "pub.orcid.org:rate=12,max_concurrency=4; localhost:8080:rate=0.5;"
+    )
+
+    assert policies == {
+        "pub.orcid.org": HostPolicy(rate=12, burst=40, max_concurrency=4),
+        "localhost:8080": HostPolicy(rate=0.5, burst=DEFAULT_POLICY.burst, max_concurrency=4),
+    }
+    assert HOST_POLICIES["pub.orcid.org"].rate == 24
+    assert parse_host_policies("") == {}
+    for text in ("pub.orcid.org:speed=1", "rate=1", "pub.orcid.org:max_concurrency=0"):
+        with pytest.raises(ValueError):
+            parse_host_policies(text)
+
+
+def test_client_retries_throttled_requests(stand_in_server):
+    responses = [
+        (429, {"error": "Too Many Requests"}, {"Retry-After": "0"}),
+        (500, {"error": "java.util.concurrent.TimeoutException"}, {"Retry-After": "0"}),
+        {"results": {"bindings": []}},
+    ]
+    stand_in_server.routes["/sparql"] = lambda params: responses.pop(0)
+    client = get_client()
+
+    res = client.post(client.sparql_url, data={"query": "SELECT * WHERE {}"})
+
+    assert res.json() == {"results": {"bindings": []}}
+    assert len(stand_in_server.requests) == 3
+    stats = get_stats()[stand_in_server.url.split("//")[1]]
+    assert (stats["requests"], stats["retries"], stats["throttle_events"]) == (3, 2, 2)
+
+
+def test_client_returns_last_response_after_retries(stand_in_server, monkeypatch):
+    monkeypatch.setattr(get_client(), "max_retries", 1)
+    stand_in_server.routes["/sparql"] = lambda params: (503, {}, {"Retry-After": "0"})
+    client = get_client()
+
+    assert client.post(client.sparql_url, data={"query": ""}).status_code == 503
+    assert len(stand_in_server.requests) == 2
+    assert get_limiter(client.sparql_url).stats()["retries"] == 1
+
+
+@pytest.mark.parametrize("status", [400, 404])
+def test_client_does_not_retry_client_errors(stand_in_server, status):
+    stand_in_server.routes["/sparql"] = lambda params: (status, {}, {})
+    client = get_client()
+
+    assert client.post(client.sparql_url, data={"query": ""}).status_code == status
+    assert len(stand_in_server.requests) == 1
+
+
+def test_client_retries_non_idempotent_requests_only_when_throttled(stand_in_server):
+    responses = [(429, {}, {"Retry-After": "0"}), (503, {}, {"Retry-After": "0"})]
+    stand_in_server.routes["/sparql"] = lambda params: responses.pop(0)
+    client = get_client()
+
+    res = client.post(client.sparql_url, data={"query": ""}, idempotent=False)
+
+    # The 503 may come from a gateway that passed the request on, so it is not retried
+    assert res.status_code == 503
+    assert len(stand_in_server.requests) == 2
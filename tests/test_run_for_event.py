@@ -0,0 +1,53 @@
+"""
+Tests for the run_for_event module
+"""
+
+from click.testing import CliRunner
+
+from pyorcidator import run_for_event
+from pyorcidator.run_for_event import get_orcids_for_events, import_orcids_from_event
+
+
+def orcid_bindings(*orcids):
+    return {"results": {"bindings": [{"orcid": {"value": orcid}} for orcid in orcids]}}
+
+
+def test_get_orcids_for_events(stand_in_server):
+    stand_in_server.routes["/sparql"] = lambda params: orcid_bindings(
+        "0000-0003-4423-4370", "0000-0003-2473-2313", "0000-0003-4423-4370"
+    )
+
+    orcids = get_orcids_for_events(["Q2", "Q1", "Q2"], properties=["P823", "P710"])
+
+    assert orcids == ["0000-0003-2473-2313", "0000-0003-4423-4370"]
+    assert len(stand_in_server.requests) == 1
+    query = stand_in_server.requests[0][3]["query"][0]
+    assert "VALUES ?event { wd:Q1 wd:Q2 }" in query
+    assert "VALUES ?property { wdt:P823 wdt:P710 }" in query
+
+
+def test_get_orcids_for_series(stand_in_server):
+    stand_in_server.routes["/sparql"] = lambda params: orcid_bindings("0000-0003-4423-4370")
+
+    assert get_orcids_for_events(series_qids=["Q3"]) == ["0000-0003-4423-4370"]
+    query = stand_in_server.requests[0][3]["query"][0]
+    assert "VALUES ?series { wd:Q3 }" in query
+    assert "?event wdt:P179 ?series ." in query
+
+
+def test_parse_event_without_review(stand_in_server, monkeypatch, tmp_path):
+    stand_in_server.routes["/sparql"] = lambda params: orcid_bindings("0000-0003-4423-4370")
+    imported = {}
+    monkeypatch.setattr(
+        run_for_event,
+        "import_orcids",
+        lambda orcids, **kwargs: imported.update(kwargs, orcids=orcids),
+    )
+    output = str(tmp_path.joinpath("qs.txt"))
+
+    args = ["--series", "Q3", "--no-review", "--workers", "4", "-o", output]
+    result = CliRunner().invoke(import_orcids_from_event, args)
+
+    assert result.exit_code == 0, result.output
+    assert imported["orcids"] == ["0000-0003-4423-4370"]
+    assert (imported["workers"], imported["output"]) == (4, output)
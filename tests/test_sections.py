@@ -0,0 +1,86 @@
+"""
+Tests for the sections module
+"""
+
+import click
+import pytest
+
+from pyorcidator.helper import get_paper_dois
+from pyorcidator.import_info_from_list import import_orcids
+from pyorcidator.sections import get_orcid_sections, get_works_bulk, select_statements
+from pyorcidator.state import StateStore, set_state_store
+
+ORCID = "0000-0002-1825-0097"
+NAME = {"given-names": {"value": "Josiah"}, "family-name": {"value": "Carberry"}}
+
+
+def _doi(value):
+    return {"external-id-type": "doi", "external-id-value": value}
+
+
+def test_fetch_only_enabled_sections(stand_in_server):
+    base = f"/orcid3/{ORCID}"
+    stand_in_server.routes[f"{base}/personal-details"] = lambda params: {"name": NAME}
+    stand_in_server.routes[f"{base}/employments"] = lambda params: {
+        "affiliation-group": [
+            {"summaries": [{"employment-summary": {"organization": {"name": "Brown"}}}]}
+        ]
+    }
+    stand_in_server.routes[f"{base}/works"] = lambda params: {
+        "group": [
+            {"external-ids": {"external-id": []}, "work-summary": [{"put-code": 7}]},
+            {"external-ids": {"external-id": [_doi("10.1/b")]}, "work-summary": [{"put-code": 9}]},
+        ]
+    }
+    stand_in_server.routes[f"{base}/works/"] = lambda params, codes: {
+        "bulk": [
+            {"work": {"put-code": 7, "external-ids": {"external-id": [_doi("10.1/a")]}}},
+            {"error": {"developer-message": "not found"}},
+        ]
+    }
+
+    data = get_orcid_sections(ORCID, statements=("employments", "works"))
+
+    assert data["person"]["name"] == NAME
+    assert data["person"]["keywords"]["keyword"] == []
+    [employment] = data["activities-summary"]["employments"]["employment-summary"]
+    assert employment["organization"]["name"] == "Brown"
+    assert data["activities-summary"]["educations"]["education-summary"] == []
+    # The DOI of the first work is only in the full work, from the bulk endpoint
+    assert get_paper_dois(data["activities-summary"]["works"]["group"]) == ["10.1/a", "10.1/b"]
+    paths = sorted(request[1] for request in stand_in_server.requests)
+    assert paths == [
+        f"{base}/employments",
+        f"{base}/personal-details",
+        f"{base}/works",
+        f"{base}/works/7,9",
+    ]
+
+
+def test_bulk_works_are_chunked(stand_in_server):
+    stand_in_server.routes[f"/orcid3/{ORCID}/works/"] = lambda params, codes: {
+        "bulk": [{"work": {"put-code": int(code)}} for code in codes.split(",")]
+    }
+
+    works = get_works_bulk(ORCID, range(250))
+
+    assert [work["put-code"] for work in works] == list(range(250))
+    assert len(stand_in_server.requests) == 3
+
+
+def test_select_statements(sample_orcid_data):
+    data = select_statements(sample_orcid_data, ["keywords"])
+
+    assert data["person"]["keywords"] == sample_orcid_data["person"]["keywords"]
+    assert data["person"]["name"] == sample_orcid_data["person"]["name"]
+    assert data["history"] == sample_orcid_data["history"]
+    assert data["activities-summary"]["works"]["group"] == []
+
+
+def test_sections_are_not_combined_with_state(tmp_path):
+    set_state_store(StateStore(tmp_path.joinpath("state.sqlite")))
+    try:
+        with pytest.raises(click.UsageError):
+            import_orcids([ORCID], statements=("works",))
+    finally:
+        set_state_store(None)
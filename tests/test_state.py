@@ -0,0 +1,55 @@
+"""
+Tests for the state module
+"""
+
+from pyorcidator.helper import render_orcids_qs
+from pyorcidator.pending import PendingQueue, set_pending_queue
+from pyorcidator.state import StateStore, parse_since, set_state_store
+
+
+def test_parse_since():
+    assert parse_since("1970-01-02") == 86_400_000
+    assert parse_since("1970-01-01T01:00:00+01:00") == 0
+
+
+def test_state_store(tmp_path):
+    data = {"history": {"last-modified-date": {"value": 1650887729184}}}
+    store = StateStore(tmp_path.joinpath("state.sqlite"))
+    assert not store.is_unchanged("0000-0003-4423-4370", data)
+    store.put_many([("0000-0003-4423-4370", 1650887729184, "Q1\tP31\tQ5\n")])
+    assert store.is_unchanged("0000-0003-4423-4370", data)
+    assert store.is_same_output("0000-0003-4423-4370", "Q1\tP31\tQ5\n")
+    assert not store.is_same_output("0000-0003-4423-4370", "Q1\tP31\tQ6\n")
+    assert store.skipped == 2
+    store.close()
+
+    since = StateStore(since=parse_since("2023-01-01"))
+    assert since.is_unchanged("0000-0003-4423-4370", data)
+    assert not since.is_unchanged("0000-0003-4423-4370", {"history": None})
+
+
+def test_unchanged_records_are_skipped(stand_in_server, sample_orcid_data, tmp_path, monkeypatch):
+    orcid = "0000-0003-4423-4370"
+    stand_in_server.routes[f"/orcid/{orcid}"] = lambda params: sample_orcid_data
+    stand_in_server.routes["/sparql"] = lambda params: {"results": {"bindings": []}}
+    set_pending_queue(PendingQueue(tmp_path.joinpath("pending.json")))
+    path = tmp_path.joinpath("state.sqlite")
+
+    try:
+        set_state_store(StateStore(path))
+        assert f'|P496|"{orcid}"' in "".join(render_orcids_qs([orcid]))
+
+        # The record is the same, so nothing is resolved
+        stand_in_server.requests.clear()
+        set_state_store(StateStore(path))
+        assert list(render_orcids_qs([orcid])) == [""]
+        assert [request[1] for request in stand_in_server.requests] == [f"/orcid/{orcid}"]
+
+        # The record changed, but not in a way that changes the QuickStatements
+        sample_orcid_data["history"]["last-modified-date"]["value"] = 1700000000000
+        set_state_store(StateStore(path))
+        assert list(render_orcids_qs([orcid])) == [""]
+        assert StateStore(path).get(orcid)[0] == 1700000000000
+    finally:
+        set_state_store(None)
+        set_pending_queue(None)
@@ -0,0 +1,59 @@
+"""
+Tests for the statements module
+"""
+
+import datetime
+import subprocess
+import sys
+
+from quickstatements_client import DateQualifier, render_lines
+
+from pyorcidator.statements import (
+    Statement,
+    date_qualifier,
+    entity_qualifier,
+    render_statements,
+    text_qualifier,
+    to_lines,
+)
+
+
+def test_render_like_quickstatements_client():
+    reference = (text_qualifier("S854", "https://orcid.org/0000-0003-4423-4370"),)
+    start = datetime.datetime(2016, 5, 17)
+    statements = [
+        Statement.create(),
+        Statement.text("LAST", "Len", "Jane Doe"),
+        Statement.entity("Q1", "P31", "Q5", reference),
+        Statement.text("Q1", "P496", "0000-0003-4423-4370", reference),
+        Statement.entity(
+            "Q1",
+            "P108",
+            "Q49114",
+            (
+                *reference,
+                entity_qualifier("P2868", "Q121594"),
+                date_qualifier("P580", start, 11),
+                date_qualifier("P582", start, 10),
+            ),
+        ),
+        Statement.entity("Q1", "P69", "Q49114", (*reference, date_qualifier("P580", start, 9))),
+    ]
+
+    for sep, newline in [("|", "\n"), ("\t", "\n"), ("|", "||")]:
+        expected = render_lines(to_lines(statements), sep=sep, newline=newline)
+        assert render_statements(statements, sep=sep, newline=newline) == expected
+    for precision in (9, 10, 11):
+        expected = DateQualifier.start_time(start, precision=precision).target
+        assert date_qualifier("P580", start, precision)[2] == expected
+
+
+def test_rendering_does_not_import_pydantic():
+    code = """\
+import sys
+from pyorcidator.statements import Statement, render_statements
+render_statements([Statement.entity("Q1", "P31", "Q5")])
+print("pydantic" in sys.modules)
+"""
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.stdout.strip() == "False"
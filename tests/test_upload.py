@@ -0,0 +1,108 @@
+"""
+Tests for the upload module
+"""
+
+import json
+from types import SimpleNamespace
+
+from pyorcidator.upload import (
+    BatchUploader,
+    iter_statement_groups,
+    pack,
+    quickstatements_urls,
+    text_to_urls,
+)
+
+NEW_RESEARCHER = 'CREATE\nLAST\tLen\t"Jane Doe"\nLAST\tP31\tQ5\n'
+
+
+def test_pack_keeps_chunks_whole():
+    assert list(pack(["aa", "bbb", "c", "dddddd", "e"], 4)) == [
+        ["aa"],
+        ["bbb", "c"],
+        ["dddddd"],
+        ["e"],
+    ]
+
+
+def test_statement_groups_keep_last_with_create():
+    qs = f"Q1\tP31\tQ5\n{NEW_RESEARCHER}\nQ2\tP31\tQ5\n"
+    assert list(iter_statement_groups(qs.splitlines(keepends=True))) == [
+        "Q1\tP31\tQ5\n",
+        NEW_RESEARCHER,
+        "Q2\tP31\tQ5\n",
+    ]
+
+
+def test_urls_split_at_length_limit():
+    qs = "".join(f"Q{index}\tP31\tQ5\n" for index in range(1000))
+    urls = text_to_urls(qs, max_length=2_000)
+
+    assert len(urls) > 1
+    assert all(len(url) <= 2_000 for url in urls)
+    assert text_to_urls(qs, max_length=100_000) == [
+        "https://quickstatements.toolforge.org/#/v1="
+        + "%7C%7C".join(f"Q{index}%7CP31%7CQ5" for index in range(1000))
+    ]
+    # A new item is never split from its CREATE
+    assert len(quickstatements_urls([NEW_RESEARCHER], max_length=10)) == 1
+
+
+def test_batch_uploader(stand_in_server, tmp_path):
+    batches = []
+
+    def _api(params):
+        batches.append(params)
+        if "fail" in params["data"][0]:
+            return 500, "Internal error", {}
+        if "gateway" in params["data"][0]:
+            return 504, "Gateway timeout", {}
+        return {"status": "OK", "batch_id": len(batches)}
+
+    stand_in_server.routes["/api.php"] = _api
+    client = SimpleNamespace(
+        base_url=stand_in_server.url,
+        endpoint=f"{stand_in_server.url}/api.php",
+        username="Jane",
+        token="secret",
+    )
+    log_path = tmp_path.joinpath("batches.jsonl")
+    researchers = [f"Q{index}\tP31\tQ5\n" for index in range(5)]
+    researchers += ["Q5\tP31\tfail\n", "Q6\tP31\tgateway\n"]
+
+    with BatchUploader("event", max_bytes=23, workers=2, log_path=log_path, client=client) as up:
+        for qs in researchers:
+            up.add(qs)
+
+    assert sorted(params["data"][0] for params in batches) == [
+        "Q0|P31|Q5||Q1|P31|Q5",
+        "Q2|P31|Q5||Q3|P31|Q5",
+        "Q4|P31|Q5",
+        "Q5|P31|fail",
+        "Q6|P31|gateway",
+    ]
+    assert {params["username"][0] for params in batches} == {"Jane"}
+    records = [json.loads(line) for line in log_path.read_text().splitlines()]
+    names = sorted(record["name"] for record in records)
+    assert [name.rsplit("-", 1)[0] for name in names] == [
+        "event-0000",
+        "event-0001",
+        "event-0002",
+        "event-0003",
+        "event-0004",
+    ]
+    # The batch that may have reached the API is neither retried nor resubmitted
+    assert sorted(record["name"] for record in up.failed) == names[3:]
+    assert {record["name"]: record["status"] for record in up.failed}[names[4]] == "UNKNOWN"
+    assert all(
+        record["batch_url"].startswith(f"{stand_in_server.url}/#/batch/")
+        for record in records
+        if record["status"] == "OK"
+    )
+
+    # Batches submitted before keep their names and are not submitted again
+    batches.clear()
+    with BatchUploader("event", max_bytes=23, log_path=log_path, client=client) as up:
+        for qs in researchers:
+            up.add(qs)
+    assert [params["batchname"][0] for params in batches] == [names[3]]